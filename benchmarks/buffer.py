@@ -0,0 +1,52 @@
+import argparse
+import time
+import numpy as np
+
+from mvc.models.buffer import Buffer, ArrayBuffer
+
+
+def fill(buffer, size, state_size, num_actions):
+    obs = np.random.random((state_size,))
+    action = np.random.random((num_actions,))
+    for i in range(size):
+        buffer.add(obs, action, np.random.random(), float(i % 1000 == 0))
+
+
+def measure(buffer, batch_size, iterations):
+    start = time.perf_counter()
+    for _ in range(iterations):
+        buffer.fetch(batch_size)
+    return (time.perf_counter() - start) / iterations
+
+
+def main(args):
+    print('| fill | deque (ms/fetch) | array (ms/fetch) | speedup |')
+    print('|---:|---:|---:|---:|')
+    for size in args.sizes:
+        results = []
+        for buffer_class in [Buffer, ArrayBuffer]:
+            buffer = buffer_class(args.buffer_size)
+            fill(buffer, size, args.state_size, args.num_actions)
+            results.append(measure(buffer, args.batch_size, args.iterations))
+        print('| {} | {:.3f} | {:.3f} | {:.1f}x |'.format(
+            size, results[0] * 1000, results[1] * 1000,
+            results[0] / results[1]))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--sizes', type=int, nargs='+',
+                        default=[10 ** 4, 10 ** 5, 10 ** 6],
+                        help='the number of stored transitions')
+    parser.add_argument('--buffer-size', type=int, default=10 ** 6,
+                        help='capacity of replay buffer')
+    parser.add_argument('--state-size', type=int, default=111,
+                        help='dimension of observation')
+    parser.add_argument('--num-actions', type=int, default=8,
+                        help='dimension of action')
+    parser.add_argument('--batch-size', type=int, default=256,
+                        help='batch size')
+    parser.add_argument('--iterations', type=int, default=100,
+                        help='the number of fetches to average')
+    args = parser.parse_args()
+    main(args)
@@ -0,0 +1,73 @@
+import argparse
+import time
+import numpy as np
+import tensorflow as tf
+
+from mvc.models.networks.ppo import PPONetwork
+from mvc.models.networks.ddpg import DDPGNetwork
+from mvc.models.networks.sac import SACNetwork
+
+
+def make_network(algorithm, layers, state_size, num_actions):
+    state_shape = (state_size,)
+    if algorithm == 'ppo':
+        return PPONetwork(layers, state_shape, 1, num_actions, 64, 0.2, 3e-4,
+                          0.5, 1.0, 0.0)
+    elif algorithm == 'ddpg':
+        return DDPGNetwork(layers, 1, state_shape, num_actions, 0.99, 0.001,
+                           1e-4, 1e-3)
+    return SACNetwork(layers, 1, state_shape, num_actions, 0.99, 0.005,
+                      3e-4, 3e-4, 3e-4, 1e-3)
+
+
+def measure(network, obs, iterations):
+    # warm up before measurement
+    network.infer(obs_t=obs)
+    start = time.perf_counter()
+    for _ in range(iterations):
+        network.infer(obs_t=obs)
+    return (time.perf_counter() - start) / iterations
+
+
+def main(args):
+    print('| algorithm | layers | batch | session (us/step) |'
+          ' numpy (us/step) | speedup |')
+    print('|---|---|---:|---:|---:|---:|')
+    for algorithm in args.algorithms:
+        tf.reset_default_graph()
+        network = make_network(algorithm, args.layers, args.state_size,
+                               args.num_actions)
+        if args.batch_size > 1 or algorithm == 'ppo':
+            obs = np.random.random((args.batch_size, args.state_size))
+        else:
+            obs = np.random.random((args.state_size,))
+
+        with tf.Session() as sess:
+            sess.run(tf.global_variables_initializer())
+            results = []
+            for numpy_infer in [False, True]:
+                network.numpy_infer = numpy_infer
+                results.append(measure(network, obs, args.iterations))
+        print('| {} | {} | {} | {:.1f} | {:.1f} | {:.1f}x |'.format(
+            algorithm, 'x'.join(map(str, args.layers)), args.batch_size,
+            results[0] * 10 ** 6, results[1] * 10 ** 6,
+            results[0] / results[1]))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--algorithms', type=str, nargs='+',
+                        default=['ppo', 'ddpg', 'sac'],
+                        help='networks to measure')
+    parser.add_argument('--layers', type=int, nargs='+', default=[64, 64],
+                        help='layer units')
+    parser.add_argument('--state-size', type=int, default=17,
+                        help='observation dimension')
+    parser.add_argument('--num-actions', type=int, default=6,
+                        help='action dimension')
+    parser.add_argument('--batch-size', type=int, default=1,
+                        help='the number of environments')
+    parser.add_argument('--iterations', type=int, default=1000,
+                        help='the number of steps to average')
+    args = parser.parse_args()
+    main(args)
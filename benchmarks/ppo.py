@@ -0,0 +1,81 @@
+import argparse
+import time
+import numpy as np
+import tensorflow as tf
+
+from mvc.models.networks.ppo import PPONetwork
+from mvc.misc.batch import make_batch
+
+
+def make_data(data_size, state_size, num_actions):
+    return {
+        'obs_t': np.random.random((data_size, state_size)),
+        'actions_t': np.random.random((data_size, num_actions)),
+        'log_probs_t': np.random.random((data_size,)),
+        'returns_t': np.random.random((data_size,)),
+        'advantages_t': np.random.random((data_size,)),
+        'values_t': np.random.random((data_size,))
+    }
+
+
+def per_batch_update(network, data, epoch, batch_size, data_size):
+    for _ in range(epoch):
+        for batch in make_batch(data, batch_size, data_size):
+            network.update(**batch)
+
+
+def fused_update(network, data, epoch, batch_size, data_size):
+    network.fused_update(epoch, **data)
+
+
+def measure(func, iterations, *args):
+    # warm up before measurement
+    func(*args)
+    start = time.perf_counter()
+    for _ in range(iterations):
+        func(*args)
+    return (time.perf_counter() - start) / iterations
+
+
+def main(args):
+    # both paths run on the resource variables of the fused network
+    network = PPONetwork(args.layers, (args.state_size,), args.num_envs,
+                         args.num_actions, args.batch_size, 0.2, 3e-4, 0.5,
+                         1.0, 0.0, fused=True)
+    data_size = args.time_horizon * args.num_envs
+    data = make_data(data_size, args.state_size, args.num_actions)
+
+    print('| T x envs | epoch | per-batch (ms/update) | fused (ms/update) |'
+          ' speedup |')
+    print('|---|---:|---:|---:|---:|')
+    with tf.Session() as sess:
+        sess.run(tf.global_variables_initializer())
+        results = []
+        for func in [per_batch_update, fused_update]:
+            results.append(measure(func, args.iterations, network, data,
+                                   args.epoch, args.batch_size, data_size))
+        print('| {} x {} | {} | {:.3f} | {:.3f} | {:.1f}x |'.format(
+            args.time_horizon, args.num_envs, args.epoch,
+            results[0] * 1000, results[1] * 1000, results[0] / results[1]))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--time-horizon', type=int, default=2048,
+                        help='interval to update')
+    parser.add_argument('--num-envs', type=int, default=1,
+                        help='the number of environments')
+    parser.add_argument('--epoch', type=int, default=10,
+                        help='epoch of training')
+    parser.add_argument('--batch-size', type=int, default=64,
+                        help='batch size of training')
+    parser.add_argument('--layers', type=int, nargs='+', default=[64, 64],
+                        help='layer units')
+    parser.add_argument('--state-size', type=int, default=3,
+                        help='observation dimension')
+    parser.add_argument('--num-actions', type=int, default=1,
+                        help='action dimension')
+    parser.add_argument('--iterations', type=int, default=5,
+                        help='the number of updates to average')
+    args = parser.parse_args()
+    main(args)
@@ -0,0 +1,94 @@
+import argparse
+import time
+import numpy as np
+
+import mvc.preprocess as preprocess
+
+from mvc.misc import jit
+
+
+# list-based implementations kept as baselines
+def loop_returns(bootstrap_value, rewards, terminals, gamma):
+    returns = []
+    return_tp1 = bootstrap_value
+    for i in reversed(range(rewards.shape[0])):
+        return_t = rewards[i] + (1.0 - terminals[i]) * gamma * return_tp1
+        returns.append(return_t)
+        return_tp1 = return_t
+    returns = reversed(returns)
+    return np.array(list(returns))
+
+
+def loop_gae(bootstrap_value, rewards, values, terminals, gamma, lam):
+    values = np.concatenate((values, [bootstrap_value]), axis=0)
+    deltas = []
+    for i in reversed(range(rewards.shape[0])):
+        return_t = rewards[i] + (1.0 - terminals[i]) * gamma * values[i + 1]
+        delta = return_t - values[i]
+        deltas.append(delta)
+    deltas = np.array(list(reversed(deltas)))
+    adv_tp1 = deltas[-1]
+    advantages = [adv_tp1]
+    for i in reversed(range(deltas.shape[0] - 1)):
+        adv_t = deltas[i] + (1.0 - terminals[i]) * gamma * lam * adv_tp1
+        advantages.append(adv_t)
+        adv_tp1 = adv_t
+    advantages = reversed(advantages)
+    return np.array(list(advantages))
+
+
+def measure(func, iterations, *args):
+    start = time.perf_counter()
+    for _ in range(iterations):
+        func(*args)
+    return (time.perf_counter() - start) / iterations
+
+
+def use_backend(name):
+    preprocess.reverse_scan = getattr(jit, name + '_reverse_scan')
+
+
+def main(args):
+    backends = ['numpy'] if jit.numba is None else ['numpy', 'numba']
+    header = ''.join([' {} (ms) |'.format(name) for name in backends])
+    print('| T x envs | function | loop (ms) |' + header)
+    print('|---|---|---:|' + ' ---: |' * len(backends))
+    for horizon in args.horizons:
+        shape = (horizon, args.num_envs)
+        bootstrap_value = np.random.random(args.num_envs).astype(np.float32)
+        rewards = np.random.random(shape)
+        values = np.random.random(shape).astype(np.float32)
+        terminals = (np.random.random(shape) < 0.01).astype(np.float64)
+
+        returns_args = (bootstrap_value, rewards, terminals, 0.99)
+        gae_args = (bootstrap_value, rewards, values, terminals, 0.99, 0.95)
+        cases = [
+            ('returns', loop_returns, preprocess.compute_returns,
+             returns_args),
+            ('gae', loop_gae, preprocess.compute_gae, gae_args)
+        ]
+        for name, baseline, current, func_args in cases:
+            row = '| {} x {} | {} | {:.3f} |'.format(
+                horizon, args.num_envs, name,
+                measure(baseline, args.iterations, *func_args) * 1000)
+            for backend in backends:
+                use_backend(backend)
+                # check parity and compile before measurement
+                assert np.array_equal(current(*func_args),
+                                      baseline(*func_args))
+                elapsed = measure(current, args.iterations, *func_args)
+                row += ' {:.3f} |'.format(elapsed * 1000)
+            print(row)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--horizons', type=int, nargs='+',
+                        default=[2048, 8192],
+                        help='time horizons to measure')
+    parser.add_argument('--num-envs', type=int, default=16,
+                        help='the number of environments')
+    parser.add_argument('--iterations', type=int, default=20,
+                        help='the number of calls to average')
+    args = parser.parse_args()
+    main(args)
@@ -0,0 +1,80 @@
+import argparse
+import time
+import tensorflow as tf
+
+from mvc.models.networks.ddpg import DDPGNetwork
+from mvc.models.networks.sac import SACNetwork
+
+
+TARGET_SCOPES = {
+    'ddpg': ['ddpg/target_critic', 'ddpg/target_actor'],
+    'sac': ['sac/target_v']
+}
+
+
+def make_network(algorithm, layers, state_size, num_actions, flat):
+    state_shape = (state_size,)
+    if algorithm == 'ddpg':
+        return DDPGNetwork(layers, 1, state_shape, num_actions, 0.99, 0.001,
+                           1e-4, 1e-3, flat_target_update=flat)
+    return SACNetwork(layers, 1, state_shape, num_actions, 0.99, 0.005,
+                      3e-4, 3e-4, 3e-4, 1e-3, flat_target_update=flat)
+
+
+def target_update_op(algorithm, network):
+    if algorithm == 'ddpg':
+        return tf.group(network.update_target_critic,
+                        network.update_target_actor)
+    return network.target_update
+
+
+def measure(sess, op, iterations):
+    # warm up before measurement
+    sess.run(op)
+    start = time.perf_counter()
+    for _ in range(iterations):
+        sess.run(op)
+    return (time.perf_counter() - start) / iterations
+
+
+def measure_network(args, algorithm, flat):
+    tf.reset_default_graph()
+    network = make_network(algorithm, args.layers, args.state_size,
+                           args.num_actions, flat)
+    num_variables = sum(
+        len(tf.get_collection(tf.GraphKeys.TRAINABLE_VARIABLES, scope))
+        for scope in TARGET_SCOPES[algorithm])
+    op = target_update_op(algorithm, network)
+    with tf.Session() as sess:
+        sess.run(tf.global_variables_initializer())
+        return num_variables, measure(sess, op, args.iterations)
+
+
+def main(args):
+    print('| algorithm | layers | variables | per-variable (us/step) |'
+          ' flat (us/step) | speedup |')
+    print('|---|---|---|---:|---:|---:|')
+    for algorithm in args.algorithms:
+        num_variables, per_variable = measure_network(args, algorithm, False)
+        num_flat_variables, flat = measure_network(args, algorithm, True)
+        print('| {} | {} | {} -> {} | {:.1f} | {:.1f} | {:.1f}x |'.format(
+            algorithm, 'x'.join(map(str, args.layers)), num_variables,
+            num_flat_variables, per_variable * 10 ** 6, flat * 10 ** 6,
+            per_variable / flat))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--algorithms', type=str, nargs='+',
+                        default=['ddpg', 'sac'],
+                        help='networks to measure')
+    parser.add_argument('--layers', type=int, nargs='+', default=[256, 256],
+                        help='layer units')
+    parser.add_argument('--state-size', type=int, default=17,
+                        help='observation dimension')
+    parser.add_argument('--num-actions', type=int, default=6,
+                        help='action dimension')
+    parser.add_argument('--iterations', type=int, default=1000,
+                        help='the number of updates to average')
+    args = parser.parse_args()
+    main(args)
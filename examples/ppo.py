@@ -1,24 +1,143 @@
 import tensorflow as tf
 import argparse
 import gym
+import multiprocessing
+
+from functools import partial
 
 from mvc.envs.wrappers import BatchEnvWrapper, MuJoCoWrapper
+from mvc.envs.wrappers import SubprocBatchEnvWrapper
 from mvc.controllers.ppo import PPOController
+from mvc.controllers.fused_ppo import FusedPPOController
 from mvc.controllers.eval import EvalController
 from mvc.models.networks.ppo import PPONetwork
 from mvc.models.metrics import Metrics
-from mvc.models.rollout import Rollout
+from mvc.logger.checkpoint_writer import AsyncCheckpointWriter
+from mvc.models.rollout import ArrayRollout
 from mvc.view import View
 from mvc.interaction import batch_interact
+from mvc.controllers.parallel_ppo import ParallelPPOController
+from mvc.parallel.evaluator import AsyncEvaluator
+from mvc.parallel.data_parallel import run_workers, broadcast_params
+from mvc.parallel.data_parallel import Communicator
+import mvc.logger as logger
+import mvc.misc.profiler as profiler
+from mvc.misc.tracer import Tracer
 
 
 def make_envs(env_name, num_envs, reward_scale):
     return [MuJoCoWrapper(gym.make(env_name), reward_scale)\
         for _ in range(num_envs)]
 
-def main(args):
+def make_env(env_name, reward_scale=1.0):
+    return MuJoCoWrapper(gym.make(env_name), reward_scale)
+
+def make_env_fns(env_name, num_envs, reward_scale):
+    # partial objects can be pickled by spawned processes unlike lambdas
+    return [partial(make_env, env_name, reward_scale)
+            for _ in range(num_envs)]
+
+def make_network(args, state_shape, num_actions, batch_size):
+    return PPONetwork(args.layers, state_shape, args.num_envs, num_actions,
+                      batch_size, args.epsilon, args.lr, args.grad_clip,
+                      args.value_factor, args.entropy_factor,
+                      args.numpy_infer)
+
+def worker(args, rank, allreduce):
     env = BatchEnvWrapper(
-        make_envs(args.env, args.num_envs, args.reward_scale), args.render)
+        make_envs(args.env, args.num_envs, args.reward_scale),
+        args.render and rank == 0)
+
+    state_shape = env.observation_space.shape
+    num_actions = env.action_space.shape[0]
+
+    # each worker computes gradients on its shard of every minibatch
+    batch_size = args.batch_size // args.num_workers
+    network = make_network(args, state_shape, num_actions, batch_size)
+
+    rollout = ArrayRollout(args.time_horizon, args.num_envs, state_shape,
+                           num_actions)
+
+    saver = tf.train.Saver()
+    if rank == 0:
+        checkpoint = AsyncCheckpointWriter() if args.async_checkpoint \
+            else saver
+        metrics = Metrics(args.name, args.log_adapter, checkpoint)
+        if args.async_log:
+            logger.start_async()
+        # workers are spawned without the profiler of the parent
+        if args.profile:
+            profiler.enable()
+    else:
+        metrics = Metrics(args.name)
+        logger.disable()
+
+    controller = ParallelPPOController(network, rollout, metrics,
+                                       Communicator(allreduce, rank),
+                                       args.num_envs, args.time_horizon,
+                                       args.epoch,
+                                       batch_size, args.gamma, args.lam,
+                                       args.final_steps, args.log_interval,
+                                       args.save_interval, args.eval_interval)
+    view = View(controller)
+
+    # only the first worker evaluates
+    eval_env = eval_view = None
+    if rank == 0:
+        eval_env = BatchEnvWrapper(
+            make_envs(args.env, args.num_envs, args.reward_scale))
+        eval_controller = EvalController(network, metrics,
+                                         args.eval_episodes)
+        eval_view = View(eval_controller)
+
+    # save hyperparameters
+    metrics.log_parameters(vars(args))
+
+    with tf.Session() as sess:
+        sess.run(tf.global_variables_initializer())
+
+        if args.load is not None:
+            saver.restore(sess, args.load)
+
+        # all workers start from the parameters of the first one
+        broadcast_params(allreduce, rank, network, 'ppo')
+
+        try:
+            batch_interact(env, view, eval_env, eval_view)
+        finally:
+            env.close()
+            if rank == 0:
+                eval_env.close()
+                # the last snapshot is written before the writer stops
+                if args.async_checkpoint:
+                    checkpoint.close()
+
+def data_parallel(args):
+    env = MuJoCoWrapper(gym.make(args.env))
+    state_shape = env.observation_space.shape
+    num_actions = env.action_space.shape[0]
+    # the environment is only used to read spaces
+    env.close()
+
+    # count parameters to allocate shared memory for gradients
+    with tf.Graph().as_default():
+        network = make_network(args, state_shape, num_actions,
+                               args.batch_size)
+        size = network.flat_params_size('ppo')
+
+    ctx = multiprocessing.get_context('spawn')
+    # one more element for the loss
+    run_workers(ctx, partial(worker, args), args.num_workers, size + 1)
+
+def main(args):
+    if args.subproc:
+        # rollout storage copies observations so shared memory is reused
+        env = SubprocBatchEnvWrapper(
+            make_env_fns(args.env, args.num_envs, args.reward_scale),
+            args.render, copy_obs=False)
+    else:
+        env = BatchEnvWrapper(
+            make_envs(args.env, args.num_envs, args.reward_scale), args.render)
     eval_env = BatchEnvWrapper(
         make_envs(args.env, args.num_envs, args.reward_scale))
 
@@ -27,22 +146,43 @@ def main(args):
     network = PPONetwork(args.layers, env.observation_space.shape,
                          args.num_envs, num_actions, args.batch_size,
                          args.epsilon, args.lr, args.grad_clip,
-                         args.value_factor, args.entropy_factor)
+                         args.value_factor, args.entropy_factor,
+                         args.numpy_infer, args.fused_update)
+    if args.trace_interval > 0 or args.trace_infer_interval > 0:
+        network.tracer = Tracer(args.trace_interval,
+                                args.trace_infer_interval)
 
-    rollout = Rollout()
+    rollout = ArrayRollout(args.time_horizon, args.num_envs,
+                           env.observation_space.shape, num_actions)
 
     saver = tf.train.Saver()
-    metrics = Metrics(args.name, args.log_adapter, saver)
+    checkpoint = AsyncCheckpointWriter() if args.async_checkpoint else saver
+    metrics = Metrics(args.name, args.log_adapter, checkpoint)
+    if args.async_log:
+        logger.start_async()
 
-    controller = PPOController(network, rollout, metrics, args.num_envs,
-                               args.time_horizon, args.epoch, args.batch_size,
-                               args.gamma, args.lam, args.final_steps,
-                               args.log_interval,  args.save_interval,
-                               args.eval_interval)
+    # fused update runs all epochs in a single session call
+    controller_class = FusedPPOController if args.fused_update \
+        else PPOController
+    controller = controller_class(network, rollout, metrics, args.num_envs,
+                                  args.time_horizon, args.epoch,
+                                  args.batch_size, args.gamma, args.lam,
+                                  args.final_steps, args.log_interval,
+                                  args.save_interval, args.eval_interval)
     view = View(controller)
 
-    eval_controller = EvalController(network, metrics, args.eval_episodes)
-    eval_view = View(eval_controller)
+    if args.async_eval:
+        # evaluation runs on a copy of the network in background
+        evaluator = AsyncEvaluator(
+            eval_env, network,
+            partial(make_network, args, env.observation_space.shape,
+                    num_actions, args.batch_size), network.policy_scope,
+            metrics, args.eval_episodes, batch=True)
+        eval_view = None
+    else:
+        evaluator = None
+        eval_controller = EvalController(network, metrics, args.eval_episodes)
+        eval_view = View(eval_controller)
 
     # save hyperparameters
     metrics.log_parameters(vars(args))
@@ -56,7 +196,17 @@ def main(args):
         if args.load is not None:
             saver.restore(sess, args.load)
 
-        batch_interact(env, view, eval_env, eval_view)
+        try:
+            batch_interact(env, view, eval_env, eval_view,
+                           pipeline=args.pipeline, evaluator=evaluator)
+        finally:
+            if evaluator is not None:
+                evaluator.close()
+            env.close()
+            eval_env.close()
+            # the last snapshot is written before the writer stops
+            if args.async_checkpoint:
+                checkpoint.close()
 
 if __name__ == '__main__':
     parser = argparse.ArgumentParser()
@@ -103,5 +253,39 @@ if __name__ == '__main__':
                         help='the number of evaluation episode')
     parser.add_argument('--render', action='store_true',
                         help='show frames of environment')
+    parser.add_argument('--subproc', action='store_true',
+                        help='run environments in worker processes')
+    parser.add_argument('--pipeline', action='store_true',
+                        help='infer half of environments while others step')
+    parser.add_argument('--fused-update', action='store_true',
+                        help='run all epochs of an update in one session call')
+    parser.add_argument('--num-workers', type=int, default=1,
+                        help='the number of data-parallel worker processes')
+    parser.add_argument('--async-eval', action='store_true',
+                        help='evaluate in background without blocking')
+    parser.add_argument('--numpy-infer', action='store_true',
+                        help='infer actions with NumPy instead of session')
+    parser.add_argument('--async-checkpoint', action='store_true',
+                        help='write checkpoints in background')
+    parser.add_argument('--async-log', action='store_true',
+                        help='write metrics in background')
+    parser.add_argument('--profile', action='store_true',
+                        help='log time spent in each phase of training')
+    parser.add_argument('--trace-interval', type=int, default=0,
+                        help='interval of updates to capture TF traces')
+    parser.add_argument('--trace-infer-interval', type=int, default=0,
+                        help='interval of inferences to capture TF traces')
     args = parser.parse_args()
-    main(args)
+    if args.num_workers > 1:
+        # workers run the synchronous loop without traces
+        for flag in ['subproc', 'pipeline', 'fused_update', 'async_eval',
+                     'trace_interval', 'trace_infer_interval']:
+            if getattr(args, flag):
+                parser.error('--{} cannot be combined with --num-workers'
+                             .format(flag.replace('_', '-')))
+    if args.profile:
+        profiler.enable()
+    if args.num_workers > 1:
+        data_parallel(args)
+    else:
+        main(args)
@@ -2,36 +2,159 @@ import tensorflow as tf
 import numpy as np
 import argparse
 import gym
+import os
+import multiprocessing
 
+from functools import partial
 
-from mvc.envs.wrappers import MuJoCoWrapper
+
+from mvc.envs.wrappers import BatchEnvWrapper, MuJoCoWrapper
 from mvc.controllers.sac import SACController
 from mvc.controllers.eval import EvalController
 from mvc.models.networks.sac import SACNetwork
 from mvc.models.metrics import Metrics
-from mvc.models.buffer import Buffer
+from mvc.logger.checkpoint_writer import AsyncCheckpointWriter
+import mvc.logger as logger
+import mvc.misc.profiler as profiler
+from mvc.misc.tracer import Tracer
+from mvc.models.buffer import ArrayBuffer
+from mvc.models.prioritized_buffer import PrioritizedBuffer
+from mvc.models.memmap_buffer import MemmapBuffer
 from mvc.noise import EmptyNoise
 from mvc.view import View
-from mvc.interaction import interact
+from mvc.interaction import interact, batch_interact
+from mvc.parallel.shared_buffer import SharedBuffer
+from mvc.parallel.parameters import SharedParameters
+from mvc.parallel.evaluator import AsyncEvaluator
+from mvc.parallel.actor import ActorPool
+from mvc.parallel.learner import Learner, learn
+
+
+def make_envs(env_name, num_envs, reward_scale=1.0):
+    return [MuJoCoWrapper(gym.make(env_name), reward_scale)\
+        for _ in range(num_envs)]
+
+def make_env(env_name, reward_scale=1.0):
+    return MuJoCoWrapper(gym.make(env_name), reward_scale)
+
+def make_network(args, state_shape, num_actions):
+    return SACNetwork(args.layers, args.concat_index, state_shape,
+                      num_actions, args.gamma, args.tau, args.pi_lr,
+                      args.q_lr, args.v_lr, args.reg,
+                      numpy_infer=args.numpy_infer,
+                      flat_target_update=args.flat_target_update)
+
+def actor_learner(args):
+    # processes are spawned to keep them apart from the learner session
+    ctx = multiprocessing.get_context(args.start_method)
+    env = make_env(args.env)
+    state_shape = env.observation_space.shape
+    num_actions = env.action_space.shape[0]
+    # the environment is only used to read spaces
+    env.close()
+
+    # learner network
+    network = SACNetwork(args.layers, args.concat_index, state_shape,
+                         num_actions, args.gamma, args.tau, args.pi_lr,
+                         args.q_lr, args.v_lr, args.reg, args.fused_update,
+                         args.updates_per_step * args.update_every,
+                         flat_target_update=args.flat_target_update)
+    if args.trace_interval > 0 or args.trace_infer_interval > 0:
+        network.tracer = Tracer(args.trace_interval,
+                                args.trace_infer_interval)
+
+    # shared replay buffer and parameters
+    buffer = SharedBuffer(ctx, args.buffer_size, args.num_actors, state_shape,
+                          num_actions)
+    # only the policy is synced since actors just infer actions
+    scope = network.policy_scope
+    parameters = SharedParameters(ctx, network.flat_params_size(scope))
+
+    # actor processes with CPU copies of the network, which also take
+    # --numpy-infer since only actors run inference
+    env_fns = [partial(make_env, args.env, args.reward_scale)
+               for _ in range(args.num_actors)]
+    pool = ActorPool(ctx, env_fns,
+                     partial(make_network, args, state_shape, num_actions),
+                     EmptyNoise, scope, buffer, parameters)
+
+    # metrics
+    saver = tf.train.Saver()
+    checkpoint = AsyncCheckpointWriter() if args.async_checkpoint else saver
+    metrics = Metrics(args.name, args.log_adapter, checkpoint)
+    if args.async_log:
+        logger.start_async()
+
+    # controller to update the network
+    controller = SACController(network, buffer, metrics, EmptyNoise(),
+                               num_actions, args.batch_size,
+                               args.final_steps, args.log_interval,
+                               args.save_interval, args.eval_interval,
+                               args.updates_per_step, args.update_every)
+    learner = Learner(controller, pool, parameters, scope,
+                      args.publish_interval, args.log_interval,
+                      args.save_interval)
+
+    # save hyperparameters
+    metrics.log_parameters(vars(args))
+
+    with tf.Session() as sess:
+        sess.run(tf.global_variables_initializer())
+
+        if args.load is not None:
+            saver.restore(sess, args.load)
+            # shared replay snapshot is saved next to checkpoints
+            buffer_path = os.path.join(os.path.dirname(args.load),
+                                       'buffer.npz')
+            if os.path.exists(buffer_path):
+                buffer.restore(np.load(buffer_path))
 
+        try:
+            # the restored policy is published before actors start
+            learn(learner)
+        finally:
+            # the last snapshot is written before the writer stops
+            if args.async_checkpoint:
+                checkpoint.close()
 
 def main(args):
     # environment
-    env = MuJoCoWrapper(gym.make(args.env), args.reward_scale, args.render)
-    eval_env = MuJoCoWrapper(gym.make(args.env))
+    if args.num_envs > 1:
+        env = BatchEnvWrapper(
+            make_envs(args.env, args.num_envs, args.reward_scale), args.render)
+        eval_env = BatchEnvWrapper(make_envs(args.env, args.num_envs))
+    else:
+        env = MuJoCoWrapper(gym.make(args.env), args.reward_scale, args.render)
+        eval_env = MuJoCoWrapper(gym.make(args.env))
     num_actions = env.action_space.shape[0]
 
     # deep neural network
     network = SACNetwork(args.layers, args.concat_index,
                          env.observation_space.shape, num_actions, args.gamma,
-                         args.tau, args.pi_lr, args.q_lr, args.v_lr, args.reg)
+                         args.tau, args.pi_lr, args.q_lr, args.v_lr, args.reg,
+                         args.fused_update,
+                         args.updates_per_step * args.update_every,
+                         args.numpy_infer, args.flat_target_update)
+    if args.trace_interval > 0 or args.trace_infer_interval > 0:
+        network.tracer = Tracer(args.trace_interval,
+                                args.trace_infer_interval)
 
     # replay buffer
-    buffer = Buffer(args.buffer_size)
+    if args.prioritize:
+        buffer = PrioritizedBuffer(args.buffer_size, args.alpha, args.beta,
+                                   num_envs=args.num_envs)
+    elif args.memmap:
+        buffer = MemmapBuffer(args.buffer_size, args.buffer_dir,
+                              args.cache_size, args.num_envs)
+    else:
+        buffer = ArrayBuffer(args.buffer_size, args.num_envs)
 
     # metrics
     saver = tf.train.Saver()
-    metrics = Metrics(args.name, args.log_adapter, saver)
+    checkpoint = AsyncCheckpointWriter() if args.async_checkpoint else saver
+    metrics = Metrics(args.name, args.log_adapter, checkpoint)
+    if args.async_log:
+        logger.start_async()
 
     # exploration noise
     noise = EmptyNoise()
@@ -40,14 +163,26 @@ def main(args):
     controller = SACController(network, buffer, metrics, noise, num_actions,
                                args.batch_size, args.final_steps,
                                args.log_interval, args.save_interval,
-                               args.eval_interval)
+                               args.eval_interval, args.updates_per_step,
+                               args.update_every)
 
     # view
     view = View(controller)
 
     # evaluation
-    eval_controller = EvalController(network, metrics, args.eval_episode)
-    eval_view = View(eval_controller)
+    if args.async_eval:
+        # evaluation runs on a copy of the network in background
+        evaluator = AsyncEvaluator(
+            eval_env, network,
+            partial(make_network, args, env.observation_space.shape,
+                    num_actions),
+            network.policy_scope, metrics, args.eval_episode,
+            batch=args.num_envs > 1)
+        eval_view = None
+    else:
+        evaluator = None
+        eval_controller = EvalController(network, metrics, args.eval_episode)
+        eval_view = View(eval_controller)
 
     # save hyperparameters
     metrics.log_parameters(vars(args))
@@ -60,8 +195,27 @@ def main(args):
 
         if args.load is not None:
             saver.restore(sess, args.load)
+            # replay buffer snapshot is saved next to checkpoints
+            buffer_path = os.path.join(os.path.dirname(args.load),
+                                       'buffer.npz')
+            if os.path.exists(buffer_path):
+                buffer.restore(np.load(buffer_path))
 
-        interact(env, view, eval_env, eval_view)
+        try:
+            if args.num_envs > 1:
+                batch_interact(env, view, eval_env, eval_view,
+                               evaluator=evaluator)
+            else:
+                interact(env, view, eval_env, eval_view,
+                         evaluator=evaluator)
+        finally:
+            if evaluator is not None:
+                evaluator.close()
+            env.close()
+            eval_env.close()
+            # the last snapshot is written before the writer stops
+            if args.async_checkpoint:
+                checkpoint.close()
 
 if __name__ == '__main__':
     parser = argparse.ArgumentParser()
@@ -87,6 +241,18 @@ if __name__ == '__main__':
                         help='policy reguralization')
     parser.add_argument('--buffer-size', type=int, default=10 ** 6,
                         help='size of replay buffer')
+    parser.add_argument('--prioritize', action='store_true',
+                        help='use prioritized experience replay')
+    parser.add_argument('--alpha', type=float, default=0.6,
+                        help='prioritization exponent')
+    parser.add_argument('--beta', type=float, default=0.4,
+                        help='importance sampling exponent')
+    parser.add_argument('--memmap', action='store_true',
+                        help='store replay buffer in memory-mapped files')
+    parser.add_argument('--buffer-dir', type=str,
+                        help='directory of memory-mapped buffer to reopen')
+    parser.add_argument('--cache-size', type=int, default=10 ** 4,
+                        help='the number of latest transitions kept in memory')
     parser.add_argument('--batch-size', type=int, default=256,
                         help='batch size')
     parser.add_argument('--final-steps', type=int, default=10 ** 6,
@@ -105,5 +271,48 @@ if __name__ == '__main__':
     parser.add_argument('--load', type=str, help='path to model file')
     parser.add_argument('--render', action='store_true',
                         help='show rendered frames')
+    parser.add_argument('--fused-update', action='store_true',
+                        help='run all updates of a step in one session call')
+    parser.add_argument('--num-envs', type=int, default=1,
+                        help='the number of environments')
+    parser.add_argument('--updates-per-step', type=int, default=1,
+                        help='gradient steps per environment step')
+    parser.add_argument('--update-every', type=int, default=1,
+                        help='interval of environment steps between updates')
+    parser.add_argument('--num-actors', type=int, default=0,
+                        help='the number of actor processes (0 to disable)')
+    parser.add_argument('--publish-interval', type=int, default=100,
+                        help='interval of updates to publish parameters')
+    parser.add_argument('--start-method', type=str, default='spawn',
+                        help='start method of actor processes')
+    parser.add_argument('--async-eval', action='store_true',
+                        help='evaluate in background without blocking')
+    parser.add_argument('--numpy-infer', action='store_true',
+                        help='infer actions with NumPy instead of session')
+    parser.add_argument('--async-checkpoint', action='store_true',
+                        help='write checkpoints in background')
+    parser.add_argument('--async-log', action='store_true',
+                        help='write metrics in background')
+    parser.add_argument('--profile', action='store_true',
+                        help='log time spent in each phase of training')
+    parser.add_argument('--trace-interval', type=int, default=0,
+                        help='interval of updates to capture TF traces')
+    parser.add_argument('--trace-infer-interval', type=int, default=0,
+                        help='interval of inferences to capture TF traces')
+    parser.add_argument('--flat-target-update', action='store_true',
+                        help='store target updated layers in flat variables')
     args = parser.parse_args()
-    main(args)
+    if args.memmap and args.prioritize:
+        parser.error('--memmap cannot be combined with --prioritize')
+    if args.num_actors > 0:
+        # the learner samples from the shared buffer and does not evaluate
+        for flag in ['prioritize', 'memmap', 'async_eval']:
+            if getattr(args, flag):
+                parser.error('--{} cannot be combined with --num-actors'
+                             .format(flag.replace('_', '-')))
+    if args.profile:
+        profiler.enable()
+    if args.num_actors > 0:
+        actor_learner(args)
+    else:
+        main(args)
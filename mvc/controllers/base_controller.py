@@ -1,15 +1,21 @@
+import mvc.misc.profiler as profiler
+
+
 class BaseController:
     def __init__(self,
                  metrics,
                  final_steps,
                  log_interval,
                  save_interval,
-                 eval_interval):
+                 eval_interval,
+                 buffer=None):
         self.metrics = metrics
         self.final_steps = final_steps
         self.log_interval = log_interval
         self.save_interval = save_interval
         self.eval_interval = eval_interval
+        self.buffer = buffer
+        self.reports = []
 
     def step(self, obs, reward, done, info):
         raise NotImplementedError('implement step function')
@@ -29,11 +35,29 @@ class BaseController:
     def log(self):
         raise NotImplementedError('implement log function')
 
+    def report(self, name, value):
+        if name not in self.reports:
+            self.metrics.register(name, 'queue')
+            self.reports.append(name)
+        self.metrics.add(name, value)
+
+    def log_reports(self):
+        step = self.metrics.get('step')
+        for name in self.reports:
+            self.metrics.log_metric(name, step)
+        profiler.log(self.metrics, step)
+
     def should_save(self):
         return self.metrics.get('step') % self.save_interval == 0
 
     def save(self):
-        self.metrics.save_model(self.metrics.get('step'))
+        step = self.metrics.get('step')
+        self.metrics.save_model(step)
+        if self.buffer is not None:
+            self.metrics.save_buffer(self.buffer, step)
+
+    def flush(self):
+        self.metrics.flush()
 
     def is_finished(self):
         return self.metrics.get('step') >= self.final_steps
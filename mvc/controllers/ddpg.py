@@ -1,7 +1,7 @@
 import numpy as np
 
 from mvc.models.metrics import Metrics
-from mvc.models.buffer import Buffer
+from mvc.models.prioritized_buffer import PrioritizedBuffer
 from mvc.models.networks.base_network import BaseNetwork
 from mvc.controllers.base_controller import BaseController
 
@@ -17,9 +17,12 @@ class DDPGController(BaseController):
                  final_steps=10 ** 6,
                  log_interval=1000,
                  save_interval=10 ** 5,
-                 eval_interval=10 ** 5):
+                 eval_interval=10 ** 5,
+                 updates_per_step=1,
+                 update_every=1):
         assert isinstance(network, BaseNetwork)
-        assert isinstance(buffer, Buffer)
+        # the shared replay of actors is not a Buffer subclass
+        assert hasattr(buffer, 'add') and hasattr(buffer, 'fetch')
         assert isinstance(metrics, Metrics)
 
         self.network = network
@@ -28,11 +31,17 @@ class DDPGController(BaseController):
         self.noise = noise
         self.num_actions = num_actions
         self.batch_size = batch_size
+        self.update_every = update_every
+        # gradient steps run by the network in a single update call
+        self.num_updates = updates_per_step * update_every
+        self.num_steps = 0
+        # step count before the latest environment step
+        self.last_step = -1
 
         self._register_metrics()
 
         super().__init__(metrics, final_steps, log_interval,
-                         save_interval, eval_interval)
+                         save_interval, eval_interval, buffer)
 
     def _register_metrics(self):
         self.metrics.register('step', 'single')
@@ -47,31 +56,73 @@ class DDPGController(BaseController):
     def step(self, obs, reward, done, info):
         # infer action
         output = self.network.infer(obs_t=obs)
+
+        # batch training with auto-reset environments
+        if isinstance(done, np.ndarray):
+            # restart exploration of environments starting new episodes
+            self.noise.reset(done == 1.0)
+            action = output.action + self.noise()
+            self.buffer.add_batch(obs, action, reward, done)
+            self.last_step = self.metrics.get('step')
+            self.metrics.add('step', done.shape[0])
+            ended = np.flatnonzero(done == 1.0)
+            self.metrics.add_many('reward',
+                                  [info[i]['reward'] for i in ended])
+            self.num_steps += 1
+            return action
+
         # action with exploration noise
         action = output.action + self.noise()
         # store trajectory
         self.buffer.add(obs, action, reward, 0.0)
         # record metrics
+        self.last_step = self.metrics.get('step')
         self.metrics.add('step', 1)
+        self.num_steps += 1
         return action
 
     def should_update(self):
-        return self.buffer.size() > self.batch_size
+        if self.num_steps % self.update_every != 0:
+            return False
+        return self.buffer.size() > self.batch_size * self.num_updates
 
     def update(self):
         assert self.should_update()
 
-        # sample batch from replay buffer
-        batch = self.buffer.fetch(self.batch_size)
+        # sample batches for all gradient steps at once
+        batch_size = self.batch_size * self.num_updates
+        if isinstance(self.buffer, PrioritizedBuffer):
+            # gradient steps take consecutive batches in the fetched order
+            batch = self.buffer.fetch(batch_size, self.num_updates)
+        else:
+            batch = self.buffer.fetch(batch_size)
 
         # update
         loss = self.network.update(**batch)
 
+        # update priorities with new td errors
+        if 'indices_t' in batch:
+            self.buffer.update_priorities(batch['indices_t'], loss[-1])
+
         # record metrics
         self._record_update_metrics(*loss)
 
         return loss
 
+    def should_log(self):
+        return self._crossed(self.log_interval)
+
+    def should_save(self):
+        return self._crossed(self.save_interval)
+
+    def should_eval(self):
+        return self._crossed(self.eval_interval)
+
+    def _crossed(self, interval):
+        # batch steps advance by the number of environments
+        step = self.metrics.get('step')
+        return step // interval > self.last_step // interval
+
     def log(self):
         step = self.metrics.get('step')
         self.metrics.log_metric('reward', step)
@@ -14,6 +14,8 @@ class EvalController(BaseController):
         self.network = network
         self.metrics = metrics
         self.num_episodes = num_episodes
+        # step at which evaluated parameters were taken
+        self.snapshot_step = None
 
         self.metrics.register('eval_reward', 'queue')
         self.metrics.register('eval_episode', 'single')
@@ -53,7 +55,9 @@ class EvalController(BaseController):
     def is_finished(self):
         is_finished = self.metrics.get('eval_episode') >= self.num_episodes
         if is_finished:
-            step = self.metrics.get('step')
+            step = self.snapshot_step
+            if step is None:
+                step = self.metrics.get('step')
             self.metrics.log_metric('eval_reward', step)
             self.metrics.reset('eval_episode')
             self.metrics.reset('eval_reward')
@@ -67,3 +71,6 @@ class EvalController(BaseController):
 
     def save(self):
         pass
+
+    def flush(self):
+        pass
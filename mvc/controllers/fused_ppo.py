@@ -0,0 +1,20 @@
+import numpy as np
+
+from mvc.controllers.ppo import PPOController
+
+
+class FusedPPOController(PPOController):
+    def update(self):
+        assert self.should_update()
+
+        # all epochs of minibatch updates run in a single session call
+        losses = self.network.fused_update(self.epoch, **self._flatten())
+        mean_loss = np.mean(losses)
+
+        # flush stored trajectories
+        self.rollout.flush()
+
+        # record metrics
+        self.metrics.add('loss', mean_loss)
+
+        return mean_loss
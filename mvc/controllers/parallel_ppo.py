@@ -0,0 +1,61 @@
+import numpy as np
+
+from mvc.controllers.ppo import PPOController
+
+
+class ParallelPPOController(PPOController):
+    def __init__(self, network, rollout, metrics, communicator, *args,
+                 **kwargs):
+        # other arguments are the same as PPOController
+        # batch_size is the shard of each minibatch owned by this worker
+        super().__init__(network, rollout, metrics, *args, **kwargs)
+        self.allreduce = communicator.allreduce
+        self.rank = communicator.rank
+        # step before the latest record to detect crossed intervals
+        self.last_step = -1
+
+    def record(self, obs, reward, done, info, output):
+        self.rollout.add(obs, output.action, reward,
+                         output.value, output.log_prob, done)
+
+        # steps are counted over all workers
+        self.last_step = self.metrics.get('step')
+        self.metrics.add('step', self.num_envs * self.allreduce.num_workers)
+        ended = np.flatnonzero(np.asarray(done) == 1.0)
+        self.metrics.add_many('reward', [info[i]['reward'] for i in ended])
+
+    def update(self):
+        assert self.should_update()
+
+        losses = []
+        for _ in range(self.epoch):
+            for batch in self._batches():
+                loss, gradients = self.network.compute_gradients(**batch)
+                # every worker applies the same averaged gradients
+                values = self.allreduce.mean(self.rank, [loss] + gradients)
+                self.network.apply_gradients(values[1:])
+                losses.append(values[0])
+        mean_loss = np.mean(losses)
+
+        # flush stored trajectories
+        self.rollout.flush()
+
+        # record metrics
+        self.metrics.add('loss', mean_loss)
+
+        return mean_loss
+
+    # only the first worker logs, saves and evaluates
+    def should_log(self):
+        return self.rank == 0 and self._crossed(self.log_interval)
+
+    def should_save(self):
+        return self.rank == 0 and self._crossed(self.save_interval)
+
+    def should_eval(self):
+        return self.rank == 0 and self._crossed(self.eval_interval)
+
+    def _crossed(self, interval):
+        # steps of all workers do not always divide the intervals
+        step = self.metrics.get('step')
+        return step // interval > self.last_step // interval
@@ -46,18 +46,23 @@ class PPOController(BaseController):
 
     def step(self, obs, reward, done, info):
         # infer action, policy, value
-        output = self.network.infer(obs_t=obs)
+        output = self.infer(obs)
+        self.record(obs, reward, done, info, output)
+        return output.action
+
+    # step is split into infer and record for the pipelined batch loop
+    def infer(self, obs):
+        return self.network.infer(obs_t=obs)
+
+    def record(self, obs, reward, done, info, output):
         # store trajectory
         self.rollout.add(obs, output.action, reward,
                          output.value, output.log_prob, done)
 
         # record metrics
         self.metrics.add('step', self.num_envs)
-        for i in range(self.num_envs):
-            if done[i] == 1.0:
-                self.metrics.add('reward', info[i]['reward'])
-
-        return output.action
+        ended = np.flatnonzero(np.asarray(done) == 1.0)
+        self.metrics.add_many('reward', [info[i]['reward'] for i in ended])
 
     def should_update(self):
         return self.rollout.size() - 1 == self.time_horizon
@@ -90,12 +95,16 @@ class PPOController(BaseController):
         pass
 
     def _batches(self):
+        data_size = self.time_horizon * self.num_envs
+        return make_batch(self._flatten(), self.batch_size, data_size)
+
+    def _flatten(self):
         traj = self.rollout.fetch(self.gamma, self.lam)
 
         # flatten
         data_size = self.time_horizon * self.num_envs
         state_shape = traj['obs_t'].shape[2:]
-        data = {
+        return {
             'obs_t': np.reshape(traj['obs_t'], (data_size,) + state_shape),
             'actions_t': np.reshape(traj['actions_t'], (data_size, -1)),
             'log_probs_t': np.reshape(traj['log_probs_t'], (-1,)),
@@ -103,5 +112,3 @@ class PPOController(BaseController):
             'advantages_t': np.reshape(traj['advantages_t'], (-1,)),
             'values_t': np.reshape(traj['values_t'], (-1,))
         }
-
-        return make_batch(data, self.batch_size, data_size)
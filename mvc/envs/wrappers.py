@@ -1,5 +1,8 @@
+import multiprocessing
 import numpy as np
 
+from mvc.misc.shared_array import shared_array, as_array
+
 
 class BatchEnvWrapper:
     def __init__(self, envs, render=False):
@@ -8,14 +11,26 @@ class BatchEnvWrapper:
         self.observation_space = envs[0].observation_space
         self.action_space = envs[0].action_space
         self.sum_of_rewards = [0.0 for _ in envs]
+        self.actions = {}
 
     def step(self, action):
+        self.step_async(action)
+        return self.step_wait()
+
+    def step_async(self, action, indices=None):
+        indices = range(len(self.envs)) if indices is None else indices
+        for i, index in enumerate(indices):
+            self.actions[index] = action[i]
+
+    def step_wait(self, indices=None):
+        indices = range(len(self.envs)) if indices is None else indices
         obs_t = []
         rewards_t = []
         dones_t = []
         infos_t = []
-        for i, env in enumerate(self.envs):
-            obs, reward, done, info = env.step(action[i])
+        for i in indices:
+            env = self.envs[i]
+            obs, reward, done, info = env.step(self.actions.pop(i))
             self.sum_of_rewards[i] += reward
             if done:
                 obs = env.reset()
@@ -26,7 +41,7 @@ class BatchEnvWrapper:
             rewards_t.append(reward)
             dones_t.append(done)
             infos_t.append(info)
-        if self.render:
+        if self.render and 0 in indices:
             self.envs[0].render()
         return np.array(obs_t), np.array(rewards_t), np.array(dones_t), infos_t
 
@@ -36,6 +51,134 @@ class BatchEnvWrapper:
             obs_t.append(env.reset())
         return np.array(obs_t)
 
+    def close(self):
+        for env in self.envs:
+            env.close()
+
+
+def _worker(remote, parent_remote, env_fn, index, shared_obs,
+            shared_rewards, shared_dones):
+    parent_remote.close()
+    env = env_fn()
+    obs_t = as_array(shared_obs)
+    rewards_t = as_array(shared_rewards)
+    dones_t = as_array(shared_dones)
+    sum_of_rewards = 0.0
+    try:
+        while True:
+            command, data = remote.recv()
+            if command == 'step':
+                obs, reward, done, info = env.step(data)
+                sum_of_rewards += reward
+                if done:
+                    obs = env.reset()
+                    info['reward'] = sum_of_rewards
+                    sum_of_rewards = 0.0
+                obs_t[index] = obs
+                rewards_t[index] = reward
+                dones_t[index] = 1.0 if done else 0.0
+                remote.send(info)
+            elif command == 'reset':
+                obs_t[index] = env.reset()
+                remote.send(None)
+            elif command == 'render':
+                env.render()
+                remote.send(None)
+            elif command == 'close':
+                remote.send(None)
+                break
+    except KeyboardInterrupt:
+        pass
+
+
+class SubprocBatchEnvWrapper:
+    def __init__(self, env_fns, render=False, copy_obs=True,
+                 start_method=None):
+        ctx = multiprocessing.get_context(start_method)
+        # spaces are taken from a local instance before forking workers
+        env = env_fns[0]()
+        self.observation_space = env.observation_space
+        self.action_space = env.action_space
+        env.close()
+
+        self.render = render
+        self.copy_obs = copy_obs
+        self.num_envs = len(env_fns)
+
+        obs_shape = (self.num_envs,) + tuple(self.observation_space.shape)
+        # environments often return float64 for spaces declared as float32
+        obs_dtype = self.observation_space.dtype
+        if np.issubdtype(obs_dtype, np.floating):
+            obs_dtype = np.float64
+        shared_obs = shared_array(ctx, obs_shape, obs_dtype)
+        shared_rewards = shared_array(ctx, (self.num_envs,), np.float64)
+        shared_dones = shared_array(ctx, (self.num_envs,), np.float64)
+        self.obs_t = as_array(shared_obs)
+        self.rewards_t = as_array(shared_rewards)
+        self.dones_t = as_array(shared_dones)
+
+        self.remotes = []
+        self.processes = []
+        for i, env_fn in enumerate(env_fns):
+            remote, worker_remote = ctx.Pipe()
+            args = (worker_remote, remote, env_fn, i, shared_obs,
+                    shared_rewards, shared_dones)
+            process = ctx.Process(target=_worker, args=args, daemon=True)
+            process.start()
+            worker_remote.close()
+            self.remotes.append(remote)
+            self.processes.append(process)
+        self.closed = False
+
+    def step(self, action):
+        self.step_async(action)
+        return self.step_wait()
+
+    def step_async(self, action, indices=None):
+        indices = range(self.num_envs) if indices is None else indices
+        for i, index in enumerate(indices):
+            self.remotes[index].send(('step', action[i]))
+
+    def step_wait(self, indices=None):
+        if indices is None:
+            infos_t = [remote.recv() for remote in self.remotes]
+            obs_t = self._obs()
+            rewards_t = self.rewards_t.copy()
+            dones_t = self.dones_t.copy()
+        else:
+            infos_t = [self.remotes[i].recv() for i in indices]
+            obs_t = self.obs_t[indices]
+            rewards_t = self.rewards_t[indices]
+            dones_t = self.dones_t[indices]
+        if self.render and (indices is None or 0 in indices):
+            self.remotes[0].send(('render', None))
+            self.remotes[0].recv()
+        return obs_t, rewards_t, dones_t, infos_t
+
+    def reset(self):
+        for remote in self.remotes:
+            remote.send(('reset', None))
+        for remote in self.remotes:
+            remote.recv()
+        return self._obs()
+
+    def close(self):
+        if self.closed:
+            return
+        for remote in self.remotes:
+            remote.send(('close', None))
+        for remote in self.remotes:
+            remote.recv()
+        for process in self.processes:
+            process.join()
+        self.closed = True
+
+    def _obs(self):
+        # without copy, observations are overwritten by the next step
+        if self.copy_obs:
+            return self.obs_t.copy()
+        return self.obs_t
+
 
 class MuJoCoWrapper:
     def __init__(self, env, reward_scale=1.0, render=False):
@@ -65,3 +208,6 @@ class MuJoCoWrapper:
 
     def render(self, mode='human'):
         return self.env.render(mode)
+
+    def close(self):
+        self.env.close()
@@ -1,5 +1,9 @@
+import time
 import numpy as np
 
+import mvc.misc.profiler as profiler
+from mvc.action_output import ActionOutput
+
 
 def initial_inputs(env):
     obs = env.reset()
@@ -11,7 +15,8 @@ def initial_inputs(env):
 
 def step(env, view, obs, reward, done, info):
     action = view.step(obs, reward, done, info)
-    obs, reward, done, info = env.step(action)
+    with profiler.phase('env_step'):
+        obs, reward, done, info = env.step(action)
     return obs, reward, done, info
 
 
@@ -27,6 +32,66 @@ def batch_loop(env, view, hook=None):
             break
 
 
+def _concat_outputs(outputs):
+    return ActionOutput(*[np.concatenate(values) for values in zip(*outputs)])
+
+
+def _step_half(env, view, inputs, started, i, half):
+    # returns (time blocked in step_wait, time the half was in flight)
+    waiting = in_flight = 0.0
+    if started[i] is not None:
+        wait_start = time.perf_counter()
+        with profiler.phase('env_step'):
+            inputs[i] = env.step_wait(half)
+        wait_end = time.perf_counter()
+        waiting = wait_end - wait_start
+        in_flight = wait_end - started[i]
+    output = view.infer(inputs[i][0])
+    env.step_async(output.action, half)
+    started[i] = time.perf_counter()
+    return output, waiting, in_flight
+
+
+def _record_halves(view, inputs, outputs):
+    # record the whole batch as the serial loop does
+    obs = np.concatenate([inpt[0] for inpt in inputs])
+    reward = np.concatenate([inpt[1] for inpt in inputs])
+    done = np.concatenate([inpt[2] for inpt in inputs])
+    info = inputs[0][3] + inputs[1][3]
+    view.record(obs, reward, done, info, _concat_outputs(outputs))
+
+
+def pipelined_batch_loop(env, view, hook=None):
+    obs, reward, done, _ = initial_inputs(env)
+    assert obs.shape[0] > 1, 'pipelining needs at least two environments'
+    # one half is inferred while the other half is simulated
+    halves = np.array_split(np.arange(obs.shape[0]), 2)
+    inputs = [(obs[h], reward[h], done[h], [{} for _ in h]) for h in halves]
+    started = [None, None]
+    while True:
+        view.prepare_step()
+
+        steps = [_step_half(env, view, inputs, started, i, half)
+                 for i, half in enumerate(halves)]
+        outputs, waiting, in_flight = zip(*steps)
+
+        _record_halves(view, inputs, outputs)
+
+        # fraction of simulation hidden behind inference
+        if sum(in_flight) > 0.0:
+            view.report('overlap', 1.0 - sum(waiting) / sum(in_flight))
+
+        if hook is not None:
+            hook(view)
+
+        if view.is_finished():
+            break
+
+    # leave no environment in flight
+    for half in halves:
+        env.step_wait(half)
+
+
 def loop(env, view, hook=None):
     while True:
         obs = env.reset()
@@ -45,22 +110,35 @@ def loop(env, view, hook=None):
         view.stop_episode(obs, reward, info)
 
 
-def batch_interact(env, view, eval_env=None, eval_view=None, hook=None):
+def batch_interact(env, view, eval_env=None, eval_view=None, hook=None,
+                   pipeline=False, evaluator=None):
     def _hook(view):
         if eval_view is not None and view.should_eval():
             batch_loop(eval_env, eval_view)
 
+        # evaluation in background does not block training
+        if evaluator is not None and view.should_eval():
+            evaluator.evaluate()
+
         if hook is not None:
             hook(view)
 
-    batch_loop(env, view, _hook)
+    if pipeline:
+        pipelined_batch_loop(env, view, _hook)
+    else:
+        batch_loop(env, view, _hook)
 
 
-def interact(env, view, eval_env=None, eval_view=None, hook=None):
+def interact(env, view, eval_env=None, eval_view=None, hook=None,
+             evaluator=None):
     def _hook(view):
         if eval_view is not None and view.should_eval():
             loop(eval_env, eval_view)
 
+        # evaluation in background does not block training
+        if evaluator is not None and view.should_eval():
+            evaluator.evaluate()
+
         if hook is not None:
             hook(view)
 
@@ -1,14 +1,18 @@
+import atexit
 import json
 import csv
 import logging
 import os
+import threading
 
 from datetime import datetime
 
+import numpy as np
 import tensorflow as tf
 
 from mvc.logger.visdom_adapter import VisdomAdapter
 from mvc.logger.tfboard_adapter import TfBoardAdapter
+from mvc.logger.metric_writer import MetricWriter, QUEUE_SIZE, BLOCKED_PUTS
 # from mvc.logger.comet_ml_adapter import CometMlAdapter
 
 
@@ -20,12 +24,18 @@ SETTING = {
     'adapter': None,
     'verbose': True,
     'writers': {},
+    'files': {},
     'experiment_name': None,
-    'disable': False
+    'disable': False,
+    'buffer_writer': None,
+    'metric_writer': None
 }
 
+# metrics are also written from background threads such as evaluation
+LOCK = threading.Lock()
 
-def _get_dir():
+
+def get_dir():
     return os.path.join(SETTING['path'], SETTING['experiment_name'])
 
 
@@ -36,16 +46,36 @@ def _prepare_dir(directory):
 
 def _write_csv(name, metric, step):
     if name not in SETTING['writers']:
-        directory = _get_dir()
+        directory = get_dir()
         _prepare_dir(directory)
         path = os.path.join(directory, name + '.csv')
         file = open(path, 'w')
+        SETTING['files'][name] = file
         SETTING['writers'][name] = csv.writer(file, lineterminator='\n')
     SETTING['writers'][name].writerow([step, metric])
 
 
+def _write_metrics(records):
+    with LOCK:
+        if SETTING['adapter'] is not None:
+            SETTING['adapter'].log_metrics(records)
+
+        for name, metric, step in records:
+            if SETTING['verbose']:
+                LOGGER.debug('step=%d %s=%f', step, name, metric)
+            _write_csv(name, metric, step)
+
+
+def _flush_files():
+    with LOCK:
+        if SETTING['adapter'] is not None:
+            SETTING['adapter'].flush()
+        for file in SETTING['files'].values():
+            file.flush()
+
+
 def _write_hyper_params(parameters):
-    directory = _get_dir()
+    directory = get_dir()
     _prepare_dir(directory)
     path = os.path.join(directory, 'hyper_params.json')
     with open(path, 'w') as file:
@@ -68,7 +98,7 @@ def set_adapter(adapter, experiment_name, config_path='config.json'):
             environment=config['visdom']['environment'],
             experiment_name=SETTING['experiment_name'])
     elif adapter == 'tfboard':
-        SETTING['adapter'] = TfBoardAdapter(_get_dir())
+        SETTING['adapter'] = TfBoardAdapter(get_dir())
     elif adapter == 'comet_ml':
         assert KeyError('comet ml is not supported for this version')
     else:
@@ -119,12 +149,92 @@ def save_model(saver, step):
     if SETTING['disable']:
         return
     sess = tf.get_default_session()
-    directory = _get_dir()
+    directory = get_dir()
     _prepare_dir(directory)
     path = os.path.join(directory, 'model.ckpt')
     saver.save(sess, path, global_step=step)
 
 
+def save_trace(name, chrome_trace):
+    if SETTING['disable']:
+        return
+    directory = os.path.join(get_dir(), 'traces')
+    _prepare_dir(directory)
+    path = os.path.join(directory, name + '.json')
+    with open(path, 'w') as file:
+        file.write(chrome_trace)
+
+
+def _write_buffer(path, snapshot, step):
+    # write to temporary file first not to break the previous snapshot
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as file:
+        np.savez(file, step=step, **snapshot)
+    os.replace(tmp_path, path)
+
+
+def save_buffer(buffer, step):
+    if SETTING['disable']:
+        return
+    snapshot = buffer.snapshot()
+    if snapshot is None:
+        return
+    directory = get_dir()
+    _prepare_dir(directory)
+    path = os.path.join(directory, 'buffer.npz')
+
+    # keep at most one snapshot in flight
+    if SETTING['buffer_writer'] is not None:
+        SETTING['buffer_writer'].join()
+    writer = threading.Thread(target=_write_buffer,
+                              args=(path, snapshot, step))
+    writer.start()
+    SETTING['buffer_writer'] = writer
+
+
+def start_async(max_queue=10000, flush_interval=1.0):
+    if SETTING['metric_writer'] is not None:
+        return
+    register(QUEUE_SIZE)
+    register(BLOCKED_PUTS)
+    SETTING['metric_writer'] = MetricWriter(
+        _write_metrics, _flush_files, max_queue, flush_interval)
+
+
+def stop_async():
+    if SETTING['metric_writer'] is None:
+        return
+    SETTING['metric_writer'].close()
+    SETTING['metric_writer'] = None
+
+
+def close():
+    stop_async()
+    _flush_files()
+    with LOCK:
+        for file in SETTING['files'].values():
+            file.close()
+        SETTING['files'] = {}
+        SETTING['writers'] = {}
+
+
+# metrics left in the queue are written and files are closed before exit
+atexit.register(close)
+
+
+def flush(saver=None):
+    # wait for checkpoints and snapshots written in background
+    if saver is not None and hasattr(saver, 'flush'):
+        saver.flush()
+    if SETTING['buffer_writer'] is not None:
+        SETTING['buffer_writer'].join()
+        SETTING['buffer_writer'] = None
+    if SETTING['metric_writer'] is not None:
+        SETTING['metric_writer'].flush()
+    else:
+        _flush_files()
+
+
 def log_metric(name, metric, step):
     assert isinstance(name, str)
     assert isinstance(step, int)
@@ -132,13 +242,10 @@ def log_metric(name, metric, step):
     if SETTING['disable']:
         return
 
-    if SETTING['adapter'] is not None:
-        SETTING['adapter'].log_metric(name, metric, step)
-
-    if SETTING['verbose']:
-        LOGGER.debug('step=%d %s=%f', step, name, metric)
-
-    _write_csv(name, metric, step)
+    if SETTING['metric_writer'] is not None:
+        SETTING['metric_writer'].put((name, metric, step))
+    else:
+        _write_metrics([(name, metric, step)])
 
 
 def register(name):
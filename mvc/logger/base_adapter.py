@@ -8,5 +8,12 @@ class BaseAdapter:
     def log_metric(self, name, metric, step):
         raise NotImplementedError()
 
+    def log_metrics(self, records):
+        for name, metric, step in records:
+            self.log_metric(name, metric, step)
+
     def register(self, name):
         raise NotImplementedError()
+
+    def flush(self):
+        pass
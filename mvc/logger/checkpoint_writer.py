@@ -0,0 +1,84 @@
+import logging
+import queue
+import threading
+import tensorflow as tf
+
+
+LOGGER = logging.getLogger(__name__)
+
+
+class AsyncCheckpointWriter:
+    def __init__(self, var_list=None, max_to_keep=5, max_queue=1):
+        if var_list is None:
+            var_list = tf.global_variables()
+        self.var_list = var_list
+        self.error = None
+
+        # snapshots are written from copies in a separate graph
+        self.graph = tf.Graph()
+        with self.graph.as_default():
+            self.phs = []
+            assigns = []
+            copies = {}
+            for variable in var_list:
+                dtype = variable.dtype.base_dtype
+                copy = tf.Variable(tf.zeros(variable.shape, dtype),
+                                   trainable=False)
+                placeholder = tf.placeholder(dtype, variable.shape)
+                assigns.append(tf.assign(copy, placeholder))
+                self.phs.append(placeholder)
+                # names match checkpoints of the default saver
+                copies[variable.op.name] = copy
+            self.assign = tf.group(*assigns)
+            self.saver = tf.train.Saver(copies, max_to_keep=max_to_keep)
+            config = tf.ConfigProto(intra_op_parallelism_threads=1,
+                                    inter_op_parallelism_threads=1)
+            self.sess = tf.Session(graph=self.graph, config=config)
+            self.sess.run(tf.global_variables_initializer())
+
+        # a slow disk blocks the next save instead of piling up snapshots
+        self.snapshots = queue.Queue(maxsize=max_queue)
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def save(self, sess, save_path, global_step=None):
+        self._raise_error()
+        values = sess.run(self.var_list)
+        self.snapshots.put((save_path, global_step, values))
+
+    def flush(self):
+        self.snapshots.join()
+        self._raise_error()
+
+    def close(self):
+        self.snapshots.join()
+        self.snapshots.put(None)
+        self.thread.join()
+        self.sess.close()
+
+    def _raise_error(self):
+        if self.error is not None:
+            error, self.error = self.error, None
+            raise error
+
+    def _run(self):
+        while True:
+            snapshot = self.snapshots.get()
+            if snapshot is None:
+                self.snapshots.task_done()
+                break
+            save_path, global_step, values = snapshot
+            try:
+                self.sess.run(self.assign,
+                              feed_dict=dict(zip(self.phs, values)))
+                self.saver.save(self.sess, save_path,
+                                global_step=global_step,
+                                write_meta_graph=False)
+            # any error is kept so that the thread never stops consuming
+            # snapshots and save, flush and close never hang
+            except Exception as error:  # pylint: disable=broad-except
+                LOGGER.exception('failed to write checkpoint')
+                # raised at the next save or flush in the training thread
+                self.error = error
+            finally:
+                self.snapshots.task_done()
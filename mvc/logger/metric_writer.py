@@ -0,0 +1,100 @@
+import logging
+import queue
+import threading
+import time
+
+
+LOGGER = logging.getLogger(__name__)
+
+QUEUE_SIZE = 'logger_queue_size'
+BLOCKED_PUTS = 'logger_blocked_puts'
+
+
+class MetricWriter:
+    def __init__(self,
+                 write_fn,
+                 flush_fn,
+                 max_queue=10000,
+                 flush_interval=1.0,
+                 max_batch=1000):
+        self.write_fn = write_fn
+        self.flush_fn = flush_fn
+        self.flush_interval = flush_interval
+        self.max_batch = max_batch
+        self.records = queue.Queue(maxsize=max_queue)
+        # callers flushing files do not interleave with the writer
+        self.lock = threading.Lock()
+        self.blocked_puts = 0
+        self.last_step = None
+        self.updated = False
+        self.closed = False
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def put(self, record):
+        try:
+            self.records.put_nowait(record)
+        except queue.Full:
+            # training waits for the writer instead of dropping metrics
+            self.blocked_puts += 1
+            self.records.put(record)
+
+    def flush(self):
+        self.records.join()
+        with self.lock:
+            self.flush_fn()
+
+    def close(self):
+        if self.closed:
+            return
+        self.records.put(None)
+        self.thread.join()
+        self.closed = True
+
+    def _run(self):
+        last_flush = time.perf_counter()
+        running = True
+        while running:
+            timeout = last_flush + self.flush_interval - time.perf_counter()
+            records = []
+            try:
+                records.append(self.records.get(timeout=max(timeout, 0.0)))
+                # records queued meanwhile are written as a single batch
+                while len(records) < self.max_batch:
+                    records.append(self.records.get_nowait())
+            except queue.Empty:
+                pass
+
+            num_records = len(records)
+            if None in records:
+                records.remove(None)
+                running = False
+
+            now = time.perf_counter()
+            try:
+                with self.lock:
+                    if records:
+                        self._write(records)
+                    if not running or now - last_flush >= self.flush_interval:
+                        self._write_stats()
+                        self.flush_fn()
+                        last_flush = now
+            # any adapter error is logged so that flush and close never hang
+            except Exception:  # pylint: disable=broad-except
+                LOGGER.exception('failed to write metrics')
+            finally:
+                for _ in range(num_records):
+                    self.records.task_done()
+
+    def _write(self, records):
+        self.write_fn(records)
+        self.last_step = records[-1][2]
+        self.updated = True
+
+    def _write_stats(self):
+        if not self.updated:
+            return
+        # backpressure is reported at the latest step written
+        self.write_fn([(QUEUE_SIZE, self.records.qsize(), self.last_step),
+                       (BLOCKED_PUTS, self.blocked_puts, self.last_step)])
+        self.updated = False
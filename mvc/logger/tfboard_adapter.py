@@ -6,27 +6,29 @@ from mvc.logger.base_adapter import BaseAdapter
 class TfBoardAdapter(BaseAdapter):
     def __init__(self, logdir):
         self.logdir = logdir
-        self.placeholders = {}
-        self.summaries = {}
-        self.writer = None
+        # summaries are built as protos without graph ops or sessions
+        self.writer = tf.summary.FileWriter(logdir)
 
     def log_parameters(self, hyper_params):
         pass
 
     def set_model_graph(self, graph):
-        self.writer = tf.summary.FileWriter(self.logdir, graph)
+        self.writer.add_graph(graph)
 
     def log_metric(self, name, metric, step):
-        assert self.writer is not None, 'call set_model_graph first'
+        self.log_metrics([(name, metric, step)])
 
-        sess = tf.get_default_session()
-        placeholder = self.placeholders[name]
-        summary = self.summaries[name]
-        feed_dict = {placeholder: metric}
-        out, _ = sess.run([summary, placeholder], feed_dict=feed_dict)
-        self.writer.add_summary(out, step)
+    def log_metrics(self, records):
+        # scalars of the same step are appended as one event
+        values = {}
+        for name, metric, step in records:
+            value = tf.Summary.Value(tag=name, simple_value=float(metric))
+            values.setdefault(step, []).append(value)
+        for step, step_values in values.items():
+            self.writer.add_summary(tf.Summary(value=step_values), step)
 
     def register(self, name):
-        placeholder = tf.placeholder(tf.float32, [], name=name)
-        self.placeholders[name] = placeholder
-        self.summaries[name] = tf.summary.scalar(name + '_smmry', placeholder)
+        pass
+
+    def flush(self):
+        self.writer.flush()
@@ -34,5 +34,20 @@ class VisdomAdapter(BaseAdapter):
         self.visdom.line([metric], [step], name=self.name,
                          update='append', win=name, opts=opts)
 
+    def log_metrics(self, records):
+        # points of the same metric are sent in one request
+        points = {}
+        for name, metric, step in records:
+            points.setdefault(name, ([], []))
+            points[name][0].append(metric)
+            points[name][1].append(step)
+        for name, (metrics, steps) in points.items():
+            opts = {
+                'showlegend': True,
+                'title': name
+            }
+            self.visdom.line(metrics, steps, name=self.name,
+                             update='append', win=name, opts=opts)
+
     def register(self, name):
         pass
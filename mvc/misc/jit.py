@@ -0,0 +1,50 @@
+import numpy as np
+
+try:
+    import numba
+except ImportError:
+    numba = None
+
+
+def numpy_reverse_scan(values, discounts, init, out):
+    carry = init
+    for i in reversed(range(values.shape[0])):
+        carry = out[i] = values[i] + discounts[i] * carry
+    return out
+
+
+if numba is not None:
+    @numba.njit(cache=True)
+    def _scan_kernel(values, discounts, init, out):
+        carry = init.copy()
+        for i in range(values.shape[0] - 1, -1, -1):
+            for j in range(values.shape[1]):
+                carry[j] = values[i, j] + discounts[i, j] * carry[j]
+                out[i, j] = carry[j]
+
+    def numba_reverse_scan(values, discounts, init, out):
+        length = values.shape[0]
+        if length == 0:
+            return out
+        # flatten trailing axes to call a single 2-D kernel
+        flat_out = out.reshape((length, -1))
+        width = flat_out.shape[1]
+        flat_values = np.ascontiguousarray(values, dtype=out.dtype)
+        flat_discounts = np.ascontiguousarray(discounts, dtype=out.dtype)
+        flat_init = np.broadcast_to(np.asarray(init, dtype=out.dtype),
+                                    out.shape[1:])
+        _scan_kernel(flat_values.reshape((length, width)),
+                     flat_discounts.reshape((length, width)),
+                     np.ascontiguousarray(flat_init).reshape((width,)),
+                     flat_out)
+        return out
+
+    BACKEND = 'numba'
+else:
+    BACKEND = 'numpy'
+
+
+def reverse_scan(values, discounts, init, out):
+    if BACKEND == 'numba':
+        return numba_reverse_scan(values, discounts, init, out)
+    return numpy_reverse_scan(values, discounts, init, out)
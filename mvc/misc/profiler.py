@@ -0,0 +1,135 @@
+import math
+import threading
+import time
+
+
+# durations are binned by powers of two of microseconds
+NUM_BINS = 32
+
+SETTING = {
+    'profiler': None
+}
+
+
+class NullPhase:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        return False
+
+
+NULL_PHASE = NullPhase()
+
+
+class Phase:
+    def __init__(self, stack=None):
+        # phases in progress shared with the other phases of the profiler
+        self.stack = stack
+        self.start = None
+        self.reset()
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        if self.stack is not None:
+            self.stack.append(self)
+        return self
+
+    def __exit__(self, *args):
+        duration = time.perf_counter() - self.start
+        self.add(duration)
+        if self.stack is not None:
+            self.stack.pop()
+            # time of nested phases is excluded from the self time of parent
+            if self.stack:
+                self.stack[-1].children += duration
+        return False
+
+    def add(self, duration):
+        self.total += duration
+        self.count += 1
+        _, exponent = math.frexp(duration * 1e6)
+        self.histogram[min(max(exponent, 0), NUM_BINS - 1)] += 1
+
+    def percentile(self, percent):
+        # upper edge of the bin which contains the percentile
+        threshold = percent / 100.0 * self.count
+        cumulative = 0
+        for i, count in enumerate(self.histogram):
+            cumulative += count
+            if cumulative >= threshold:
+                return 2.0 ** i * 1e-6
+        return 2.0 ** (NUM_BINS - 1) * 1e-6
+
+    def self_total(self):
+        return self.total - self.children
+
+    def reset(self):
+        self.total = 0.0
+        self.children = 0.0
+        self.count = 0
+        self.histogram = [0] * NUM_BINS
+
+
+class Profiler:
+    def __init__(self):
+        # phases of other threads such as background evaluation are ignored
+        self.thread = threading.get_ident()
+        self.phases = {}
+        self.stack = []
+        self.last_time = time.perf_counter()
+        self.last_step = None
+
+    def phase(self, name):
+        if threading.get_ident() != self.thread:
+            return NULL_PHASE
+        if name not in self.phases:
+            self.phases[name] = Phase(self.stack)
+        return self.phases[name]
+
+    def summary(self, step):
+        now = time.perf_counter()
+        elapsed = now - self.last_time
+        values = {}
+        if self.last_step is not None:
+            values['steps_per_second'] = (step - self.last_step) / elapsed
+        for name, timer in sorted(self.phases.items()):
+            if timer.count == 0:
+                continue
+            # percentages of nested phases do not count time twice
+            values[name + '_percent'] = 100.0 * timer.self_total() / elapsed
+            values[name + '_mean_ms'] = 1000.0 * timer.total / timer.count
+            values[name + '_p50_ms'] = 1000.0 * timer.percentile(50)
+            values[name + '_p99_ms'] = 1000.0 * timer.percentile(99)
+            timer.reset()
+        self.last_time = now
+        self.last_step = step
+        return values
+
+    def log(self, metrics, step):
+        for name, value in self.summary(step).items():
+            name = 'profile_' + name
+            # each log shows the latest window only
+            if not metrics.has(name):
+                metrics.register(name, 'queue', maxlen=1)
+            metrics.add(name, value)
+            metrics.log_metric(name, step)
+
+
+def enable():
+    SETTING['profiler'] = Profiler()
+
+
+def disable():
+    SETTING['profiler'] = None
+
+
+def phase(name):
+    if SETTING['profiler'] is None:
+        return NULL_PHASE
+    return SETTING['profiler'].phase(name)
+
+
+def log(metrics, step):
+    if SETTING['profiler'] is not None:
+        SETTING['profiler'].log(metrics, step)
@@ -0,0 +1,18 @@
+import numpy as np
+
+
+def shared_array(ctx, shape, dtype):
+    dtype = np.dtype(dtype)
+    size = int(np.prod(shape)) * dtype.itemsize
+    return ctx.RawArray('b', size), shape, dtype
+
+
+def as_array(shared):
+    buf, shape, dtype = shared
+    return np.frombuffer(buf, dtype=dtype).reshape(shape)
+
+
+def unflatten(flat, shapes):
+    sizes = [int(np.prod(shape)) for shape in shapes]
+    chunks = np.split(flat, np.cumsum(sizes)[:-1])
+    return [chunk.reshape(shape) for chunk, shape in zip(chunks, shapes)]
@@ -0,0 +1,43 @@
+import numpy as np
+
+
+class SumTree:
+    def __init__(self, capacity):
+        self.capacity = capacity
+        # number of leaves is rounded up to power of 2 so that every leaf
+        # sits at the same depth
+        self.num_leaves = 1
+        while self.num_leaves < capacity:
+            self.num_leaves *= 2
+        self.tree = np.zeros(2 * self.num_leaves, dtype=np.float64)
+
+    def total(self):
+        return self.tree[1]
+
+    def get(self, indices):
+        return self.tree[np.asarray(indices) + self.num_leaves]
+
+    def update(self, indices, priorities):
+        nodes = np.asarray(indices, dtype=np.int64) + self.num_leaves
+        self.tree[nodes] = priorities
+        # propagate sums level by level for the whole batch
+        nodes = nodes // 2
+        while nodes[0] > 0:
+            self.tree[nodes] = self.tree[2 * nodes] + self.tree[2 * nodes + 1]
+            nodes = nodes // 2
+
+    def sample(self, values):
+        values = np.array(values, dtype=np.float64)
+        nodes = np.ones(values.shape[0], dtype=np.int64)
+        # descend level by level for the whole batch
+        while nodes[0] < self.num_leaves:
+            left = 2 * nodes
+            left_values = self.tree[left]
+            # avoid empty right subtrees caused by rounding errors
+            go_right = (values >= left_values) & (self.tree[left + 1] > 0.0)
+            values = np.where(go_right, values - left_values, values)
+            nodes = np.where(go_right, left + 1, left)
+        return nodes - self.num_leaves
+
+    def reset(self):
+        self.tree.fill(0.0)
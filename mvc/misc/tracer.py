@@ -0,0 +1,88 @@
+import logging
+
+from collections import defaultdict
+from contextlib import contextmanager
+
+import tensorflow as tf
+from tensorflow.python.client import timeline
+
+import mvc.logger as logger
+
+
+LOGGER = logging.getLogger(__name__)
+
+
+def merge_step_stats(step_stats, other):
+    devices = {dev_stats.device: dev_stats
+               for dev_stats in step_stats.dev_stats}
+    for dev_stats in other.dev_stats:
+        if dev_stats.device in devices:
+            devices[dev_stats.device].node_stats.extend(dev_stats.node_stats)
+        else:
+            step_stats.dev_stats.add().CopyFrom(dev_stats)
+
+
+def top_ops(step_stats, num_ops):
+    times = defaultdict(int)
+    for dev_stats in step_stats.dev_stats:
+        for node_stats in dev_stats.node_stats:
+            times[node_stats.node_name] += node_stats.all_end_rel_micros
+    total = sum(times.values())
+    ranking = sorted(times.items(), key=lambda item: item[1], reverse=True)
+    return [(name, micros, micros / max(total, 1))
+            for name, micros in ranking[:num_ops]]
+
+
+class Trace:
+    def __init__(self):
+        self.options = tf.RunOptions(trace_level=tf.RunOptions.FULL_TRACE)
+        self.step_stats = tf.RunMetadata().step_stats
+
+    def run(self, sess, fetches, feed_dict=None):
+        run_metadata = tf.RunMetadata()
+        output = sess.run(fetches, feed_dict=feed_dict, options=self.options,
+                          run_metadata=run_metadata)
+        self.add(run_metadata.step_stats)
+        return output
+
+    def add(self, step_stats):
+        # updates running several graph executions are traced together
+        merge_step_stats(self.step_stats, step_stats)
+
+
+class Tracer:
+    def __init__(self, update_interval, infer_interval=0, num_top_ops=10):
+        # zero interval disables tracing of the kind
+        self.intervals = {
+            'update': update_interval,
+            'infer': infer_interval
+        }
+        self.num_top_ops = num_top_ops
+        self.counts = defaultdict(int)
+
+    def should_trace(self, kind):
+        if self.intervals[kind] == 0:
+            return False
+        self.counts[kind] += 1
+        return self.counts[kind] % self.intervals[kind] == 0
+
+    @contextmanager
+    def trace(self, kind):
+        # graph executions pass the trace options while it is open
+        trace = Trace()
+        yield trace
+        self.save(kind, trace.step_stats)
+
+    def save(self, kind, step_stats):
+        # inference with NumPy does not run the graph
+        if not step_stats.dev_stats:
+            return
+        name = '{}_{}'.format(kind, self.counts[kind])
+        chrome_trace = timeline.Timeline(step_stats) \
+            .generate_chrome_trace_format()
+        logger.save_trace(name, chrome_trace)
+
+        LOGGER.info('top ops of %s:', name)
+        for op_name, micros, ratio in top_ops(step_stats, self.num_top_ops):
+            LOGGER.info('  %8.3f ms %5.1f%% %s', micros / 1000.0,
+                        ratio * 100.0, op_name)
@@ -25,6 +25,21 @@ class Buffer:
     def size(self):
         return len(self.obs_t)
 
+    def snapshot(self):
+        return {
+            'obs_t': np.array(self.obs_t),
+            'actions_t': np.array(self.actions_t),
+            'rewards_t': np.array(self.rewards_t),
+            'dones_t': np.array(self.dones_t)
+        }
+
+    def restore(self, snapshot):
+        self.reset()
+        self.obs_t.extend(snapshot['obs_t'])
+        self.actions_t.extend(snapshot['actions_t'])
+        self.rewards_t.extend(snapshot['rewards_t'])
+        self.dones_t.extend(snapshot['dones_t'])
+
     def fetch(self, n):
         assert n < self.size()
 
@@ -48,3 +63,114 @@ class Buffer:
             'obs_tp1': np.array(obs_tp1),
             'dones_tp1': np.array(dones_tp1)
         }
+
+
+class ArrayBuffer(Buffer):
+    FIELDS = ['obs_t', 'actions_t', 'rewards_t', 'dones_t']
+
+    def __init__(self, maxlen=10 ** 6, num_envs=1):
+        self.maxlen = maxlen
+        # transitions of each environment are interleaved with this stride
+        self.num_envs = num_envs
+        self.cursor = 0
+        self.count = 0
+        # storage is allocated at the first add to infer shapes and dtypes
+        self.obs_t = None
+        self.actions_t = None
+        self.rewards_t = None
+        self.dones_t = None
+
+    def add(self, obs_t, action_t, reward_t, done_t):
+        if self.obs_t is None:
+            self._allocate(obs_t, action_t, reward_t, done_t)
+
+        self.obs_t[self.cursor] = obs_t
+        self.actions_t[self.cursor] = action_t
+        self.rewards_t[self.cursor] = reward_t
+        self.dones_t[self.cursor] = done_t
+
+        self.cursor = (self.cursor + 1) % self.maxlen
+        self.count = min(self.count + 1, self.maxlen)
+
+    def add_batch(self, obs_t, actions_t, rewards_t, dones_t):
+        assert len(obs_t) == self.num_envs
+        if self.obs_t is None:
+            self._allocate(obs_t[0], actions_t[0], rewards_t[0], dones_t[0])
+
+        indices = (self.cursor + np.arange(self.num_envs)) % self.maxlen
+        self.obs_t[indices] = obs_t
+        self.actions_t[indices] = actions_t
+        self.rewards_t[indices] = rewards_t
+        self.dones_t[indices] = dones_t
+
+        self.cursor = (self.cursor + self.num_envs) % self.maxlen
+        self.count = min(self.count + self.num_envs, self.maxlen)
+
+    def reset(self):
+        self.cursor = 0
+        self.count = 0
+
+    def size(self):
+        return self.count
+
+    def snapshot(self):
+        # copy valid transitions in chronological order
+        start = (self.cursor - self.count) % self.maxlen
+        indices = (start + np.arange(self.count)) % self.maxlen
+        snapshot = {}
+        for name in self.FIELDS:
+            if self.count == 0:
+                snapshot[name] = np.zeros((0,))
+            else:
+                snapshot[name] = self._take(name, indices)
+        return snapshot
+
+    def restore(self, snapshot):
+        self.reset()
+        size = min(snapshot['obs_t'].shape[0], self.maxlen)
+        if size == 0:
+            return
+
+        values = [snapshot[name] for name in self.FIELDS]
+        if self.obs_t is None:
+            self._allocate(*[value[0] for value in values])
+        for name, value in zip(self.FIELDS, values):
+            getattr(self, name)[:size] = value[-size:]
+
+        self.cursor = size % self.maxlen
+        self.count = size
+
+    def fetch(self, n):
+        assert n < self.size()
+
+        indices = self._sample_indices(n)
+        return self._gather(indices)
+
+    def _allocate(self, obs_t, action_t, reward_t, done_t):
+        values = [obs_t, action_t, reward_t, done_t]
+        for name, value in zip(self.FIELDS, values):
+            value = np.asarray(value)
+            storage = self._make_storage(name, value.shape, value.dtype)
+            setattr(self, name, storage)
+
+    def _make_storage(self, name, shape, dtype):
+        return np.zeros((self.maxlen,) + shape, dtype=dtype)
+
+    def _sample_indices(self, n):
+        # the latest transitions do not have their next states yet
+        start = (self.cursor - self.count) % self.maxlen
+        offsets = np.random.randint(self.size() - self.num_envs, size=n)
+        return (start + offsets) % self.maxlen
+
+    def _gather(self, indices):
+        next_indices = (indices + self.num_envs) % self.maxlen
+        return {
+            'obs_t': self._take('obs_t', indices),
+            'actions_t': self._take('actions_t', indices),
+            'rewards_tp1': self._take('rewards_t', next_indices),
+            'obs_tp1': self._take('obs_t', next_indices),
+            'dones_tp1': self._take('dones_t', next_indices)
+        }
+
+    def _take(self, name, indices):
+        return getattr(self, name)[indices]
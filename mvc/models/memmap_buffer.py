@@ -0,0 +1,144 @@
+import json
+import os
+import numpy as np
+
+import mvc.logger as logger
+
+from mvc.models.buffer import ArrayBuffer
+
+
+class MemmapBuffer(ArrayBuffer):
+    def __init__(self, maxlen=10 ** 7, directory=None, cache_size=10 ** 4,
+                 num_envs=1):
+        super().__init__(maxlen, num_envs)
+        assert cache_size <= maxlen, 'cache_size must not exceed maxlen'
+        self.directory = directory
+        self.cache_size = cache_size
+        # latest transitions are kept resident and written in blocks
+        self.caches = {}
+        self.pending = 0
+        if directory is not None and os.path.exists(self._meta_path()):
+            self._open()
+
+    def add(self, obs_t, action_t, reward_t, done_t):
+        if self.obs_t is None:
+            self._allocate(obs_t, action_t, reward_t, done_t)
+
+        values = [obs_t, action_t, reward_t, done_t]
+        for name, value in zip(self.FIELDS, values):
+            self.caches[name][self.pending] = value
+        self._advance(1)
+
+    def add_batch(self, obs_t, actions_t, rewards_t, dones_t):
+        assert len(obs_t) == self.num_envs
+        if self.obs_t is None:
+            self._allocate(obs_t[0], actions_t[0], rewards_t[0], dones_t[0])
+
+        values = [obs_t, actions_t, rewards_t, dones_t]
+        offset = 0
+        while offset < self.num_envs:
+            # copy as many rows as the write-back cache can hold at once
+            size = min(self.num_envs - offset, self.cache_size - self.pending)
+            for name, value in zip(self.FIELDS, values):
+                cache = self.caches[name]
+                cache[self.pending:self.pending + size] =\
+                    value[offset:offset + size]
+            self._advance(size)
+            offset += size
+
+    def reset(self):
+        super().reset()
+        self.pending = 0
+
+    def snapshot(self):
+        # transitions are already persisted in the mapped files
+        self.flush()
+        return None
+
+    def restore(self, snapshot):
+        super().restore(snapshot)
+        self.flush()
+
+    def flush(self):
+        if self.obs_t is None:
+            return
+
+        # write cached transitions to mapped pages with slice copies
+        start = (self.cursor - self.pending) % self.maxlen
+        head = min(self.pending, self.maxlen - start)
+        for name in self.FIELDS:
+            storage = getattr(self, name)
+            cache = self.caches[name]
+            storage[start:start + head] = cache[:head]
+            storage[:self.pending - head] = cache[head:self.pending]
+            storage.flush()
+        self.pending = 0
+
+        self._write_meta()
+
+    def _advance(self, size):
+        self.pending += size
+        self.cursor = (self.cursor + size) % self.maxlen
+        self.count = min(self.count + size, self.maxlen)
+
+        if self.pending == self.cache_size:
+            self.flush()
+
+    def _allocate(self, obs_t, action_t, reward_t, done_t):
+        if self.directory is None:
+            self.directory = os.path.join(logger.get_dir(), 'buffer')
+        if not os.path.exists(self.directory):
+            os.makedirs(self.directory)
+        super()._allocate(obs_t, action_t, reward_t, done_t)
+        self._write_meta()
+
+    def _make_storage(self, name, shape, dtype, mode='w+'):
+        path = os.path.join(self.directory, name + '.dat')
+        self.caches[name] = np.zeros((self.cache_size,) + shape, dtype=dtype)
+        return np.memmap(path, dtype=dtype, mode=mode,
+                         shape=(self.maxlen,) + shape)
+
+    def _take(self, name, indices):
+        values = np.asarray(getattr(self, name)[indices])
+        # overlay transitions which are not written yet
+        offsets = (indices - self.cursor + self.pending) % self.maxlen
+        cached = offsets < self.pending
+        if np.any(cached):
+            values[cached] = self.caches[name][offsets[cached]]
+        return values
+
+    def _meta_path(self):
+        return os.path.join(self.directory, 'meta.json')
+
+    def _write_meta(self):
+        assert self.pending == 0, 'cached transitions must be written first'
+        meta = {
+            'maxlen': self.maxlen,
+            'num_envs': self.num_envs,
+            'cursor': self.cursor,
+            'count': self.count,
+            'fields': {}
+        }
+        for name in self.FIELDS:
+            storage = getattr(self, name)
+            meta['fields'][name] = {
+                'shape': list(storage.shape[1:]),
+                'dtype': storage.dtype.str
+            }
+        with open(self._meta_path(), 'w') as file:
+            file.write(json.dumps(meta, indent=2))
+
+    def _open(self):
+        with open(self._meta_path(), 'r') as file:
+            meta = json.loads(file.read())
+        assert meta['maxlen'] == self.maxlen,\
+            'maxlen does not match the existing buffer'
+        assert meta.get('num_envs', 1) == self.num_envs,\
+            'num_envs does not match the existing buffer'
+        for name in self.FIELDS:
+            field = meta['fields'][name]
+            storage = self._make_storage(name, tuple(field['shape']),
+                                         np.dtype(field['dtype']), mode='r+')
+            setattr(self, name, storage)
+        self.cursor = meta['cursor']
+        self.count = meta['count']
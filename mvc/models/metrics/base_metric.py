@@ -2,6 +2,10 @@ class BaseMetric:
     def add(self, value):
         raise NotImplementedError()
 
+    def add_many(self, values):
+        for value in values:
+            self.add(value)
+
     def get(self):
         raise NotImplementedError()
 
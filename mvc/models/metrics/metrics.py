@@ -30,6 +30,10 @@ class Metrics:
         self._check_name(name)
         self.metrics[name].add(value)
 
+    def add_many(self, name, values):
+        self._check_name(name)
+        self.metrics[name].add_many(values)
+
     def get(self, name):
         self._check_name(name)
         return self.metrics[name].get()
@@ -51,6 +55,12 @@ class Metrics:
         if self.saver is not None:
             logger.save_model(self.saver, step)
 
+    def save_buffer(self, buffer, step):
+        logger.save_buffer(buffer, step)
+
+    def flush(self):
+        logger.flush(self.saver)
+
     def reset(self, name):
         self._check_name(name)
         self.metrics[name].reset()
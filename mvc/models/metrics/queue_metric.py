@@ -6,15 +6,121 @@ from mvc.models.metrics.base_metric import BaseMetric
 
 class QueueMetric(BaseMetric):
     def __init__(self, maxlen=100):
-        self.values = deque(maxlen=maxlen)
+        self.maxlen = maxlen
+        self.values = np.zeros(maxlen, dtype=np.float64)
+        self.reset()
 
     def get(self):
-        if len(self.values) > 0:
-            return np.mean(list(self.values))
+        if self.count > 0:
+            return self.sum / self.count
         return 0.0
 
+    def std(self):
+        if self.count > 0:
+            mean = self.sum / self.count
+            # running sums can make the variance slightly negative
+            return np.sqrt(max(self.sum_squares / self.count - mean ** 2, 0.0))
+        return 0.0
+
+    def min(self):
+        return self._extremes()[0]
+
+    def max(self):
+        return self._extremes()[1]
+
     def add(self, value):
-        self.values.append(value)
+        # unused slots are zero so the overwritten value is always removed
+        old = self.values[self.index]
+        self.values[self.index] = value
+        self.sum += value - old
+        self.sum_squares += value ** 2 - old ** 2
+        self._push(float(value))
+        self._advance(1)
+
+    def add_many(self, values):
+        values = np.ravel(np.asarray(values, dtype=np.float64))
+        if values.size == 0:
+            return
+        if values.size >= self.maxlen:
+            self.values[:] = values[-self.maxlen:]
+            self.index = 0
+            self.count = self.maxlen
+            self._recompute()
+            self._push_many(values)
+            return
+        indices = (self.index + np.arange(values.size)) % self.maxlen
+        old = self.values[indices]
+        self.values[indices] = values
+        self.sum += np.sum(values) - np.sum(old)
+        self.sum_squares += np.sum(values ** 2) - np.sum(old ** 2)
+        self._push_many(values)
+        self._advance(values.size)
 
     def reset(self):
-        self.values.clear()
+        self.values.fill(0.0)
+        self.index = 0
+        self.count = 0
+        self.sum = 0.0
+        self.sum_squares = 0.0
+        # monotonic queues of (position, value) whose heads are min and max
+        self.position = 0
+        self.mins = deque()
+        self.maxs = deque()
+
+    def _push(self, value):
+        # values dominated by the new one never become extremes again
+        while self.mins and self.mins[-1][1] >= value:
+            self.mins.pop()
+        while self.maxs and self.maxs[-1][1] <= value:
+            self.maxs.pop()
+        self.mins.append((self.position, value))
+        self.maxs.append((self.position, value))
+        self.position += 1
+        # values out of the window are dropped from the heads
+        oldest = self.position - self.maxlen
+        while self.mins[0][0] < oldest:
+            self.mins.popleft()
+        while self.maxs[0][0] < oldest:
+            self.maxs.popleft()
+
+    def _push_many(self, values):
+        # only the values left in the window can be extremes
+        tail = values[-self.maxlen:]
+        start = self.position + values.size - tail.size
+        positions = np.arange(start, start + tail.size)
+        self.position += values.size
+        self._extend(self.mins, tail, positions, 1.0)
+        self._extend(self.maxs, tail, positions, -1.0)
+
+    def _extend(self, queue, tail, positions, sign):
+        # negated values turn the queue of maximums into one of minimums
+        signed = sign * tail
+        # values followed by smaller or equal ones are never extremes
+        later = np.append(np.minimum.accumulate(signed[::-1])[::-1][1:],
+                          np.inf)
+        kept = signed < later
+        extreme = np.min(signed)
+        while queue and sign * queue[-1][1] >= extreme:
+            queue.pop()
+        queue.extend(zip(positions[kept].tolist(), tail[kept].tolist()))
+        # values out of the window are dropped from the head
+        oldest = self.position - self.maxlen
+        while queue[0][0] < oldest:
+            queue.popleft()
+
+    def _advance(self, size):
+        wrapped = self.index + size >= self.maxlen
+        self.index = (self.index + size) % self.maxlen
+        self.count = min(self.count + size, self.maxlen)
+        # errors of running sums are cleared once per cycle of the ring
+        if wrapped:
+            self._recompute()
+
+    def _recompute(self):
+        self.sum = float(np.sum(self.values))
+        self.sum_squares = float(np.sum(self.values ** 2))
+
+    def _extremes(self):
+        if self.count == 0:
+            return 0.0, 0.0
+        return self.mins[0][1], self.maxs[0][1]
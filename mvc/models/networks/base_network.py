@@ -1,11 +1,68 @@
+import numpy as np
+import tensorflow as tf
+
+import mvc.misc.profiler as profiler
 from mvc.action_output import ActionOutput
 
 
+def trainable_variables(scope=None):
+    variables = tf.get_collection(tf.GraphKeys.TRAINABLE_VARIABLES, scope)
+    # graphs of other processes may create variables in other orders
+    return sorted(variables, key=lambda variable: variable.name)
+
+
+def _layers(variable, contiguous):
+    # flat variables are split into the layers stored in them
+    if contiguous is not None and variable.op.name in contiguous.layouts:
+        return contiguous.layouts[variable.op.name]
+    return [(variable.op.name, variable.shape.as_list())]
+
+
+def build_flat_params(variables, contiguous=None):
+    with tf.name_scope('flat_params'):
+        values = {}
+        sizes = {}
+        for var in variables:
+            layout = _layers(var, contiguous)
+            sizes.update((name, int(np.prod(shape))) for name, shape in layout)
+            chunks = tf.split(tf.reshape(var, [-1]),
+                              [sizes[name] for name, _ in layout])
+            values.update(zip([name for name, _ in layout], chunks))
+        # layers are ordered by name so that vectors are exchangeable
+        # between networks with and without flat variables
+        names = sorted(values)
+        flat = tf.concat([values[name] for name in names], axis=0)
+        flat_ph = tf.placeholder(tf.float32, flat.shape, name='flat')
+        chunks = dict(zip(names, tf.split(flat_ph,
+                                          [sizes[name] for name in names])))
+        assigns = []
+        for var in variables:
+            layout = _layers(var, contiguous)
+            value = tf.concat([chunks[name] for name, _ in layout], axis=0)
+            assigns.append(tf.assign(var, tf.reshape(value, var.shape)))
+        assign = tf.group(*assigns)
+    return flat, flat_ph, assign
+
+
 class BaseNetwork:
+    # weights copied out of the graph for inference without session
+    weight_cache = None
+    # layers of target updated scopes stored in flat variables
+    contiguous = None
+    # flat parameter ops built with the graph for each scope
+    flat_params = None
+    # scope of the variables needed to infer actions
+    policy_scope = None
+    # sampled trace capture of graph executions
+    tracer = None
+    # trace of the graph executions in progress
+    trace = None
+
     def infer(self, **kwargs):
         for key in self._infer_arguments():
             assert key in kwargs, key + ' does not exist in the arguments'
-        output = self._infer(**kwargs)
+        with profiler.phase('network_infer'):
+            output = self._traced('infer', self._infer, **kwargs)
 
         assert isinstance(output, ActionOutput)
 
@@ -14,7 +71,67 @@ class BaseNetwork:
     def update(self, **kwargs):
         for key in self._update_arguments():
             assert key in kwargs, key + ' does not exist in the arguments'
-        return self._update(**kwargs)
+        with profiler.phase('network_update'):
+            output = self._traced('update', self._update, **kwargs)
+        self.refresh_weights()
+        return output
+
+    def fused_update(self, epoch, **kwargs):
+        for key in self._update_arguments():
+            assert key in kwargs, key + ' does not exist in the arguments'
+        with profiler.phase('network_update'):
+            output = self._traced('update', self._fused_update, epoch,
+                                  **kwargs)
+        self.refresh_weights()
+        return output
+
+    def _traced(self, kind, func, *args, **kwargs):
+        if self.tracer is not None and self.tracer.should_trace(kind):
+            with self.tracer.trace(kind) as trace:
+                self.trace = trace
+                try:
+                    return func(*args, **kwargs)
+                finally:
+                    self.trace = None
+        return func(*args, **kwargs)
+
+    def _run(self, fetches, feed_dict=None):
+        sess = tf.get_default_session()
+        if self.trace is not None:
+            return self.trace.run(sess, fetches, feed_dict)
+        return sess.run(fetches, feed_dict=feed_dict)
+
+    def get_flat_params(self, scope):
+        flat, _, _ = self._flat_params(scope)
+        return self._run(flat)
+
+    def set_flat_params(self, vec, scope):
+        _, flat_ph, assign = self._flat_params(scope)
+        self._run(assign, feed_dict={flat_ph: vec})
+        self.refresh_weights()
+
+    def flat_params_size(self, scope):
+        variables = trainable_variables(scope)
+        return sum(int(np.prod(var.shape.as_list())) for var in variables)
+
+    def _build_flat_params(self, *scopes):
+        # ops are not added to the graph once training starts
+        if self.flat_params is None:
+            self.flat_params = {}
+        for scope in scopes:
+            variables = trainable_variables(scope)
+            self.flat_params[scope] = build_flat_params(variables,
+                                                        self.contiguous)
+
+    def _flat_params(self, scope):
+        assert self.flat_params is not None and scope in self.flat_params,\
+            'flat parameter ops are not built for {}'.format(scope)
+        return self.flat_params[scope]
+
+    def refresh_weights(self):
+        # cached weights are pulled again at the next inference
+        if self.weight_cache is not None:
+            self.weight_cache.invalidate()
 
     def _infer(self, **kwargs):
         raise NotImplementedError()
@@ -22,6 +139,9 @@ class BaseNetwork:
     def _update(self, **kwargs):
         raise NotImplementedError()
 
+    def _fused_update(self, epoch, **kwargs):
+        raise NotImplementedError()
+
     def _infer_arguments(self):
         raise NotImplementedError()
 
@@ -5,6 +5,8 @@ from mvc.action_output import ActionOutput
 from mvc.models.networks.base_network import BaseNetwork
 from mvc.parametric_function import deterministic_policy_function
 from mvc.parametric_function import q_function
+from mvc.parametric_function import ContiguousVariables
+import mvc.numpy_parametric_function as npf
 
 
 def initializer(shape, dtype=None, partition_info=None):
@@ -13,14 +15,24 @@ def initializer(shape, dtype=None, partition_info=None):
     return tf.random_uniform(shape, -val, val, dtype=dtype)
 
 
-def build_critic_loss(q_t, rewards_tp1, q_tp1, dones_tp1, gamma):
+def build_td_error(q_t, rewards_tp1, q_tp1, dones_tp1, gamma):
     assert len(q_t.shape) == 2 and q_t.shape[1] == 1
     assert len(rewards_tp1.shape) == 2 and rewards_tp1.shape[1] == 1
     assert len(q_tp1.shape) == 2 and q_tp1.shape[1] == 1
     assert len(dones_tp1.shape) == 2 and dones_tp1.shape[1] == 1
 
     target = rewards_tp1 + gamma * q_tp1 * (1.0 - dones_tp1)
-    loss = tf.reduce_mean(tf.square(target - q_t))
+    return target - q_t
+
+
+def build_critic_loss(q_t, rewards_tp1, q_tp1, dones_tp1, gamma,
+                      weights=None):
+    td_error = build_td_error(q_t, rewards_tp1, q_tp1, dones_tp1, gamma)
+    errors = tf.square(td_error)
+    if weights is not None:
+        assert len(weights.shape) == 2 and weights.shape[1] == 1
+        errors = weights * errors
+    loss = tf.reduce_mean(errors)
     return loss
 
 
@@ -33,14 +45,44 @@ def build_target_update(src, dst, tau):
     return tf.group(*ops)
 
 
-def build_optim(loss, lr, scope):
-    optimizer = tf.train.AdamOptimizer(lr, epsilon=1e-8)
+def build_optim(loss, lr, scope, optimizer=None):
+    # a shared optimizer already holds its own learning rate
+    assert (lr is None) != (optimizer is None),\
+        'either lr or optimizer must be given'
+    if optimizer is None:
+        optimizer = tf.train.AdamOptimizer(lr, epsilon=1e-8)
     variables = tf.get_collection(tf.GraphKeys.TRAINABLE_VARIABLES, scope)
     optimize_expr = optimizer.minimize(loss, var_list=variables)
     return optimize_expr
 
 
+def build_update_loop(build_update, inputs, num_updates, num_outputs):
+    batch_size = tf.shape(inputs[0])[0] // num_updates
+
+    def body(i, *outputs):
+        begin = i * batch_size
+        batch = [inpt[begin:begin + batch_size] for inpt in inputs]
+        results, update_expr = build_update(*batch)
+        # the next iteration starts after this update is applied
+        with tf.control_dependencies([update_expr]):
+            outputs = [
+                output.write(i, result)
+                for output, result in zip(outputs, results)
+            ]
+            return [i + 1] + outputs
+
+    outputs = [
+        tf.TensorArray(tf.float32, size=num_updates)
+        for _ in range(num_outputs)
+    ]
+    loop_vars = tf.while_loop(
+        lambda i, *_: i < num_updates, body, [tf.constant(0)] + outputs)
+    return [output.stack() for output in loop_vars[1:]]
+
+
 class DDPGNetwork(BaseNetwork):
+    policy_scope = 'ddpg/actor'
+
     def __init__(self,
                  fcs,
                  concat_index,
@@ -49,21 +91,52 @@ class DDPGNetwork(BaseNetwork):
                  gamma,
                  tau,
                  actor_lr,
-                 critic_lr):
+                 critic_lr,
+                 num_updates=1,
+                 numpy_infer=False,
+                 flat_target_update=False):
+        self.state_shape = state_shape
+        self.num_updates = num_updates
+        self.num_layers = len(fcs)
+        self.concat_index = concat_index
+        self.numpy_infer = numpy_infer
+        # layers of each target updated scope live in one flat variable
+        self.contiguous = ContiguousVariables() if flat_target_update \
+            else None
         self._build(fcs, concat_index, state_shape, num_actions,
-                    gamma, tau, actor_lr, critic_lr)
+                    gamma, tau, actor_lr, critic_lr, num_updates)
+
+        self.weight_cache = npf.WeightCache(['ddpg/actor', 'ddpg/critic'],
+                                            self.contiguous)
 
     def _infer(self, **kwargs):
-        feed_dict = {
-            self.obs_t_ph: np.array([kwargs['obs_t']])
-        }
-        sess = tf.get_default_session()
-        ops = [self.action, self.value]
-        action, value = sess.run(ops, feed_dict=feed_dict)
+        # observations of batch environments are already batched
+        batch = np.ndim(kwargs['obs_t']) > len(self.state_shape)
+        obs_t = kwargs['obs_t'] if batch else np.array([kwargs['obs_t']])
+        if self.numpy_infer:
+            action, value = self._numpy_infer(obs_t)
+        else:
+            feed_dict = {
+                self.obs_t_ph: obs_t
+            }
+            ops = [self.action, self.value]
+            action, value = self._run(ops, feed_dict=feed_dict)
+        if batch:
+            return ActionOutput(action=action, log_prob=None, value=value)
         return ActionOutput(action=action[0], log_prob=None, value=value[0])
 
+    def _numpy_infer(self, obs_t):
+        weights = self.weight_cache.get()
+        action = np.tanh(npf.deterministic_policy_function(
+            weights, self.num_layers, obs_t, np.tanh, scope='ddpg/actor'))
+        value = npf.q_function(weights, self.num_layers, obs_t, action,
+                               self.concat_index, np.tanh,
+                               scope='ddpg/critic')
+        return action, np.reshape(value, [-1])
+
     def _update(self, **kwargs):
-        sess = tf.get_default_session()
+        if self.num_updates > 1:
+            return self._update_loop(**kwargs)
 
         # critic update
         critic_feed_dict = {
@@ -73,20 +146,40 @@ class DDPGNetwork(BaseNetwork):
             self.obs_tp1_ph: kwargs['obs_tp1'],
             self.dones_tp1_ph: kwargs['dones_tp1']
         }
-        critic_ops = [self.critic_loss, self.critic_optimize_expr]
-        critic_loss, _ = sess.run(critic_ops, feed_dict=critic_feed_dict)
+        if 'weights_t' in kwargs:
+            critic_feed_dict[self.weights_t_ph] = kwargs['weights_t']
+        critic_ops = [
+            self.critic_loss, self.td_errors, self.critic_optimize_expr
+        ]
+        critic_loss, td_errors, _ = self._run(critic_ops,
+                                              feed_dict=critic_feed_dict)
 
         # actor update
         actor_feed_dict = {
             self.obs_t_ph: kwargs['obs_t']
         }
         actor_ops = [self.actor_loss, self.actor_optimize_expr]
-        actor_loss, _ = sess.run(actor_ops, feed_dict=actor_feed_dict)
+        actor_loss, _ = self._run(actor_ops, feed_dict=actor_feed_dict)
 
         # target update
-        sess.run([self.update_target_critic, self.update_target_actor])
+        self._run([self.update_target_critic, self.update_target_actor])
 
-        return critic_loss, actor_loss
+        return critic_loss, actor_loss, td_errors
+
+    def _update_loop(self, **kwargs):
+        feed_dict = {
+            self.obs_t_ph: kwargs['obs_t'],
+            self.actions_t_ph: kwargs['actions_t'],
+            self.rewards_tp1_ph: kwargs['rewards_tp1'],
+            self.obs_tp1_ph: kwargs['obs_tp1'],
+            self.dones_tp1_ph: kwargs['dones_tp1']
+        }
+        if 'weights_t' in kwargs:
+            feed_dict[self.weights_t_ph] = kwargs['weights_t']
+        ops = [
+            self.loop_critic_loss, self.loop_actor_loss, self.loop_td_errors
+        ]
+        return tuple(self._run(ops, feed_dict=feed_dict))
 
     def _build(self,
                fcs,
@@ -96,8 +189,12 @@ class DDPGNetwork(BaseNetwork):
                gamma,
                tau,
                actor_lr,
-               critic_lr):
-        with tf.variable_scope('ddpg', reuse=tf.AUTO_REUSE):
+               critic_lr,
+               num_updates):
+        # resource variables are read where they are used so that reads
+        # placed under control dependencies observe preceding updates
+        with tf.variable_scope('ddpg', reuse=tf.AUTO_REUSE,
+                               use_resource=num_updates > 1):
             # placeholder
             obs_t_ph = self.obs_t_ph = tf.placeholder(
                 tf.float32, [None] + list(state_shape), name='obs_t')
@@ -109,9 +206,17 @@ class DDPGNetwork(BaseNetwork):
                 tf.float32, [None] + list(state_shape), name='obs_tp1')
             dones_tp1_ph = self.dones_tp1_ph = tf.placeholder(
                 tf.float32, [None], name='dones_tp1')
+            # importance sampling weights for prioritized replay
+            weights_t_ph = self.weights_t_ph = tf.placeholder_with_default(
+                tf.ones_like(rewards_tp1_ph), [None], name='weights_t')
 
             last_initializer = tf.random_uniform_initializer(-3e-3, 3e-3)
 
+            if self.contiguous is not None:
+                self._register_contiguous(
+                    fcs, concat_index, num_actions, obs_t_ph, actions_t_ph,
+                    last_initializer)
+
             raw_policy_t = deterministic_policy_function(
                 fcs, obs_t_ph, num_actions, tf.nn.tanh, w_init=initializer,
                 last_w_init=last_initializer, last_b_init=last_initializer,
@@ -139,10 +244,14 @@ class DDPGNetwork(BaseNetwork):
             # prepare for loss calculation
             rewards_tp1 = tf.reshape(rewards_tp1_ph, [-1, 1])
             dones_tp1 = tf.reshape(dones_tp1_ph, [-1, 1])
+            weights_t = tf.reshape(weights_t_ph, [-1, 1])
 
             # critic loss
             self.critic_loss = build_critic_loss(q_t, rewards_tp1, q_tp1,
-                                                 dones_tp1, gamma)
+                                                 dones_tp1, gamma, weights_t)
+            # td error for prioritized replay
+            self.td_errors = tf.reshape(build_td_error(
+                q_t, rewards_tp1, q_tp1, dones_tp1, gamma), [-1])
             # actor loss
             self.actor_loss = -tf.reduce_mean(q_t_with_actor)
 
@@ -153,15 +262,103 @@ class DDPGNetwork(BaseNetwork):
                 'ddpg/actor', 'ddpg/target_actor', tau)
 
             # optimization
-            self.critic_optimize_expr = build_optim(self.critic_loss,
-                                                    critic_lr, 'ddpg/critic')
-            self.actor_optimize_expr = build_optim(self.actor_loss,
-                                                   actor_lr, 'ddpg/actor')
+            critic_optimizer = tf.train.AdamOptimizer(critic_lr, epsilon=1e-8)
+            actor_optimizer = tf.train.AdamOptimizer(actor_lr, epsilon=1e-8)
+            self.critic_optimize_expr = build_optim(
+                self.critic_loss, None, 'ddpg/critic', critic_optimizer)
+            self.actor_optimize_expr = build_optim(
+                self.actor_loss, None, 'ddpg/actor', actor_optimizer)
+
+            def build_update(obs_t, actions_t, rewards_tp1, obs_tp1,
+                             dones_tp1, weights_t):
+                policy_t = tf.nn.tanh(deterministic_policy_function(
+                    fcs, obs_t, num_actions, tf.nn.tanh, w_init=initializer,
+                    last_w_init=last_initializer,
+                    last_b_init=last_initializer, scope='actor'))
+                policy_tp1 = tf.nn.tanh(deterministic_policy_function(
+                    fcs, obs_tp1, num_actions, tf.nn.tanh, w_init=initializer,
+                    last_w_init=last_initializer,
+                    last_b_init=last_initializer, scope='target_actor'))
+                q_t = q_function(
+                    fcs, obs_t, actions_t, concat_index, tf.nn.tanh,
+                    w_init=initializer, last_w_init=last_initializer,
+                    last_b_init=last_initializer, scope='critic')
+                q_tp1 = q_function(
+                    fcs, obs_tp1, policy_tp1, concat_index, tf.nn.tanh,
+                    w_init=initializer, last_w_init=last_initializer,
+                    last_b_init=last_initializer, scope='target_critic')
+
+                rewards_tp1 = tf.reshape(rewards_tp1, [-1, 1])
+                dones_tp1 = tf.reshape(dones_tp1, [-1, 1])
+                weights_t = tf.reshape(weights_t, [-1, 1])
+
+                critic_loss = build_critic_loss(
+                    q_t, rewards_tp1, q_tp1, dones_tp1, gamma, weights_t)
+                td_errors = tf.reshape(build_td_error(
+                    q_t, rewards_tp1, q_tp1, dones_tp1, gamma), [-1])
+                critic_optimize_expr = build_optim(
+                    critic_loss, None, 'ddpg/critic', critic_optimizer)
+
+                with tf.control_dependencies([critic_optimize_expr]):
+                    # actor loss against the updated critic
+                    q_t_with_actor = q_function(
+                        fcs, obs_t, policy_t, concat_index, tf.nn.tanh,
+                        w_init=initializer, last_w_init=last_initializer,
+                        last_b_init=last_initializer, scope='critic')
+                    actor_loss = -tf.reduce_mean(q_t_with_actor)
+                    actor_optimize_expr = build_optim(
+                        actor_loss, None, 'ddpg/actor', actor_optimizer)
+
+                with tf.control_dependencies([actor_optimize_expr]):
+                    update_expr = tf.group(
+                        build_target_update(
+                            'ddpg/critic', 'ddpg/target_critic', tau),
+                        build_target_update(
+                            'ddpg/actor', 'ddpg/target_actor', tau))
+
+                return (critic_loss, actor_loss, td_errors), update_expr
+
+            # multiple updates in a single graph execution
+            if num_updates > 1:
+                inputs = [
+                    obs_t_ph, actions_t_ph, rewards_tp1_ph, obs_tp1_ph,
+                    dones_tp1_ph, weights_t_ph
+                ]
+                critic_losses, actor_losses, td_errors = build_update_loop(
+                    build_update, inputs, num_updates, 3)
+                self.loop_critic_loss = tf.reduce_mean(critic_losses)
+                self.loop_actor_loss = tf.reduce_mean(actor_losses)
+                self.loop_td_errors = tf.reshape(td_errors, [-1])
 
             # action
             self.action = policy_t
             self.value = tf.reshape(q_t_with_actor, [-1])
 
+        # the policy is synced alone to processes that only infer
+        self._build_flat_params('ddpg', self.policy_scope)
+
+    def _register_contiguous(self, fcs, concat_index, num_actions, obs_t,
+                             actions_t, last_initializer):
+        def build_actor(scope):
+            return lambda obs: deterministic_policy_function(
+                fcs, obs, num_actions, tf.nn.tanh, w_init=initializer,
+                last_w_init=last_initializer, last_b_init=last_initializer,
+                scope=scope)
+
+        def build_critic(scope):
+            return lambda obs, actions: q_function(
+                fcs, obs, actions, concat_index, tf.nn.tanh,
+                w_init=initializer, last_w_init=last_initializer,
+                last_b_init=last_initializer, scope=scope)
+
+        for scope in ['actor', 'target_actor']:
+            self.contiguous.register(scope, build_actor(scope), obs_t)
+        for scope in ['critic', 'target_critic']:
+            self.contiguous.register(scope, build_critic(scope), obs_t,
+                                     actions_t)
+        # the following layers are built as views of the flat variables
+        tf.get_variable_scope().set_custom_getter(self.contiguous.getter)
+
     def _infer_arguments(self):
         return ['obs_t']
 
@@ -5,6 +5,7 @@ from mvc.models.networks.base_network import BaseNetwork
 from mvc.action_output import ActionOutput
 from mvc.parametric_function import stochastic_policy_function
 from mvc.parametric_function import value_function
+import mvc.numpy_parametric_function as npf
 
 
 def build_value_loss(values, returns, old_values, epsilon, value_factor):
@@ -43,6 +44,8 @@ def build_policy_loss(log_probs, old_log_probs, advantages, epsilon):
 
 
 class PPONetwork(BaseNetwork):
+    policy_scope = 'ppo/pi'
+
     def __init__(self,
                  fcs,
                  state_shape,
@@ -53,21 +56,56 @@ class PPONetwork(BaseNetwork):
                  lr,
                  grad_clip,
                  value_factor,
-                 entropy_factor):
+                 entropy_factor,
+                 numpy_infer=False,
+                 fused=False):
+        self.num_layers = len(fcs)
+        self.numpy_infer = numpy_infer
+        self.fused = fused
 
         self._build(fcs, state_shape, num_envs, num_actions, batch_size,
                     epsilon, lr, grad_clip, value_factor, entropy_factor)
 
+        self.weight_cache = npf.WeightCache(['ppo/pi', 'ppo/v'])
+
     def _infer(self, **kwargs):
+        if self.numpy_infer:
+            return self._numpy_infer(**kwargs)
+
         feed_dict = {
             self.step_obs_ph: kwargs['obs_t'],
         }
-        sess = tf.get_default_session()
         ops = [self.action, self.log_policy, self.value]
-        return ActionOutput(*sess.run(ops, feed_dict=feed_dict))
+        return ActionOutput(*self._run(ops, feed_dict=feed_dict))
+
+    def _numpy_infer(self, **kwargs):
+        weights = self.weight_cache.get()
+        mean, std = npf.stochastic_policy_function(
+            weights, self.num_layers, kwargs['obs_t'], np.tanh,
+            scope='ppo/pi')
+        action = npf.sample_normal(mean, std)
+        log_policy = npf.normal_log_prob(action, mean, std)
+        value = npf.value_function(
+            weights, self.num_layers, kwargs['obs_t'], np.tanh, scope='ppo/v')
+        return ActionOutput(action, log_policy, np.reshape(value, [-1]))
 
     def _update(self, **kwargs):
-        feed_dict = {
+        opts = [self.loss, self.optimize_expr]
+        return self._run(opts, feed_dict=self._update_feed_dict(kwargs))[0]
+
+    def compute_gradients(self, **kwargs):
+        for key in self._update_arguments():
+            assert key in kwargs, key + ' does not exist in the arguments'
+        opts = [self.loss, self.gradients]
+        return self._run(opts, feed_dict=self._update_feed_dict(kwargs))
+
+    def apply_gradients(self, gradients):
+        feed_dict = dict(zip(self.gradient_phs, gradients))
+        self._run(self.apply_gradients_expr, feed_dict=feed_dict)
+        self.refresh_weights()
+
+    def _update_feed_dict(self, kwargs):
+        return {
             self.train_obs_ph: kwargs['obs_t'],
             self.actions_ph: kwargs['actions_t'],
             self.returns_ph: kwargs['returns_t'],
@@ -75,9 +113,19 @@ class PPONetwork(BaseNetwork):
             self.old_log_probs_ph: kwargs['log_probs_t'],
             self.old_values_ph: kwargs['values_t']
         }
-        sess = tf.get_default_session()
-        opts = [self.loss, self.optimize_expr]
-        return sess.run(opts, feed_dict=feed_dict)[0]
+
+    def _fused_update(self, epoch, **kwargs):
+        assert self.fused, 'fused update is not built'
+        feed_dict = {
+            self.rollout_obs_ph: kwargs['obs_t'],
+            self.rollout_actions_ph: kwargs['actions_t'],
+            self.rollout_returns_ph: kwargs['returns_t'],
+            self.rollout_advantages_ph: kwargs['advantages_t'],
+            self.rollout_old_log_probs_ph: kwargs['log_probs_t'],
+            self.rollout_old_values_ph: kwargs['values_t'],
+            self.epoch_ph: epoch
+        }
+        return self._run(self.fused_losses, feed_dict=feed_dict)
 
     def _build(self,
                fcs,
@@ -90,10 +138,13 @@ class PPONetwork(BaseNetwork):
                grad_clip,
                value_factor,
                entropy_factor):
-        with tf.variable_scope('ppo', reuse=tf.AUTO_REUSE):
+        # resource variables are read where they are used so that reads
+        # in the fused loop observe updates of the previous iteration
+        with tf.variable_scope('ppo', reuse=tf.AUTO_REUSE,
+                               use_resource=self.fused):
             # placeholers
             step_obs_ph = self.step_obs_ph = tf.placeholder(
-                tf.float32, [num_envs] + list(state_shape), name='step_obs')
+                tf.float32, [None] + list(state_shape), name='step_obs')
             train_obs_ph = self.train_obs_ph = tf.placeholder(
                 tf.float32, [batch_size] + list(state_shape), name='train_obs')
             returns_ph = self.returns_ph = tf.placeholder(
@@ -121,48 +172,125 @@ class PPONetwork(BaseNetwork):
                 fcs, step_obs_ph, tf.nn.tanh, initializer(1.0),
                 initializer(1.0), scope='v')
 
-            # network outputs for training
-            train_dist = stochastic_policy_function(
-                fcs, train_obs_ph, num_actions, tf.nn.tanh,
-                w_init=initializer(1.0), last_w_init=initializer(0.01),
-                scope='pi')
-            train_values = value_function(
-                fcs, train_obs_ph, tf.nn.tanh, initializer(1.0),
-                initializer(1.0), scope='v')
+            def build_loss(obs, actions, returns, advantages,
+                           old_log_probs, old_values):
+                # network outputs for training
+                train_dist = stochastic_policy_function(
+                    fcs, obs, num_actions, tf.nn.tanh,
+                    w_init=initializer(1.0), last_w_init=initializer(0.01),
+                    scope='pi')
+                train_values = value_function(
+                    fcs, obs, tf.nn.tanh, initializer(1.0),
+                    initializer(1.0), scope='v')
+
+                # prepare for loss calculation
+                advantages = tf.reshape(advantages, [-1, 1])
+                returns = tf.reshape(returns, [-1, 1])
+                old_values = tf.reshape(old_values, [-1, 1])
+                old_log_probs = tf.reshape(old_log_probs, [-1, 1])
+                log_probs = tf.reshape(train_dist.log_prob(actions), [-1, 1])
+
+                # individual loss
+                value_loss = build_value_loss(train_values, returns,
+                                              old_values, epsilon,
+                                              value_factor)
+                entropy_loss = build_entropy_loss(train_dist, entropy_factor)
+                policy_loss = build_policy_loss(log_probs, old_log_probs,
+                                                advantages, epsilon)
+                # final loss
+                return value_loss + policy_loss + entropy_loss
 
-            # prepare for loss calculation
-            advantages = tf.reshape(advantages_ph, [-1, 1])
-            returns = tf.reshape(returns_ph, [-1, 1])
-            old_values = tf.reshape(old_values_ph, [-1, 1])
-            old_log_probs = tf.reshape(old_log_probs_ph, [-1, 1])
-            log_probs = tf.reshape(train_dist.log_prob(actions_ph), [-1, 1])
-
-            # individual loss
-            value_loss = build_value_loss(train_values, returns, old_values,
-                                          epsilon, value_factor)
-            entropy_loss = build_entropy_loss(train_dist, entropy_factor)
-            policy_loss = build_policy_loss(log_probs, old_log_probs,
-                                            advantages, epsilon)
-            # final loss
-            self.loss = value_loss + policy_loss + entropy_loss
+            def build_apply(gradients):
+                clipped_gradients, _ = tf.clip_by_global_norm(
+                    gradients, grad_clip)
+                # update
+                grads_and_vars = zip(clipped_gradients, network_vars)
+                return optimizer.apply_gradients(grads_and_vars)
+
+            def build_optimize(loss):
+                return build_apply(tf.gradients(loss, network_vars))
+
+            self.loss = build_loss(train_obs_ph, actions_ph, returns_ph,
+                                   advantages_ph, old_log_probs_ph,
+                                   old_values_ph)
 
             # network weights
             network_vars = tf.get_collection(
                 tf.GraphKeys.TRAINABLE_VARIABLES, 'ppo')
 
-            # gradients
-            gradients = tf.gradients(self.loss, network_vars)
-            clipped_gradients, _ = tf.clip_by_global_norm(gradients, grad_clip)
-            # update
-            grads_and_vars = zip(clipped_gradients, network_vars)
             optimizer = tf.train.AdamOptimizer(lr, epsilon=1e-5)
-            self.optimize_expr = optimizer.apply_gradients(grads_and_vars)
+            self.gradients = tf.gradients(self.loss, network_vars)
+            self.optimize_expr = build_apply(self.gradients)
+
+            # gradients averaged over data-parallel workers are fed back
+            with tf.name_scope('apply'):
+                self.gradient_phs = [
+                    tf.placeholder(tf.float32, var.shape)
+                    for var in network_vars
+                ]
+                self.apply_gradients_expr = build_apply(self.gradient_phs)
+
+            # fused update over all epochs of a whole rollout
+            if self.fused:
+                self._build_fused(state_shape, num_actions, batch_size,
+                                  build_loss, build_optimize)
 
             # action
             self.action = step_dist.sample(1)[0]
             self.log_policy = tf.reshape(step_dist.log_prob(self.action), [-1])
             self.value = tf.reshape(step_values, [-1])
 
+        # the policy is synced alone to processes that only infer
+        self._build_flat_params('ppo', self.policy_scope)
+
+    def _build_fused(self, state_shape, num_actions, batch_size, build_loss,
+                     build_optimize):
+        with tf.name_scope('fused'):
+            rollout_obs_ph = self.rollout_obs_ph = tf.placeholder(
+                tf.float32, [None] + list(state_shape), name='obs')
+            rollout_returns_ph = self.rollout_returns_ph = tf.placeholder(
+                tf.float32, [None], name='returns')
+            rollout_advantages_ph = self.rollout_advantages_ph = \
+                tf.placeholder(tf.float32, [None], name='advantages')
+            rollout_actions_ph = self.rollout_actions_ph = tf.placeholder(
+                tf.float32, [None, num_actions], name='action')
+            rollout_old_log_probs_ph = self.rollout_old_log_probs_ph = \
+                tf.placeholder(tf.float32, [None], name='old_log_prob')
+            rollout_old_values_ph = self.rollout_old_values_ph = \
+                tf.placeholder(tf.float32, [None], name='old_values')
+            epoch_ph = self.epoch_ph = tf.placeholder(
+                tf.int32, [], name='epoch')
+
+            # one permutation per epoch, the remainder is dropped
+            data_size = tf.shape(rollout_obs_ph)[0]
+            num_batches = data_size // batch_size
+            # permutations can be fed to fix the order of minibatches
+            permutations = self.permutations_ph = \
+                tf.placeholder_with_default(tf.nn.top_k(
+                    tf.random_uniform([epoch_ph, data_size]),
+                    k=data_size)[1], [None, None], name='permutations')
+            indices = tf.reshape(
+                permutations[:, :num_batches * batch_size],
+                [-1, batch_size])
+            num_updates = tf.shape(indices)[0]
+
+            def body(i, losses):
+                index = indices[i]
+                loss = build_loss(
+                    tf.gather(rollout_obs_ph, index),
+                    tf.gather(rollout_actions_ph, index),
+                    tf.gather(rollout_returns_ph, index),
+                    tf.gather(rollout_advantages_ph, index),
+                    tf.gather(rollout_old_log_probs_ph, index),
+                    tf.gather(rollout_old_values_ph, index))
+                with tf.control_dependencies([build_optimize(loss)]):
+                    return i + 1, losses.write(i, loss)
+
+            losses = tf.TensorArray(tf.float32, size=num_updates)
+            _, losses = tf.while_loop(
+                lambda i, _: i < num_updates, body, [0, losses])
+            self.fused_losses = losses.stack()
+
     def _infer_arguments(self):
         return ['obs_t']
 
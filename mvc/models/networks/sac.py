@@ -5,8 +5,12 @@ from mvc.action_output import ActionOutput
 from mvc.models.networks.base_network import BaseNetwork
 from mvc.parametric_function import stochastic_policy_function
 from mvc.parametric_function import q_function, value_function
+from mvc.parametric_function import ContiguousVariables
+import mvc.numpy_parametric_function as npf
 from mvc.models.networks.ddpg import build_target_update
 from mvc.models.networks.ddpg import build_optim
+from mvc.models.networks.ddpg import build_td_error
+from mvc.models.networks.ddpg import build_update_loop
 
 
 def build_v_loss(v_t, q1_t, q2_t, log_prob_t):
@@ -21,14 +25,18 @@ def build_v_loss(v_t, q1_t, q2_t, log_prob_t):
     return loss
 
 
-def build_q_loss(q_t, rewards_tp1, v_tp1, dones_tp1, gamma):
+def build_q_loss(q_t, rewards_tp1, v_tp1, dones_tp1, gamma, weights=None):
     assert len(q_t.shape) == 2 and q_t.shape[1] == 1
     assert len(rewards_tp1.shape) == 2 and rewards_tp1.shape[1] == 1
     assert len(v_tp1.shape) == 2 and v_tp1.shape[1] == 1
     assert len(dones_tp1.shape) == 2 and dones_tp1.shape[1] == 1
 
     target = tf.stop_gradient(rewards_tp1 + gamma * v_tp1 * (1.0 - dones_tp1))
-    loss = 0.5 * tf.reduce_mean((target - q_t) ** 2)
+    errors = (target - q_t) ** 2
+    if weights is not None:
+        assert len(weights.shape) == 2 and weights.shape[1] == 1
+        errors = weights * errors
+    loss = 0.5 * tf.reduce_mean(errors)
     return loss
 
 
@@ -53,6 +61,8 @@ def build_weight_decay(scale, scope):
 
 
 class SACNetwork(BaseNetwork):
+    policy_scope = 'sac/pi'
+
     def __init__(self,
                  fcs,
                  concat_index,
@@ -63,27 +73,76 @@ class SACNetwork(BaseNetwork):
                  pi_lr,
                  q_lr,
                  v_lr,
-                 reg):
+                 reg,
+                 fused=False,
+                 num_updates=1,
+                 numpy_infer=False,
+                 flat_target_update=False):
+        self.state_shape = state_shape
+        self.fused = fused
+        self.num_updates = num_updates
+        self.num_layers = len(fcs)
+        self.numpy_infer = numpy_infer
+        # layers of each target updated scope live in one flat variable
+        self.contiguous = ContiguousVariables() if flat_target_update \
+            else None
         self._build(fcs, concat_index, state_shape, num_actions,
-                    gamma, tau, pi_lr, q_lr, v_lr, reg)
+                    gamma, tau, pi_lr, q_lr, v_lr, reg, fused, num_updates)
+
+        self.weight_cache = npf.WeightCache(['sac/pi', 'sac/v'],
+                                            self.contiguous)
 
     def _infer(self, **kwargs):
-        sess = tf.get_default_session()
+        if self.numpy_infer:
+            return self._numpy_infer(**kwargs)
+
+        # observations of batch environments are already batched
+        if np.ndim(kwargs['obs_t']) > len(self.state_shape):
+            feed_dict = {
+                self.obs_t_ph: kwargs['obs_t']
+            }
+            ops = [self.actions, self.log_probs, self.values]
+            return ActionOutput(*self._run(ops, feed_dict=feed_dict))
+
         feed_dict = {
             self.obs_t_ph: np.array([kwargs['obs_t']])
         }
         ops = [self.action, self.log_prob, self.value]
-        return ActionOutput(*sess.run(ops, feed_dict=feed_dict))
+        return ActionOutput(*self._run(ops, feed_dict=feed_dict))
+
+    def _numpy_infer(self, **kwargs):
+        # observations of batch environments are already batched
+        batch = np.ndim(kwargs['obs_t']) > len(self.state_shape)
+        obs_t = kwargs['obs_t'] if batch else np.array([kwargs['obs_t']])
+
+        weights = self.weight_cache.get()
+        mean, std = npf.stochastic_policy_function(
+            weights, self.num_layers, obs_t, npf.relu, share=True,
+            scope='sac/pi')
+        sampled_action = npf.sample_normal(mean, std)
+        squashed_action = np.tanh(sampled_action)
+        diff = np.sum(np.log(1 - squashed_action ** 2 + 1e-6), axis=1)
+        log_prob = npf.normal_log_prob(sampled_action, mean, std) - diff
+        value = npf.value_function(
+            weights, self.num_layers, obs_t, npf.relu, scope='sac/v')
+        value = np.reshape(value, [-1])
+
+        if batch:
+            return ActionOutput(squashed_action, log_prob, value)
+        return ActionOutput(squashed_action[0], log_prob[0], value[0])
 
     def _update(self, **kwargs):
-        sess = tf.get_default_session()
+        if self.num_updates > 1:
+            return self._update_loop(**kwargs)
+        if self.fused:
+            return self._update_fused(**kwargs)
 
         # update value function
         v_feed_dict = {
             self.obs_t_ph: kwargs['obs_t']
         }
         v_ops = [self.v_loss, self.v_optimize_expr]
-        v_loss, _ = sess.run(v_ops, feed_dict=v_feed_dict)
+        v_loss, _ = self._run(v_ops, feed_dict=v_feed_dict)
 
         # update q functions
         q_feed_dict = {
@@ -93,23 +152,56 @@ class SACNetwork(BaseNetwork):
             self.obs_tp1_ph: kwargs['obs_tp1'],
             self.dones_tp1_ph: kwargs['dones_tp1']
         }
+        if 'weights_t' in kwargs:
+            q_feed_dict[self.weights_t_ph] = kwargs['weights_t']
         q_ops = [
-            self.q1_loss, self.q2_loss,
+            self.q1_loss, self.q2_loss, self.td_errors,
             self.q1_optimize_expr, self.q2_optimize_expr
         ]
-        q1_loss, q2_loss, _, _ = sess.run(q_ops, feed_dict=q_feed_dict)
+        q1_loss, q2_loss, td_errors, _, _ = self._run(q_ops,
+                                                      feed_dict=q_feed_dict)
 
         # update policy function
         pi_feed_dict = {
             self.obs_t_ph: kwargs['obs_t']
         }
         pi_ops = [self.pi_loss, self.pi_optimize_expr]
-        pi_loss, _ = sess.run(pi_ops, feed_dict=pi_feed_dict)
+        pi_loss, _ = self._run(pi_ops, feed_dict=pi_feed_dict)
 
         # update target function
-        sess.run(self.target_update)
+        self._run(self.target_update)
+
+        return v_loss, (q1_loss, q2_loss), pi_loss, td_errors
 
-        return v_loss, (q1_loss, q2_loss), pi_loss
+    def _update_fused(self, **kwargs):
+        ops = [
+            self.v_loss, self.q1_loss, self.q2_loss, self.pi_loss,
+            self.td_errors, self.fused_update_expr
+        ]
+        v_loss, q1_loss, q2_loss, pi_loss, td_errors, _ = self._run(
+            ops, feed_dict=self._update_feed_dict(**kwargs))
+        return v_loss, (q1_loss, q2_loss), pi_loss, td_errors
+
+    def _update_loop(self, **kwargs):
+        ops = [
+            self.loop_v_loss, self.loop_q1_loss, self.loop_q2_loss,
+            self.loop_pi_loss, self.loop_td_errors
+        ]
+        v_loss, q1_loss, q2_loss, pi_loss, td_errors = self._run(
+            ops, feed_dict=self._update_feed_dict(**kwargs))
+        return v_loss, (q1_loss, q2_loss), pi_loss, td_errors
+
+    def _update_feed_dict(self, **kwargs):
+        feed_dict = {
+            self.obs_t_ph: kwargs['obs_t'],
+            self.actions_t_ph: kwargs['actions_t'],
+            self.rewards_tp1_ph: kwargs['rewards_tp1'],
+            self.obs_tp1_ph: kwargs['obs_tp1'],
+            self.dones_tp1_ph: kwargs['dones_tp1']
+        }
+        if 'weights_t' in kwargs:
+            feed_dict[self.weights_t_ph] = kwargs['weights_t']
+        return feed_dict
 
     def _build(self,
                fcs,
@@ -121,8 +213,13 @@ class SACNetwork(BaseNetwork):
                pi_lr,
                q_lr,
                v_lr,
-               reg):
-        with tf.variable_scope('sac'):
+               reg,
+               fused,
+               num_updates):
+        # resource variables are read where they are used so that reads
+        # placed under control dependencies observe preceding updates
+        use_resource = fused or num_updates > 1
+        with tf.variable_scope('sac', use_resource=use_resource):
             obs_t_ph = self.obs_t_ph = tf.placeholder(
                 tf.float32, (None,) + state_shape, name='obs_t')
             actions_t_ph = self.actions_t_ph = tf.placeholder(
@@ -133,6 +230,9 @@ class SACNetwork(BaseNetwork):
                 tf.float32, (None,) + state_shape, name='obs_tp1')
             dones_tp1_ph = self.dones_tp1_ph = tf.placeholder(
                 tf.float32, (None,), name='dones_tp1')
+            # importance sampling weights for prioritized replay
+            weights_t_ph = self.weights_t_ph = tf.placeholder_with_default(
+                tf.ones_like(rewards_tp1_ph), (None,), name='weights_t')
 
             # initialzier
             zeros_init = tf.zeros_initializer()
@@ -140,20 +240,48 @@ class SACNetwork(BaseNetwork):
             last_w_init = tf.contrib.layers.xavier_initializer()
             last_b_init = tf.contrib.layers.xavier_initializer()
 
+            if self.contiguous is not None:
+                for scope in ['v', 'target_v']:
+                    self.contiguous.register(
+                        scope,
+                        lambda obs, scope=scope: value_function(
+                            fcs, obs, tf.nn.relu, w_init, last_w_init,
+                            zeros_init, scope=scope),
+                        obs_t_ph)
+                # the following layers are built as views of flat variables
+                tf.get_variable_scope().set_custom_getter(
+                    self.contiguous.getter)
+
+            def build_policy(obs):
+                pi = stochastic_policy_function(fcs, obs, num_actions,
+                                                tf.nn.relu, share=True,
+                                                w_init=w_init,
+                                                last_w_init=last_w_init,
+                                                last_b_init=last_b_init,
+                                                scope='pi')
+                sampled_action = pi.sample(1)[0]
+                squashed_action = tf.nn.tanh(sampled_action)
+                diff = tf.reduce_sum(
+                    tf.log(1 - squashed_action ** 2 + 1e-6),
+                    axis=1, keepdims=True)
+                log_prob = tf.reshape(
+                    pi.log_prob(sampled_action), [-1, 1]) - diff
+                q1_with_pi = q_function(fcs, obs, squashed_action,
+                                        concat_index, tf.nn.relu, w_init,
+                                        last_w_init, zeros_init, scope='q1')
+                q2_with_pi = q_function(fcs, obs, squashed_action,
+                                        concat_index, tf.nn.relu, w_init,
+                                        last_w_init, zeros_init, scope='q2')
+                return pi, squashed_action, log_prob, q1_with_pi, q2_with_pi
+
+            def build_policy_decay(pi):
+                pi_mean_loss = 0.5 * tf.reduce_mean(pi.mean() ** 2)
+                pi_logstd_loss = 0.5 * tf.reduce_mean(tf.log(pi.stddev()) ** 2)
+                return reg * (pi_mean_loss + pi_logstd_loss)
+
             # policy function
-            pi_t = stochastic_policy_function(fcs, obs_t_ph, num_actions,
-                                              tf.nn.relu, share=True,
-                                              w_init=w_init,
-                                              last_w_init=last_w_init,
-                                              last_b_init=last_b_init,
-                                              scope='pi')
-            sampled_action_t = pi_t.sample(1)[0]
-            squashed_action_t = tf.nn.tanh(sampled_action_t)
-            diff = tf.reduce_sum(
-                tf.log(1 - squashed_action_t ** 2 + 1e-6),
-                axis=1, keepdims=True)
-            log_prob_t = tf.reshape(
-                pi_t.log_prob(sampled_action_t), [-1, 1]) - diff
+            pi_t, squashed_action_t, log_prob_t, q1_t_with_pi, q2_t_with_pi = \
+                build_policy(obs_t_ph)
 
             # value function
             v_t = value_function(
@@ -165,15 +293,9 @@ class SACNetwork(BaseNetwork):
                 last_w_init, zeros_init, scope='target_v')
 
             # two q functions
-            q1_t_with_pi = q_function(fcs, obs_t_ph, squashed_action_t,
-                                      concat_index, tf.nn.relu, w_init,
-                                      last_w_init, zeros_init, scope='q1')
             q1_t = q_function(fcs, obs_t_ph, actions_t_ph, concat_index,
                               tf.nn.relu, w_init, last_w_init,
                               zeros_init, scope='q1')
-            q2_t_with_pi = q_function(fcs, obs_t_ph, squashed_action_t,
-                                      concat_index, tf.nn.relu, w_init,
-                                      last_w_init, zeros_init, scope='q2')
             q2_t = q_function(fcs, obs_t_ph, actions_t_ph, concat_index,
                               tf.nn.relu, w_init, last_w_init,
                               zeros_init, scope='q2')
@@ -181,15 +303,23 @@ class SACNetwork(BaseNetwork):
             # prepare for loss
             rewards_tp1 = tf.reshape(rewards_tp1_ph, [-1, 1])
             dones_tp1 = tf.reshape(dones_tp1_ph, [-1, 1])
+            weights_t = tf.reshape(weights_t_ph, [-1, 1])
 
             # value function loss
             self.v_loss = build_v_loss(
                 v_t, q1_t_with_pi, q2_t_with_pi, log_prob_t)
             # q function loss
             self.q1_loss = build_q_loss(
-                q1_t, rewards_tp1, v_tp1, dones_tp1, gamma)
+                q1_t, rewards_tp1, v_tp1, dones_tp1, gamma, weights_t)
             self.q2_loss = build_q_loss(
+                q2_t, rewards_tp1, v_tp1, dones_tp1, gamma, weights_t)
+            # td error for prioritized replay
+            q1_td_error = build_td_error(
+                q1_t, rewards_tp1, v_tp1, dones_tp1, gamma)
+            q2_td_error = build_td_error(
                 q2_t, rewards_tp1, v_tp1, dones_tp1, gamma)
+            self.td_errors = tf.reshape(
+                0.5 * (tf.abs(q1_td_error) + tf.abs(q2_td_error)), [-1])
             # policy function loss
             self.pi_loss = build_pi_loss(
                 log_prob_t, q1_t_with_pi, q2_t_with_pi)
@@ -198,22 +328,109 @@ class SACNetwork(BaseNetwork):
             self.target_update = build_target_update(
                 'sac/v', 'sac/target_v', tau)
 
-            # policy reguralization
-            pi_mean_loss = 0.5 * tf.reduce_mean(pi_t.mean() ** 2)
-            pi_logstd_loss = 0.5 * tf.reduce_mean(tf.log(pi_t.stddev()) ** 2)
-            policy_decay = reg * (pi_mean_loss + pi_logstd_loss)
-
             # optimization
-            self.v_optimize_expr = build_optim(self.v_loss, v_lr, 'sac/v')
-            self.q1_optimize_expr = build_optim(self.q1_loss, q_lr, 'sac/q1')
-            self.q2_optimize_expr = build_optim(self.q2_loss, q_lr, 'sac/q2')
-            self.pi_optimize_expr = build_optim(self.pi_loss + policy_decay,
-                                                pi_lr, 'sac/pi')
+            v_optimizer = tf.train.AdamOptimizer(v_lr, epsilon=1e-8)
+            q1_optimizer = tf.train.AdamOptimizer(q_lr, epsilon=1e-8)
+            q2_optimizer = tf.train.AdamOptimizer(q_lr, epsilon=1e-8)
+            pi_optimizer = tf.train.AdamOptimizer(pi_lr, epsilon=1e-8)
+
+            def build_update(obs_t, actions_t, rewards_tp1, obs_tp1,
+                             dones_tp1, weights_t):
+                pi_t, _, log_prob_t, q1_t_with_pi, q2_t_with_pi = \
+                    build_policy(obs_t)
+                v_t = value_function(
+                    fcs, obs_t, tf.nn.relu, w_init,
+                    last_w_init, zeros_init, scope='v')
+                v_tp1 = value_function(
+                    fcs, obs_tp1, tf.nn.relu, w_init,
+                    last_w_init, zeros_init, scope='target_v')
+                q1_t = q_function(fcs, obs_t, actions_t, concat_index,
+                                  tf.nn.relu, w_init, last_w_init,
+                                  zeros_init, scope='q1')
+                q2_t = q_function(fcs, obs_t, actions_t, concat_index,
+                                  tf.nn.relu, w_init, last_w_init,
+                                  zeros_init, scope='q2')
+
+                rewards_tp1 = tf.reshape(rewards_tp1, [-1, 1])
+                dones_tp1 = tf.reshape(dones_tp1, [-1, 1])
+                weights_t = tf.reshape(weights_t, [-1, 1])
+
+                v_loss = build_v_loss(
+                    v_t, q1_t_with_pi, q2_t_with_pi, log_prob_t)
+                q1_loss = build_q_loss(
+                    q1_t, rewards_tp1, v_tp1, dones_tp1, gamma, weights_t)
+                q2_loss = build_q_loss(
+                    q2_t, rewards_tp1, v_tp1, dones_tp1, gamma, weights_t)
+                q1_td_error = build_td_error(
+                    q1_t, rewards_tp1, v_tp1, dones_tp1, gamma)
+                q2_td_error = build_td_error(
+                    q2_t, rewards_tp1, v_tp1, dones_tp1, gamma)
+                td_errors = tf.reshape(
+                    0.5 * (tf.abs(q1_td_error) + tf.abs(q2_td_error)), [-1])
+
+                # chain value, q, policy and target updates
+                v_optimize_expr = build_optim(
+                    v_loss, None, 'sac/v', v_optimizer)
+                with tf.control_dependencies([v_optimize_expr]):
+                    q1_optimize_expr = build_optim(
+                        q1_loss, None, 'sac/q1', q1_optimizer)
+                    q2_optimize_expr = build_optim(
+                        q2_loss, None, 'sac/q2', q2_optimizer)
+                with tf.control_dependencies([q1_optimize_expr,
+                                              q2_optimize_expr]):
+                    # policy loss against the updated q functions
+                    pi, _, log_prob, q1_with_pi, q2_with_pi = \
+                        build_policy(obs_t)
+                    pi_loss = build_pi_loss(log_prob, q1_with_pi, q2_with_pi)
+                    pi_optimize_expr = build_optim(
+                        pi_loss + build_policy_decay(pi), None, 'sac/pi',
+                        pi_optimizer)
+                with tf.control_dependencies([pi_optimize_expr]):
+                    update_expr = build_target_update(
+                        'sac/v', 'sac/target_v', tau)
+
+                losses = (v_loss, q1_loss, q2_loss, pi_loss, td_errors)
+                return losses, update_expr
+
+            inputs = [
+                obs_t_ph, actions_t_ph, rewards_tp1_ph, obs_tp1_ph,
+                dones_tp1_ph, weights_t_ph
+            ]
+            if fused:
+                losses, self.fused_update_expr = build_update(*inputs)
+                self.v_loss, self.q1_loss, self.q2_loss = losses[:3]
+                self.pi_loss, self.td_errors = losses[3:]
+            else:
+                self.v_optimize_expr = build_optim(
+                    self.v_loss, None, 'sac/v', v_optimizer)
+                self.q1_optimize_expr = build_optim(
+                    self.q1_loss, None, 'sac/q1', q1_optimizer)
+                self.q2_optimize_expr = build_optim(
+                    self.q2_loss, None, 'sac/q2', q2_optimizer)
+                self.pi_optimize_expr = build_optim(
+                    self.pi_loss + build_policy_decay(pi_t), None, 'sac/pi',
+                    pi_optimizer)
+
+            # multiple updates in a single graph execution
+            if num_updates > 1:
+                v_losses, q1_losses, q2_losses, pi_losses, td_errors = \
+                    build_update_loop(build_update, inputs, num_updates, 5)
+                self.loop_v_loss = tf.reduce_mean(v_losses)
+                self.loop_q1_loss = tf.reduce_mean(q1_losses)
+                self.loop_q2_loss = tf.reduce_mean(q2_losses)
+                self.loop_pi_loss = tf.reduce_mean(pi_losses)
+                self.loop_td_errors = tf.reshape(td_errors, [-1])
 
             # for inference
-            self.action = squashed_action_t[0]
-            self.value = tf.reshape(v_t, [-1])[0]
-            self.log_prob = tf.reshape(log_prob_t, [-1])[0]
+            self.actions = squashed_action_t
+            self.values = tf.reshape(v_t, [-1])
+            self.log_probs = tf.reshape(log_prob_t, [-1])
+            self.action = self.actions[0]
+            self.value = self.values[0]
+            self.log_prob = self.log_probs[0]
+
+        # the policy is synced alone to processes that only infer
+        self._build_flat_params('sac', self.policy_scope)
 
     def _infer_arguments(self):
         return ['obs_t']
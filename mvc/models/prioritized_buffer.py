@@ -0,0 +1,82 @@
+import numpy as np
+
+from mvc.models.buffer import ArrayBuffer
+from mvc.misc.sum_tree import SumTree
+
+
+class PrioritizedBuffer(ArrayBuffer):
+    def __init__(self, maxlen=10 ** 6, alpha=0.6, beta=0.4, epsilon=1e-6,
+                 num_envs=1):
+        super().__init__(maxlen, num_envs)
+        self.alpha = alpha
+        self.beta = beta
+        self.epsilon = epsilon
+        self.max_priority = 1.0
+        self.tree = SumTree(maxlen)
+
+    def add(self, obs_t, action_t, reward_t, done_t):
+        cursor = self.cursor
+        super().add(obs_t, action_t, reward_t, done_t)
+
+        # the latest transition is not sampled until its next state arrives
+        indices = [cursor]
+        priorities = [0.0]
+        if self.size() > self.num_envs:
+            indices.append((cursor - self.num_envs) % self.maxlen)
+            priorities.append(self.max_priority ** self.alpha)
+        self.tree.update(indices, priorities)
+
+    def add_batch(self, obs_t, actions_t, rewards_t, dones_t):
+        cursor = self.cursor
+        super().add_batch(obs_t, actions_t, rewards_t, dones_t)
+
+        offsets = np.arange(self.num_envs)
+        indices = [(cursor + offsets) % self.maxlen]
+        priorities = [np.zeros(self.num_envs)]
+        if self.size() > self.num_envs:
+            indices.append((cursor - self.num_envs + offsets) % self.maxlen)
+            priorities.append(
+                np.ones(self.num_envs) * self.max_priority ** self.alpha)
+        self.tree.update(np.concatenate(indices), np.concatenate(priorities))
+
+    def reset(self):
+        super().reset()
+        self.max_priority = 1.0
+        self.tree.reset()
+
+    def restore(self, snapshot):
+        super().restore(snapshot)
+        self.tree.reset()
+        if self.size() > self.num_envs:
+            # priorities are not saved so that restored ones start at maximum
+            priorities = np.ones(self.size()) * self.max_priority ** self.alpha
+            priorities[-self.num_envs:] = 0.0
+            self.tree.update(np.arange(self.size()), priorities)
+
+    def fetch(self, n, num_batches=1):
+        assert n < self.size()
+        assert n % num_batches == 0
+
+        # each batch is stratified over the whole cumulative priority
+        batch_size = n // num_batches
+        total = self.tree.total()
+        strata = np.arange(batch_size) \
+            + np.random.random((num_batches, batch_size))
+        values = strata.reshape(-1) * (total / batch_size)
+        indices = self.tree.sample(values)
+
+        # importance sampling weights normalized in each batch
+        probs = self.tree.get(indices) / total
+        weights = ((self.size() - self.num_envs) * probs) ** -self.beta
+        weights = weights.reshape(num_batches, batch_size)
+        weights /= np.max(weights, axis=1, keepdims=True)
+
+        batch = self._gather(indices)
+        batch['weights_t'] = weights.reshape(-1)
+        batch['indices_t'] = indices
+        return batch
+
+    def update_priorities(self, indices, td_errors):
+        priorities = np.abs(td_errors) + self.epsilon
+        self.max_priority = max(self.max_priority, np.max(priorities))
+        self.tree.update(indices, priorities ** self.alpha)
@@ -42,12 +42,12 @@ class Rollout:
         assert self.size() > 1
 
         step_length = self.size() - 1
-        obs_t = np.array(self.obs_t)[:step_length]
-        actions_t = np.array(self.actions_t)[:step_length]
-        rewards_tp1 = np.array(self.rewards_t)[1:step_length + 1]
-        terminals_tp1 = np.array(self.terminals_t)[1:step_length + 1]
-        values_t = np.array(self.values_t)[:step_length]
-        log_probs_t = np.array(self.log_probs_t)[:step_length]
+        obs_t = self._stack('obs_t')[:step_length]
+        actions_t = self._stack('actions_t')[:step_length]
+        rewards_tp1 = self._stack('rewards_t')[1:step_length + 1]
+        terminals_tp1 = self._stack('terminals_t')[1:step_length + 1]
+        values_t = self._stack('values_t')[:step_length]
+        log_probs_t = self._stack('log_probs_t')[:step_length]
         bootstrap_value = self.values_t[step_length]
 
         returns_t = compute_returns(bootstrap_value, rewards_tp1,
@@ -70,3 +70,49 @@ class Rollout:
     def size(self):
         # need reward and terminal at t+1
         return len(self.obs_t)
+
+    def _stack(self, name):
+        return np.array(getattr(self, name))
+
+
+class ArrayRollout(Rollout):
+    def __init__(self, time_horizon, num_envs, state_shape, num_actions,
+                 dtype=np.float32):
+        # one extra step is stored for bootstrap value
+        length = time_horizon + 1
+        shape = (length, num_envs)
+        self.obs_t = np.zeros(shape + tuple(state_shape), dtype=dtype)
+        self.actions_t = np.zeros(shape + (num_actions,), dtype=dtype)
+        # returns and advantages are accumulated in float64 as in Rollout
+        self.rewards_t = np.zeros(shape, dtype=np.float64)
+        self.values_t = np.zeros(shape, dtype=np.float64)
+        self.log_probs_t = np.zeros(shape, dtype=dtype)
+        self.terminals_t = np.zeros(shape, dtype=np.float64)
+        self.cursor = 0
+
+    def add(self, obs_t, action_t, reward_t, value_t, log_prob_t, terminal_t):
+        assert self.cursor < self.obs_t.shape[0], 'rollout is full'
+        assert obs_t.shape == self.obs_t.shape[1:]
+        assert action_t.shape == self.actions_t.shape[1:]
+        assert reward_t.shape == self.rewards_t.shape[1:]
+        assert value_t.shape == self.values_t.shape[1:]
+        assert log_prob_t.shape == self.log_probs_t.shape[1:]
+        assert terminal_t.shape == self.terminals_t.shape[1:]
+
+        self.obs_t[self.cursor] = obs_t
+        self.actions_t[self.cursor] = action_t
+        self.rewards_t[self.cursor] = reward_t
+        self.values_t[self.cursor] = value_t
+        self.log_probs_t[self.cursor] = log_prob_t
+        self.terminals_t[self.cursor] = terminal_t
+        self.cursor += 1
+
+    def flush(self):
+        self.cursor = 0
+
+    def size(self):
+        return self.cursor
+
+    def _stack(self, name):
+        # views of preallocated storage, valid until the next flush
+        return getattr(self, name)[:self.cursor]
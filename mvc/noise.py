@@ -19,11 +19,18 @@ class OrnsteinUhlenbeckActionNoise:
         self.prev_x = new_x
         return new_x
 
-    def reset(self):
+    def reset(self, mask=None):
         if self.init_x is not None:
-            self.prev_x = self.init_x
+            init_x = self.init_x
         else:
-            self.prev_x = np.zeros_like(self.mean)
+            init_x = np.zeros_like(self.mean)
+
+        if mask is None:
+            self.prev_x = init_x
+        else:
+            # reset processes of finished environments for batch training
+            mask = np.reshape(mask, (-1,) + (1,) * (self.mean.ndim - 1))
+            self.prev_x = np.where(mask, init_x, self.prev_x)
 
 
 # for evaluation and stochastic policy
@@ -31,5 +38,5 @@ class EmptyNoise:
     def __call__(self):
         return 0.0
 
-    def reset(self):
+    def reset(self, mask=None):
         pass
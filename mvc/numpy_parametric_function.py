@@ -0,0 +1,108 @@
+import math
+import numpy as np
+import tensorflow as tf
+
+
+class WeightCache:
+    def __init__(self, scopes, contiguous=None):
+        # layers stored in flat variables are split into their views
+        self.contiguous = contiguous
+        self.variables = []
+        for scope in scopes:
+            self.variables += tf.get_collection(
+                tf.GraphKeys.TRAINABLE_VARIABLES, scope)
+        self.names = [variable.op.name for variable in self.variables]
+        self.weights = None
+
+    def invalidate(self):
+        self.weights = None
+
+    def get(self):
+        # all weights are pulled with a single session call
+        if self.weights is None:
+            sess = tf.get_default_session()
+            values = sess.run(self.variables)
+            self.weights = dict(zip(self.names, values))
+            if self.contiguous is not None:
+                self.weights.update(self.contiguous.split(self.weights))
+        return self.weights
+
+
+def relu(inpt):
+    return np.maximum(inpt, 0.0)
+
+
+def dense(weights, scope, inpt):
+    return np.dot(inpt, weights[scope + '/kernel']) + weights[scope + '/bias']
+
+
+def _make_fcs(weights, num_layers, inpt, activation, scope):
+    out = np.asarray(inpt, dtype=np.float32)
+    for i in range(num_layers):
+        name = '{}/hiddens/hidden{}'.format(scope, i)
+        out = activation(dense(weights, name, out))
+    return out
+
+
+def stochastic_policy_function(weights,
+                               num_layers,
+                               inpt,
+                               activation=np.tanh,
+                               share=False,
+                               scope='policy'):
+    out = _make_fcs(weights, num_layers, inpt, activation, scope)
+    mean = dense(weights, scope + '/mean', out)
+
+    if share:
+        logstd = dense(weights, scope + '/logstd', out)
+        std = np.exp(np.clip(logstd, -20, 2))
+    else:
+        std = np.zeros_like(mean) + np.exp(weights[scope + '/logstd'])
+
+    return mean, std
+
+
+def deterministic_policy_function(weights,
+                                  num_layers,
+                                  inpt,
+                                  activation=np.tanh,
+                                  scope='policy'):
+    out = _make_fcs(weights, num_layers, inpt, activation, scope)
+    return dense(weights, scope + '/output', out)
+
+
+def value_function(weights,
+                   num_layers,
+                   inpt,
+                   activation=np.tanh,
+                   scope='value'):
+    out = _make_fcs(weights, num_layers, inpt, activation, scope)
+    return dense(weights, scope + '/output', out)
+
+
+def q_function(weights,
+               num_layers,
+               inpt,
+               action,
+               concat_index,
+               activation=np.tanh,
+               scope='action_value'):
+    out = np.asarray(inpt, dtype=np.float32)
+    for i in range(num_layers):
+        if i == concat_index:
+            out = np.concatenate([out, action], axis=1)
+        name = '{}/hiddens/hidden{}'.format(scope, i)
+        out = activation(dense(weights, name, out))
+    return dense(weights, scope + '/output', out)
+
+
+def sample_normal(mean, std):
+    normal = np.random.standard_normal(mean.shape).astype(mean.dtype)
+    return mean + std * normal
+
+
+def normal_log_prob(value, mean, std):
+    # log density of diagonal gaussian summed over action dimensions
+    log_probs = -0.5 * ((value - mean) / std) ** 2 - np.log(std) \
+        - 0.5 * math.log(2.0 * math.pi)
+    return np.sum(log_probs, axis=1)
@@ -0,0 +1,104 @@
+import queue
+import time
+import numpy as np
+import tensorflow as tf
+
+from mvc.misc.shared_array import shared_array, as_array
+
+
+def _interact(index, env, network, noise, buffer, steps, rewards, state):
+    obs, reward = state
+    # action with exploration noise
+    action = network.infer(obs_t=obs).action + noise()
+    buffer.add(index, obs, action, reward, 0.0)
+    obs, reward, done, info = env.step(action)
+    steps[index] += 1
+
+    if done:
+        # terminal transition with dummy action
+        buffer.add(index, obs, np.zeros_like(action), reward, 1.0)
+        rewards.put(info['reward'])
+        noise.reset()
+        obs = env.reset()
+        reward = 0.0
+    return obs, reward
+
+
+def _run(index, env, noise, network, scope, buffer, parameters, shared_steps,
+         rewards, stop):
+    steps = as_array(shared_steps)
+    version = 0
+    state = (env.reset(), 0.0)
+    while not stop.is_set():
+        flat, version = parameters.pull(version)
+        if flat is not None:
+            network.set_flat_params(flat, scope)
+        # wait for the first parameters from the learner
+        if version == 0:
+            time.sleep(1e-2)
+            continue
+
+        state = _interact(index, env, network, noise, buffer, steps, rewards,
+                          state)
+
+
+def _actor(index, env_fn, network_fn, noise_fn, scope, buffer, parameters,
+           shared_steps, rewards, stop):
+    env = env_fn()
+    noise = noise_fn()
+    # rewards left unread at shutdown must not block the exit
+    rewards.cancel_join_thread()
+    # actors run single-threaded on CPU to leave cores for the others
+    config = tf.ConfigProto(device_count={'GPU': 0},
+                            intra_op_parallelism_threads=1,
+                            inter_op_parallelism_threads=1)
+    with tf.Graph().as_default(), tf.device('/cpu:0'):
+        network = network_fn()
+        with tf.Session(config=config) as sess:
+            sess.run(tf.global_variables_initializer())
+            try:
+                _run(index, env, noise, network, scope, buffer, parameters,
+                     shared_steps, rewards, stop)
+            except KeyboardInterrupt:
+                pass
+
+
+class ActorPool:
+    def __init__(self, ctx, env_fns, network_fn, noise_fn, scope, buffer,
+                 parameters):
+        self.num_actors = len(env_fns)
+        shared_steps = shared_array(ctx, (self.num_actors,), np.int64)
+        self.steps = as_array(shared_steps)
+        self.rewards = ctx.Queue()
+        self.stop = ctx.Event()
+
+        self.processes = []
+        for i, env_fn in enumerate(env_fns):
+            args = (i, env_fn, network_fn, noise_fn, scope, buffer,
+                    parameters, shared_steps, self.rewards, self.stop)
+            process = ctx.Process(target=_actor, args=args, daemon=True)
+            self.processes.append(process)
+        self.closed = False
+
+    def start(self):
+        for process in self.processes:
+            process.start()
+
+    def total_steps(self):
+        return int(np.sum(self.steps))
+
+    def episode_rewards(self):
+        rewards = []
+        while True:
+            try:
+                rewards.append(self.rewards.get_nowait())
+            except queue.Empty:
+                return rewards
+
+    def close(self):
+        if self.closed:
+            return
+        self.stop.set()
+        for process in self.processes:
+            process.join()
+        self.closed = True
@@ -0,0 +1,84 @@
+from collections import namedtuple
+
+import numpy as np
+
+from mvc.misc.shared_array import shared_array, as_array, unflatten
+
+
+# reduction shared by all workers and the rank of this worker
+Communicator = namedtuple('Communicator', ['allreduce', 'rank'])
+
+
+class AllReduce:
+    def __init__(self, ctx, num_workers, size):
+        self.num_workers = num_workers
+        self.shared = shared_array(ctx, (num_workers, size), np.float32)
+        self.barrier = ctx.Barrier(num_workers)
+        self._attach()
+
+    def _attach(self):
+        self.slots = as_array(self.shared)
+
+    def __getstate__(self):
+        return {
+            'num_workers': self.num_workers,
+            'shared': self.shared,
+            'barrier': self.barrier
+        }
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._attach()
+
+    def mean(self, rank, values):
+        shapes = [np.shape(value) for value in values]
+        flat = np.concatenate([np.ravel(value) for value in values])
+        self.slots[rank, :flat.size] = flat
+        self.barrier.wait()
+        # every worker reduces the same rows in the same order
+        reduced = np.mean(self.slots[:, :flat.size], axis=0)
+        # slots are not overwritten until all workers have read them
+        self.barrier.wait()
+        return unflatten(reduced, shapes)
+
+    def broadcast(self, rank, values, root=0):
+        shapes = [np.shape(value) for value in values]
+        size = int(sum(np.prod(shape) for shape in shapes))
+        if rank == root:
+            self.slots[root, :size] = np.concatenate(
+                [np.ravel(value) for value in values])
+        self.barrier.wait()
+        flat = self.slots[root, :size].copy()
+        self.barrier.wait()
+        return unflatten(flat, shapes)
+
+    def abort(self):
+        # release workers waiting for a failed one
+        self.barrier.abort()
+
+
+def broadcast_params(allreduce, rank, network, scope):
+    flat = network.get_flat_params(scope)
+    flat, = allreduce.broadcast(rank, [flat])
+    network.set_flat_params(flat, scope)
+
+
+def _run_worker(worker_fn, rank, allreduce):
+    try:
+        worker_fn(rank, allreduce)
+    except BaseException:
+        allreduce.abort()
+        raise
+
+
+def run_workers(ctx, worker_fn, num_workers, size):
+    allreduce = AllReduce(ctx, num_workers, size)
+    processes = []
+    for rank in range(num_workers):
+        process = ctx.Process(target=_run_worker,
+                              args=(worker_fn, rank, allreduce))
+        process.start()
+        processes.append(process)
+    for process in processes:
+        process.join()
+    return [process.exitcode for process in processes]
@@ -0,0 +1,63 @@
+import queue
+import threading
+import tensorflow as tf
+
+from mvc.controllers.eval import EvalController
+from mvc.interaction import loop, batch_loop
+from mvc.view import View
+
+
+class AsyncEvaluator:
+    def __init__(self, env, training_network, network_fn, scope, metrics,
+                 num_episodes, batch=False):
+        self.env = env
+        # parameters are read from the training graph at each snapshot
+        self.training_network = training_network
+        self.scope = scope
+        self.metrics = metrics
+        self.batch = batch
+
+        # evaluation runs a copy of the network in its own graph
+        self.graph = tf.Graph()
+        with self.graph.as_default():
+            self.network = network_fn()
+            config = tf.ConfigProto(intra_op_parallelism_threads=1,
+                                    inter_op_parallelism_threads=1)
+            self.sess = tf.Session(graph=self.graph, config=config)
+            self.sess.run(tf.global_variables_initializer())
+        self.controller = EvalController(self.network, metrics, num_episodes)
+        self.view = View(self.controller)
+
+        # the latest snapshot replaces one still waiting
+        self.snapshots = queue.Queue(maxsize=1)
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def evaluate(self):
+        step = self.metrics.get('step')
+        flat = self.training_network.get_flat_params(self.scope)
+        try:
+            self.snapshots.get_nowait()
+        except queue.Empty:
+            pass
+        self.snapshots.put((step, flat))
+
+    def close(self):
+        # evaluation in progress is finished before returning
+        self.snapshots.put(None)
+        self.thread.join()
+        self.sess.close()
+
+    def _run(self):
+        with self.graph.as_default(), self.sess.as_default():
+            while True:
+                snapshot = self.snapshots.get()
+                if snapshot is None:
+                    break
+                step, flat = snapshot
+                self.network.set_flat_params(flat, self.scope)
+                self.controller.snapshot_step = step
+                if self.batch:
+                    batch_loop(self.env, self.view)
+                else:
+                    loop(self.env, self.view)
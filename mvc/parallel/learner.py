@@ -0,0 +1,112 @@
+import time
+
+import mvc.misc.profiler as profiler
+from mvc.controllers.ddpg import DDPGController
+from mvc.parallel.actor import ActorPool
+from mvc.parallel.parameters import SharedParameters
+
+
+class Learner:
+    def __init__(self, controller, pool, parameters, scope,
+                 publish_interval=1, log_interval=1000, save_interval=10 ** 5):
+        assert isinstance(controller, DDPGController)
+        assert isinstance(pool, ActorPool)
+        assert isinstance(parameters, SharedParameters)
+
+        self.controller = controller
+        self.metrics = controller.metrics
+        self.pool = pool
+        self.parameters = parameters
+        self.scope = scope
+        self.publish_interval = publish_interval
+        self.log_interval = log_interval
+        self.save_interval = save_interval
+
+        self.num_updates = 0
+        self.last_steps = 0
+        self.last_log_step = 0
+        self.last_save_step = 0
+        self.last_log_time = time.perf_counter()
+        self.last_log_updates = 0
+
+        self.metrics.register('update', 'single')
+        self.metrics.register('actor_steps_per_second', 'queue')
+        self.metrics.register('updates_per_second', 'queue')
+
+    def publish(self):
+        network = self.controller.network
+        self.parameters.publish(network.get_flat_params(self.scope))
+
+    def collect(self):
+        # environment steps and episodes are counted by actors
+        steps = self.pool.total_steps()
+        self.metrics.add('step', steps - self.last_steps)
+        self.last_steps = steps
+        self.metrics.add_many('reward', self.pool.episode_rewards())
+
+    def update(self):
+        self.controller.update()
+        self.metrics.add('update', 1)
+        self.num_updates += 1
+        if self.num_updates % self.publish_interval == 0:
+            self.publish()
+
+    def should_log(self):
+        return self._crossed(self.last_log_step, self.log_interval)
+
+    def log(self):
+        step = self.metrics.get('step')
+        now = time.perf_counter()
+        elapsed = now - self.last_log_time
+        self.metrics.add('actor_steps_per_second',
+                         (step - self.last_log_step) / elapsed)
+        self.metrics.add('updates_per_second',
+                         (self.num_updates - self.last_log_updates) / elapsed)
+        self.last_log_step = step
+        self.last_log_time = now
+        self.last_log_updates = self.num_updates
+
+        self.controller.log()
+        profiler.log(self.metrics, step)
+        self.metrics.log_metric('update', step)
+        self.metrics.log_metric('actor_steps_per_second', step)
+        self.metrics.log_metric('updates_per_second', step)
+
+    def should_save(self):
+        return self._crossed(self.last_save_step, self.save_interval)
+
+    def save(self):
+        self.controller.save()
+        self.last_save_step = self.metrics.get('step')
+
+    def is_finished(self):
+        return self.controller.is_finished()
+
+    def _crossed(self, last_step, interval):
+        # actor steps advance by arbitrary amounts between checks
+        return self.metrics.get('step') // interval > last_step // interval
+
+
+def learn(learner):
+    learner.publish()
+    learner.pool.start()
+    try:
+        while not learner.is_finished():
+            learner.collect()
+
+            if learner.controller.should_update():
+                learner.update()
+            else:
+                # wait for actors to fill the replay
+                time.sleep(1e-3)
+
+            if learner.should_log():
+                learner.log()
+
+            if learner.should_save():
+                learner.save()
+
+        learner.save()
+    finally:
+        learner.pool.close()
+        learner.metrics.flush()
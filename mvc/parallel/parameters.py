@@ -0,0 +1,43 @@
+import numpy as np
+
+from mvc.misc.shared_array import shared_array, as_array
+
+
+class SharedParameters:
+    def __init__(self, ctx, size):
+        self.size = size
+        self.shared = {
+            'flat': shared_array(ctx, (size,), np.float32),
+            'version': shared_array(ctx, (1,), np.int64)
+        }
+        self.lock = ctx.Lock()
+        self._attach()
+
+    def _attach(self):
+        self.flat = as_array(self.shared['flat'])
+        self.version = as_array(self.shared['version'])
+
+    def __getstate__(self):
+        return {
+            'size': self.size,
+            'shared': self.shared,
+            'lock': self.lock
+        }
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._attach()
+
+    def publish(self, flat):
+        with self.lock:
+            self.flat[:] = flat
+            self.version[0] += 1
+
+    def pull(self, version):
+        # nothing is copied until newer parameters are published
+        if self.version[0] == version:
+            return None, version
+        with self.lock:
+            flat = self.flat.copy()
+            version = int(self.version[0])
+        return flat, version
@@ -0,0 +1,103 @@
+import numpy as np
+
+from mvc.misc.shared_array import shared_array, as_array
+
+
+class SharedBuffer:
+    FIELDS = ['obs_t', 'actions_t', 'rewards_t', 'dones_t']
+
+    def __init__(self, ctx, maxlen, num_actors, obs_shape, num_actions,
+                 obs_dtype=np.float32):
+        # each actor writes its own segment so that writers never share rows
+        self.num_actors = num_actors
+        self.segment = maxlen // num_actors
+        assert self.segment > 2, 'maxlen is too small for num_actors'
+        self.maxlen = self.segment * num_actors
+        specs = {
+            'obs_t': ((self.maxlen,) + tuple(obs_shape), obs_dtype),
+            'actions_t': ((self.maxlen, num_actions), np.float32),
+            'rewards_t': ((self.maxlen,), np.float32),
+            'dones_t': ((self.maxlen,), np.float32)
+        }
+        self.shared = {}
+        for name in self.FIELDS:
+            self.shared[name] = shared_array(ctx, *specs[name])
+        self.shared['cursors'] = shared_array(ctx, (num_actors,), np.int64)
+        self.shared['counts'] = shared_array(ctx, (num_actors,), np.int64)
+        self._attach()
+
+    def _attach(self):
+        for name, shared in self.shared.items():
+            setattr(self, name, as_array(shared))
+
+    def __getstate__(self):
+        # views are rebuilt from shared memory in child processes
+        return {
+            'num_actors': self.num_actors,
+            'segment': self.segment,
+            'maxlen': self.maxlen,
+            'shared': self.shared
+        }
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._attach()
+
+    def add(self, index, obs_t, action_t, reward_t, done_t):
+        cursor = self.cursors[index]
+        row = index * self.segment + cursor
+        self.obs_t[row] = obs_t
+        self.actions_t[row] = action_t
+        self.rewards_t[row] = reward_t
+        self.dones_t[row] = done_t
+        # the row under the cursor is left out while it is being written,
+        # and so is the oldest row after it which is written next
+        self.cursors[index] = (cursor + 1) % self.segment
+        self.counts[index] = min(self.counts[index] + 1, self.segment - 2)
+
+    def reset(self):
+        self.cursors[:] = 0
+        self.counts[:] = 0
+
+    def size(self):
+        return int(np.sum(self.counts))
+
+    def snapshot(self):
+        # segments are copied as they are to keep rows of each actor apart.
+        # cursors go first so that rows written while copying are not counted
+        snapshot = {}
+        for name in ['cursors', 'counts'] + self.FIELDS:
+            snapshot[name] = getattr(self, name).copy()
+        return snapshot
+
+    def restore(self, snapshot):
+        assert snapshot['cursors'].shape == self.cursors.shape,\
+            'num_actors does not match the snapshot'
+        for name in self.FIELDS + ['cursors', 'counts']:
+            getattr(self, name)[:] = snapshot[name]
+
+    def fetch(self, batch_size):
+        assert batch_size < self.size()
+
+        cursors = self.cursors.copy()
+        counts = self.counts.copy()
+        # the latest transition of each actor does not have its next state
+        valid = np.where(counts > 0, counts - 1, 0)
+        assert np.sum(valid) > 0
+
+        # actors are drawn by their sizes to sample rows uniformly
+        actors = np.random.choice(
+            self.num_actors, size=batch_size, p=valid / np.sum(valid))
+        offsets = np.random.random(batch_size) * valid[actors]
+        offsets = offsets.astype(np.int64)
+        starts = (cursors - counts) % self.segment
+        positions = (starts[actors] + offsets) % self.segment
+        indices = actors * self.segment + positions
+        next_indices = actors * self.segment + (positions + 1) % self.segment
+        return {
+            'obs_t': self.obs_t[indices],
+            'actions_t': self.actions_t[indices],
+            'rewards_tp1': self.rewards_t[next_indices],
+            'obs_tp1': self.obs_t[next_indices],
+            'dones_tp1': self.dones_t[next_indices]
+        }
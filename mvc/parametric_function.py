@@ -109,3 +109,80 @@ def q_function(fcs,
                                 bias_initializer=last_b_init,
                                 name='output')
     return value
+
+
+class ContiguousVariables:
+    def __init__(self):
+        # flat variable name -> (view name, shape) of each layer
+        self.layouts = {}
+        # view name -> (flat variable, index in layout)
+        self.views = {}
+        # flat variable name -> views split at the latest read
+        self.reads = {}
+
+    def register(self, scope, build, *inputs):
+        # shapes and initializers are recorded in a scratch graph
+        specs = []
+
+        def record(getter, name, *args, **kwargs):
+            shape = tf.TensorShape(kwargs['shape']).as_list()
+            dtype = tf.as_dtype(kwargs['dtype']).base_dtype
+            specs.append((name, shape, dtype, kwargs['initializer']))
+            return getter(name, *args, **kwargs)
+
+        outer = tf.get_variable_scope().name
+        with tf.Graph().as_default():
+            placeholders = [
+                tf.placeholder(inpt.dtype, inpt.shape) for inpt in inputs
+            ]
+            with tf.variable_scope(outer, custom_getter=record):
+                build(*placeholders)
+
+        with tf.variable_scope(scope):
+            values = [
+                tf.reshape(_initial_value(initializer, shape, dtype), [-1])
+                for _, shape, dtype, initializer in specs
+            ]
+            flat = tf.get_variable('flat', initializer=tf.concat(values, 0))
+
+        self.layouts[flat.op.name] = [
+            (name, shape) for name, shape, _, _ in specs
+        ]
+        for i, (name, _, _, _) in enumerate(specs):
+            self.views[name] = (flat, i)
+
+    def getter(self, getter, name, *args, **kwargs):
+        if name not in self.views:
+            return getter(name, *args, **kwargs)
+        flat, index = self.views[name]
+        # layers are built in the registered order so that the first layer
+        # reads the flat variable where the layers are used
+        if index == 0 or flat.op.name not in self.reads:
+            layout = self.layouts[flat.op.name]
+            chunks = tf.split(flat, [_size(shape) for _, shape in layout])
+            self.reads[flat.op.name] = [
+                tf.reshape(chunk, shape)
+                for chunk, (_, shape) in zip(chunks, layout)
+            ]
+        return self.reads[flat.op.name][index]
+
+    def split(self, weights):
+        views = {}
+        for flat_name, layout in self.layouts.items():
+            if flat_name not in weights:
+                continue
+            sizes = [_size(shape) for _, shape in layout]
+            chunks = np.split(weights[flat_name], np.cumsum(sizes)[:-1])
+            for (name, shape), chunk in zip(layout, chunks):
+                views[name] = np.reshape(chunk, shape)
+        return views
+
+
+def _size(shape):
+    return int(np.prod(shape))
+
+
+def _initial_value(initializer, shape, dtype):
+    if initializer is None:
+        initializer = tf.glorot_uniform_initializer()
+    return initializer(shape, dtype=dtype)
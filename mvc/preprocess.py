@@ -1,5 +1,7 @@
 import numpy as np
 
+from mvc.misc.jit import reverse_scan
+
 
 def compute_returns(bootstrap_value, rewards, terminals, gamma):
     assert isinstance(rewards, np.ndarray), 'rewards must be ndarray'
@@ -12,14 +14,12 @@ def compute_returns(bootstrap_value, rewards, terminals, gamma):
         assert bootstrap_value.shape[0] == rewards.shape[1],\
             'bootstrap_value must have column length of rewards'
 
-    returns = []
-    return_tp1 = bootstrap_value
-    for i in reversed(range(rewards.shape[0])):
-        return_t = rewards[i] + (1.0 - terminals[i]) * gamma * return_tp1
-        returns.append(return_t)
-        return_tp1 = return_t
-    returns = reversed(returns)
-    return np.array(list(returns))
+    # discount factors masked by terminal flags for the whole array
+    discounts = (1.0 - terminals) * gamma
+    returns = np.empty(np.broadcast(rewards, bootstrap_value).shape,
+                       dtype=np.result_type(rewards, discounts,
+                                            bootstrap_value))
+    return reverse_scan(rewards, discounts, bootstrap_value, returns)
 
 
 def compute_gae(bootstrap_value, rewards, values, terminals, gamma, lam):
@@ -37,19 +37,13 @@ def compute_gae(bootstrap_value, rewards, values, terminals, gamma, lam):
             'bootstrap_value must have column length of rewards'
 
     values = np.concatenate((values, [bootstrap_value]), axis=0)
-    # compute delta
-    deltas = []
-    for i in reversed(range(rewards.shape[0])):
-        return_t = rewards[i] + (1.0 - terminals[i]) * gamma * values[i + 1]
-        delta = return_t - values[i]
-        deltas.append(delta)
-    deltas = np.array(list(reversed(deltas)))
-    # compute gae
-    adv_tp1 = deltas[-1]
-    advantages = [adv_tp1]
-    for i in reversed(range(deltas.shape[0] - 1)):
-        adv_t = deltas[i] + (1.0 - terminals[i]) * gamma * lam * adv_tp1
-        advantages.append(adv_t)
-        adv_tp1 = adv_t
-    advantages = reversed(advantages)
-    return np.array(list(advantages))
+    # compute delta for the whole array at once
+    masks = 1.0 - terminals
+    deltas = rewards + masks * gamma * values[1:] - values[:-1]
+    # compute gae with reverse discounted scan
+    discounts = masks * gamma * lam
+    advantages = np.empty(deltas.shape,
+                          dtype=np.result_type(deltas, discounts))
+    advantages[-1] = deltas[-1]
+    reverse_scan(deltas[:-1], discounts[:-1], deltas[-1], advantages[:-1])
+    return advantages
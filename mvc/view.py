@@ -1,18 +1,37 @@
+import mvc.misc.profiler as profiler
+
+
 class View:
     def __init__(self, controller):
         self.controller = controller
 
     def step(self, obs, reward, done, info):
+        self.prepare_step()
+        with profiler.phase('controller_step'):
+            return self.controller.step(obs, reward, done, info)
+
+    def prepare_step(self):
         if self.controller.should_update():
-            self.controller.update()
+            with profiler.phase('controller_update'):
+                self.controller.update()
 
         if self.controller.should_log():
-            self.controller.log()
+            with profiler.phase('log'):
+                self.controller.log()
+                self.controller.log_reports()
 
         if self.controller.should_save():
-            self.controller.save()
+            with profiler.phase('save'):
+                self.controller.save()
+
+    def infer(self, obs):
+        return self.controller.infer(obs)
+
+    def record(self, obs, reward, done, info, output):
+        self.controller.record(obs, reward, done, info, output)
 
-        return self.controller.step(obs, reward, done, info)
+    def report(self, name, value):
+        self.controller.report(name, value)
 
     def stop_episode(self, obs, reward, info):
         self.controller.stop_episode(obs, reward, info)
@@ -21,6 +40,8 @@ class View:
         is_finished = self.controller.is_finished()
         if is_finished:
             self.controller.save()
+            # exit after checkpoints written in background are completed
+            self.controller.flush()
         return is_finished
 
     def should_eval(self):
@@ -36,6 +36,28 @@ class BaseControllerTest(TestCase):
         with pytest.raises(NotImplementedError):
             controller.stop_episode('obs', 'reward', 'info')
 
+    def test_report(self):
+        metrics = Metrics('test')
+        controller = BaseController(metrics, 110, 120, 130, 140)
+
+        controller.report('overlap', 0.5)
+        controller.report('overlap', 1.0)
+
+        assert controller.reports == ['overlap']
+        assert metrics.get('overlap') == 0.75
+
+    def test_log_reports(self):
+        metrics = Metrics('test')
+        controller = BaseController(metrics, 110, 120, 130, 140)
+        metrics.register('step', 'single')
+        metrics.add('step', 10)
+        controller.report('overlap', 0.5)
+        metrics.log_metric = MagicMock()
+
+        controller.log_reports()
+
+        metrics.log_metric.assert_called_once_with('overlap', 10)
+
     def test_should_log(self):
         metrics = Metrics('test')
         controller = BaseController(metrics, 110, 120, 130, 140)
@@ -78,6 +100,26 @@ class BaseControllerTest(TestCase):
         metrics.get.assert_called_once_with('step')
         metrics.save_model.assert_called_once_with(step)
 
+    def test_save_with_buffer(self):
+        metrics = Metrics('test')
+        controller = BaseController(metrics, 110, 120, 130, 140, 'buffer')
+
+        step = np.random.randint(100)
+        metrics.get = MagicMock(return_value=step)
+        metrics.save_model = MagicMock()
+        metrics.save_buffer = MagicMock()
+        controller.save()
+        metrics.save_model.assert_called_once_with(step)
+        metrics.save_buffer.assert_called_once_with('buffer', step)
+
+    def test_flush(self):
+        metrics = Metrics('test')
+        controller = BaseController(metrics, 110, 120, 130, 140)
+
+        metrics.flush = MagicMock()
+        controller.flush()
+        metrics.flush.assert_called_once_with()
+
     def test_if_finished(self):
         metrics = Metrics('test')
         controller = BaseController(metrics, 110, 120, 130, 140)
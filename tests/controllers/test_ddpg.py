@@ -1,3 +1,4 @@
+import multiprocessing
 import numpy as np
 import unittest
 import pytest
@@ -5,8 +6,10 @@ import pytest
 from unittest.mock import MagicMock
 from mvc.models.networks.base_network import BaseNetwork
 from mvc.controllers.ddpg import DDPGController
-from mvc.models.buffer import Buffer
+from mvc.models.buffer import Buffer, ArrayBuffer
+from mvc.models.prioritized_buffer import PrioritizedBuffer
 from mvc.models.metrics import Metrics
+from mvc.parallel.shared_buffer import SharedBuffer
 from mvc.noise import OrnsteinUhlenbeckActionNoise
 from tests.test_utils import make_output, make_input
 from tests.test_utils import DummyNetwork, DummyMetrics, DummyNoise
@@ -59,6 +62,58 @@ class DDPGControllerTest(unittest.TestCase):
         action = self.controller.step(*inpt)
         assert self.buffer.size() == 2
 
+    def test_step_with_batch(self):
+        buffer = ArrayBuffer(num_envs=4)
+        controller = DDPGController(self.network, buffer, self.metrics,
+                                    self.noise, num_actions=4, batch_size=32)
+        output = make_output(batch_size=4, batch=True)
+        self.noise.reset = MagicMock()
+        self.network._infer = MagicMock(return_value=output)
+        self.network._infer_arguments = MagicMock(return_value=['obs_t'])
+        self.metrics.add = MagicMock()
+        self.metrics.add_many = MagicMock()
+
+        inpt = make_input(batch_size=4, batch=True)
+        action = controller.step(*inpt)
+
+        assert buffer.size() == 4
+        assert np.all(output.action == action)
+        assert np.all(self.noise.reset.call_args[0][0] == (inpt[2] == 1.0))
+        assert tuple(self.metrics.add.call_args_list[0])[0] == ('step', 4)
+        rewards = self.metrics.add_many.call_args[0][1]
+        assert self.metrics.add_many.call_args[0][0] == 'reward'
+        assert len(rewards) == np.sum(inpt[2])
+
+    def test_should_log_with_batch(self):
+        metrics = Metrics('test')
+        controller = DDPGController(self.network, ArrayBuffer(num_envs=3),
+                                    metrics, self.noise, num_actions=4,
+                                    batch_size=32, log_interval=10,
+                                    save_interval=20, eval_interval=30)
+        self.noise.reset = MagicMock()
+        self.network._infer = MagicMock(
+            return_value=make_output(batch_size=3, batch=True))
+        self.network._infer_arguments = MagicMock(return_value=['obs_t'])
+
+        assert controller.should_log()
+        logged = []
+        saved = []
+        evaluated = []
+        for i in range(20):
+            controller.step(*make_input(batch_size=3, batch=True))
+            step = metrics.get('step')
+            if controller.should_log():
+                logged.append(step)
+            if controller.should_save():
+                saved.append(step)
+            if controller.should_eval():
+                evaluated.append(step)
+
+        # intervals not divisible by the number of environments still fire
+        assert logged == [12, 21, 30, 42, 51, 60]
+        assert saved == [21, 42, 60]
+        assert evaluated == [30, 60]
+
     def test_should_update(self):
         self.buffer.size = MagicMock(return_value=np.random.randint(32))
         assert not self.controller.should_update()
@@ -85,6 +140,97 @@ class DDPGControllerTest(unittest.TestCase):
         assert self.network._update.call_count == 1
         self.controller._record_update_metrics.assert_called_once_with(critic_loss, actor_loss)
 
+    def test_update_with_prioritized_buffer(self):
+        buffer = PrioritizedBuffer()
+        controller = DDPGController(self.network, buffer, self.metrics,
+                                    self.noise, num_actions=4, batch_size=32)
+        td_errors = np.random.random(32)
+        output = make_output()
+        self.network._update = MagicMock(return_value=(0.0, 0.0, td_errors))
+        self.network._update_arguments = MagicMock(return_value=['obs_t', 'actions_t', 'rewards_tp1', 'obs_tp1', 'dones_tp1'])
+        self.network._infer_arguments = MagicMock(return_value=['obs_t'])
+        self.network._infer = MagicMock(return_value=output)
+        buffer.update_priorities = MagicMock()
+
+        for i in range(33):
+            inpt = make_input()
+            controller.step(*inpt)
+        controller.update()
+
+        assert 'weights_t' in self.network._update.call_args[1]
+        assert buffer.update_priorities.call_count == 1
+        assert np.all(buffer.update_priorities.call_args[0][1] == td_errors)
+
+    def test_update_with_prioritized_buffer_and_multiple_updates(self):
+        buffer = PrioritizedBuffer()
+        controller = DDPGController(self.network, buffer, self.metrics,
+                                    self.noise, num_actions=4, batch_size=8,
+                                    updates_per_step=4)
+        output = make_output()
+        self.network._update = MagicMock(return_value=(0.0, 0.0, np.zeros(32)))
+        self.network._update_arguments = MagicMock(return_value=['obs_t', 'actions_t', 'rewards_tp1', 'obs_tp1', 'dones_tp1', 'weights_t'])
+        self.network._infer_arguments = MagicMock(return_value=['obs_t'])
+        self.network._infer = MagicMock(return_value=output)
+        buffer.update_priorities = MagicMock()
+
+        for i in range(81):
+            controller.step(*make_input())
+        controller.update()
+
+        # every gradient step takes a batch stratified over the whole tree
+        indices = buffer.update_priorities.call_args[0][0].reshape(4, 8)
+        assert np.all(np.min(indices, axis=1) < 10)
+        assert np.all(np.max(indices, axis=1) >= 70)
+        weights = self.network._update.call_args[1]['weights_t']
+        assert np.allclose(np.max(weights.reshape(4, 8), axis=1), 1.0)
+
+    def test_should_update_with_update_every(self):
+        controller = DDPGController(self.network, self.buffer, self.metrics,
+                                    self.noise, num_actions=4, batch_size=32,
+                                    updates_per_step=2, update_every=4)
+        self.network._infer = MagicMock(return_value=make_output())
+        self.network._infer_arguments = MagicMock(return_value=['obs_t'])
+        self.buffer.size = MagicMock(return_value=32 * 8 + 1)
+
+        for i in range(8):
+            controller.step(*make_input())
+            assert controller.should_update() == ((i + 1) % 4 == 0)
+
+        self.buffer.size = MagicMock(return_value=32 * 8)
+        assert not controller.should_update()
+
+    def test_update_with_multiple_updates(self):
+        controller = DDPGController(self.network, self.buffer, self.metrics,
+                                    self.noise, num_actions=4, batch_size=32,
+                                    updates_per_step=2, update_every=4)
+        output = make_output()
+        self.network._update = MagicMock(return_value=(0.0, 0.0))
+        self.network._update_arguments = MagicMock(return_value=['obs_t', 'actions_t', 'rewards_tp1', 'obs_tp1', 'dones_tp1'])
+        self.network._infer_arguments = MagicMock(return_value=['obs_t'])
+        self.network._infer = MagicMock(return_value=output)
+
+        for i in range(32 * 8 + 4):
+            controller.step(*make_input())
+        controller.update()
+
+        assert self.network._update.call_count == 1
+        assert self.network._update.call_args[1]['obs_t'].shape[0] == 32 * 8
+
+    def test_save_with_shared_buffer(self):
+        ctx = multiprocessing.get_context()
+        buffer = SharedBuffer(ctx, 10, 2, (16,), 4)
+        controller = DDPGController(self.network, buffer, self.metrics,
+                                    self.noise, num_actions=4, batch_size=32)
+        self.metrics.get = MagicMock(return_value=10)
+        self.metrics.save_model = MagicMock()
+        self.metrics.save_buffer = MagicMock()
+
+        controller.save()
+
+        self.metrics.save_model.assert_called_once_with(10)
+        self.metrics.save_buffer.assert_called_once_with(buffer, 10)
+        assert buffer.snapshot()['counts'].shape == (2,)
+
     def test_log(self):
         step = np.random.randint(10) + 1
         self.metrics.get = MagicMock(return_value=step)
@@ -116,6 +116,15 @@ class TestEvalController:
         assert list(self.metrics.reset.mock_calls[1])[1] == ('eval_reward',)
         self.metrics.log_metric.assert_called_once_with('eval_reward', 10)
 
+    def test_is_finished_with_snapshot_step(self):
+        self.metrics.get = MagicMock(return_value=10)
+        self.metrics.reset = MagicMock()
+        self.metrics.log_metric = MagicMock()
+
+        self.controller.snapshot_step = 3
+        assert self.controller.is_finished()
+        self.metrics.log_metric.assert_called_once_with('eval_reward', 3)
+
     def test_should_save(self):
         assert not self.controller.should_save()
 
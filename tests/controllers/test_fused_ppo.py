@@ -0,0 +1,40 @@
+import numpy as np
+import unittest
+
+from unittest.mock import MagicMock
+from mvc.controllers.fused_ppo import FusedPPOController
+from mvc.models.rollout import Rollout
+from tests.test_utils import DummyNetwork, DummyMetrics
+from tests.test_utils import make_input, make_output
+
+
+class FusedPPOControllerTest(unittest.TestCase):
+    def setUp(self):
+        self.network = DummyNetwork()
+        self.rollout = Rollout()
+        self.metrics = DummyMetrics()
+        self.controller = FusedPPOController(
+            self.network, self.rollout, self.metrics, num_envs=4,
+            time_horizon=128, epoch=4, batch_size=32, gamma=0.99, lam=0.9)
+
+    def test_update_success(self):
+        inpt = make_input(batch_size=4, batch=True)
+        output = make_output(batch_size=4, batch=True)
+        losses = np.random.random(128 * 4 * 4 // 32)
+        self.network._infer = MagicMock(return_value=output)
+        self.network._infer_arguments = MagicMock(return_value=['obs_t'])
+        self.network._update_arguments = MagicMock(return_value=['obs_t', 'actions_t', 'returns_t', 'advantages_t', 'log_probs_t'])
+        self.network._update = MagicMock()
+        self.network._fused_update = MagicMock(return_value=losses)
+
+        for i in range(129):
+            action = self.controller.step(*inpt)
+
+        assert np.allclose(self.controller.update(), np.mean(losses))
+        assert self.rollout.size() == 0
+        assert self.network._update.call_count == 0
+        assert self.network._fused_update.call_count == 1
+        args, kwargs = self.network._fused_update.call_args
+        assert args == (4,)
+        assert kwargs['obs_t'].shape == (128 * 4, 16)
+        assert kwargs['returns_t'].shape == (128 * 4,)
@@ -0,0 +1,101 @@
+import numpy as np
+import unittest
+
+from unittest.mock import MagicMock
+from mvc.controllers.parallel_ppo import ParallelPPOController
+from mvc.models.metrics import Metrics
+from mvc.models.rollout import Rollout
+from mvc.parallel.data_parallel import Communicator
+from tests.test_utils import DummyNetwork, DummyMetrics
+from tests.test_utils import make_input, make_output
+
+
+class DummyAllReduce:
+    def __init__(self, num_workers):
+        self.num_workers = num_workers
+
+    def mean(self, rank, values):
+        return [np.array(value) * 0.5 for value in values]
+
+
+class ParallelPPOControllerTest(unittest.TestCase):
+    def setUp(self):
+        self.network = DummyNetwork()
+        self.rollout = Rollout()
+        self.metrics = DummyMetrics()
+        self.allreduce = DummyAllReduce(2)
+        self.controller = ParallelPPOController(
+            self.network, self.rollout, self.metrics,
+            Communicator(self.allreduce, 1),
+            num_envs=4, time_horizon=128, epoch=2, batch_size=32,
+            gamma=0.99, lam=0.9)
+
+    def test_record(self):
+        self.metrics.add = MagicMock()
+        inpt = make_input(batch_size=4, batch=True)
+        output = make_output(batch_size=4, batch=True)
+        self.controller.record(*inpt, output)
+
+        assert self.rollout.size() == 1
+        # steps of all workers are counted
+        assert tuple(self.metrics.add.call_args_list[0])[0] == ('step', 8)
+
+    def test_update(self):
+        self.controller.should_update = MagicMock(return_value=True)
+        self.rollout.flush = MagicMock()
+        batches = [{'obs_t': np.random.random((32, 16))} for _ in range(4)]
+        self.controller._batches = MagicMock(return_value=batches)
+        gradients = [np.ones((3, 3)), np.ones((3,))]
+        self.network.compute_gradients = MagicMock(
+            return_value=(1.0, gradients))
+        self.network.apply_gradients = MagicMock()
+
+        loss = self.controller.update()
+
+        assert loss == 0.5
+        assert self.network.compute_gradients.call_count == 8
+        assert self.network.apply_gradients.call_count == 8
+        applied = self.network.apply_gradients.call_args[0][0]
+        assert np.all(applied[0] == 0.5)
+        assert applied[1].shape == (3,)
+        self.rollout.flush.assert_called_once_with()
+
+    def test_should_log(self):
+        self.metrics.get = MagicMock(return_value=128)
+        assert not self.controller.should_log()
+        assert not self.controller.should_save()
+        assert not self.controller.should_eval()
+
+        self.controller.rank = 0
+        assert self.controller.should_log()
+
+    def test_intervals_not_divided_by_steps(self):
+        controller = ParallelPPOController(
+            self.network, self.rollout, self.metrics,
+            Communicator(DummyAllReduce(2), 0),
+            num_envs=3, time_horizon=128, epoch=2, batch_size=32,
+            gamma=0.99, lam=0.9, log_interval=20, save_interval=50,
+            eval_interval=50)
+        steps = [0]
+        self.metrics.get = MagicMock(side_effect=lambda name: steps[0])
+
+        def add(name, value):
+            if name == 'step':
+                steps[0] += value
+        self.metrics.add = MagicMock(side_effect=add)
+
+        logged = []
+        saved = []
+        inpt = make_input(batch_size=3, batch=True)
+        output = make_output(batch_size=3, batch=True)
+        for _ in range(20):
+            controller.record(*inpt, output)
+            if controller.should_log():
+                logged.append(steps[0])
+            if controller.should_save():
+                assert controller.should_eval()
+                saved.append(steps[0])
+
+        # 6 steps per record cross every interval once
+        assert logged == [24, 42, 60, 84, 102, 120]
+        assert saved == [54, 102]
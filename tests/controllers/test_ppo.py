@@ -5,7 +5,7 @@ import copy
 
 from unittest.mock import MagicMock, Mock
 from mvc.controllers.ppo import PPOController
-from mvc.models.rollout import Rollout
+from mvc.models.rollout import Rollout, ArrayRollout
 from mvc.preprocess import compute_returns, compute_gae
 from tests.test_utils import make_input, make_output
 from tests.test_utils import DummyNetwork, DummyMetrics
@@ -37,6 +37,20 @@ class TestPPOController:
         assert np.all(output.value == self.rollout.values_t[0])
         assert np.all(output.log_prob == self.rollout.log_probs_t[0])
 
+    def test_infer_and_record(self):
+        output = make_output(batch_size=4, batch=True)
+        self.network._infer = MagicMock(return_value=output)
+        self.network._infer_arguments = MagicMock(return_value=['obs_t'])
+
+        inpt = make_input(batch_size=4, batch=True)
+        assert self.controller.infer(inpt[0]) == output
+        assert self.rollout.size() == 0
+
+        self.controller.record(*inpt, output)
+        assert self.rollout.size() == 1
+        assert np.all(inpt[0] == self.rollout.obs_t[0])
+        assert np.all(output.action == self.rollout.actions_t[0])
+
     def test_should_update(self):
         output = make_output(batch_size=4, batch=True)
         self.network._infer = MagicMock(return_value=output)
@@ -82,6 +96,26 @@ class TestPPOController:
                     assert len(batch[key].shape) == 1
             assert count == 128 * 4 // 32
 
+    def test_batches_with_array_rollout(self):
+        rollout = ArrayRollout(128, 4, (16,), 4)
+        controller = PPOController(
+            self.network, rollout, self.metrics, num_envs=4,
+            time_horizon=128, epoch=4, batch_size=32, gamma=0.99, lam=0.9)
+        output = make_output(batch_size=4, batch=True)
+        self.network._infer = MagicMock(return_value=output)
+        self.network._infer_arguments = MagicMock(return_value=['obs_t'])
+
+        for i in range(129):
+            controller.step(*make_input(batch_size=4, batch=True))
+
+        count = 0
+        for batch in controller._batches():
+            count += 1
+            assert batch['obs_t'].shape == (32, 16)
+            assert batch['actions_t'].shape == (32, 4)
+            assert batch['returns_t'].shape == (32,)
+        assert count == 128 * 4 // 32
+
     def test_batch_with_short_trajectory_error(self):
         output = make_output(batch_size=4, batch=True)
         self.network._infer_arguments = MagicMock(return_value=['obs_t'])
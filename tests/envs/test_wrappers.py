@@ -0,0 +1,134 @@
+import numpy as np
+import unittest
+
+from unittest.mock import MagicMock
+from mvc.envs.wrappers import BatchEnvWrapper, SubprocBatchEnvWrapper
+
+
+class DummySpace:
+    def __init__(self, shape):
+        self.shape = shape
+        self.dtype = np.float32
+
+
+class DummyEnv:
+    def __init__(self, seed):
+        self.seed = seed
+        self.observation_space = DummySpace((3,))
+        self.action_space = DummySpace((2,))
+        self.t = 0
+
+    def step(self, action):
+        self.t += 1
+        obs = np.full((3,), self.seed * 100 + self.t + action[0])
+        done = self.t % (self.seed + 2) == 0
+        return obs, float(self.seed + 1), done, {}
+
+    def reset(self):
+        return np.full((3,), -self.seed)
+
+    def render(self):
+        pass
+
+    def close(self):
+        pass
+
+
+def make_env_fns(num_envs):
+    return [lambda seed=i: DummyEnv(seed) for i in range(num_envs)]
+
+
+class BatchEnvWrapperTest(unittest.TestCase):
+    def test_step_async(self):
+        env1 = BatchEnvWrapper([fn() for fn in make_env_fns(4)])
+        env2 = BatchEnvWrapper([fn() for fn in make_env_fns(4)])
+        env1.reset()
+        env2.reset()
+        for i in range(5):
+            action = np.random.random((4, 2))
+            obs, reward, done, info = env1.step(action)
+            env2.step_async(action[2:], [2, 3])
+            env2.step_async(action[:2], [0, 1])
+            obs1, reward1, done1, info1 = env2.step_wait([0, 1])
+            obs2, reward2, done2, info2 = env2.step_wait([2, 3])
+            assert np.all(obs == np.concatenate([obs1, obs2]))
+            assert np.all(reward == np.concatenate([reward1, reward2]))
+            assert np.all(done == np.concatenate([done1, done2]))
+            assert info == info1 + info2
+
+    def test_close(self):
+        envs = [fn() for fn in make_env_fns(4)]
+        for env in envs:
+            env.close = MagicMock()
+        BatchEnvWrapper(envs).close()
+        for env in envs:
+            env.close.assert_called_once_with()
+
+
+class SubprocBatchEnvWrapperTest(unittest.TestCase):
+    def setUp(self):
+        self.env = SubprocBatchEnvWrapper(make_env_fns(4))
+
+    def tearDown(self):
+        self.env.close()
+
+    def test_close_local_env(self):
+        envs = []
+
+        def env_fn():
+            env = DummyEnv(0)
+            env.close = MagicMock()
+            envs.append(env)
+            return env
+
+        env = SubprocBatchEnvWrapper([env_fn])
+        env.close()
+        # only the instance used to read spaces lives in this process
+        assert len(envs) == 1
+        envs[0].close.assert_called_once_with()
+
+    def test_spaces(self):
+        assert self.env.observation_space.shape == (3,)
+        assert self.env.action_space.shape == (2,)
+
+    def test_reset(self):
+        obs = self.env.reset()
+        assert obs.shape == (4, 3)
+        # float observations are not down-cast to the declared float32
+        assert obs.dtype == np.float64
+        assert np.all(obs == np.arange(4).reshape(4, 1) * -1.0)
+
+    def test_step_matches_batch_env_wrapper(self):
+        env = BatchEnvWrapper([fn() for fn in make_env_fns(4)])
+        assert np.all(env.reset() == self.env.reset())
+        for i in range(10):
+            action = np.random.random((4, 2))
+            obs1, reward1, done1, info1 = env.step(action)
+            obs2, reward2, done2, info2 = self.env.step(action)
+            assert np.all(obs1 == obs2)
+            assert np.all(reward1 == reward2)
+            assert np.all(done1 == done2)
+            assert info1 == info2
+
+    def test_step_without_copy(self):
+        env = SubprocBatchEnvWrapper(make_env_fns(2), copy_obs=False)
+        obs1 = env.reset()
+        obs2, _, _, _ = env.step(np.zeros((2, 2)))
+        env.close()
+        assert obs1 is obs2
+        assert obs2.flags['C_CONTIGUOUS']
+
+    def test_step_async(self):
+        self.env.reset()
+        action = np.random.random((4, 2))
+        self.env.step_async(action[:2], np.arange(2))
+        self.env.step_async(action[2:], np.arange(2, 4))
+        obs1, reward1, done1, info1 = self.env.step_wait(np.arange(2))
+        obs2, reward2, done2, info2 = self.env.step_wait(np.arange(2, 4))
+
+        env = BatchEnvWrapper([fn() for fn in make_env_fns(4)])
+        env.reset()
+        obs, reward, done, info = env.step(action)
+        assert np.allclose(obs, np.concatenate([obs1, obs2]))
+        assert np.all(reward == np.concatenate([reward1, reward2]))
+        assert np.all(done == np.concatenate([done1, done2]))
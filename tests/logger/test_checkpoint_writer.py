@@ -0,0 +1,84 @@
+import os
+import tempfile
+import numpy as np
+import tensorflow as tf
+
+from unittest.mock import MagicMock
+from mvc.logger.checkpoint_writer import AsyncCheckpointWriter
+
+
+class AsyncCheckpointWriterTest(tf.test.TestCase):
+    def setUp(self):
+        tf.reset_default_graph()
+        self.directory = tempfile.mkdtemp()
+        self.var1 = tf.Variable(np.random.random((3, 4)), dtype=tf.float32,
+                                name='var1')
+        self.var2 = tf.Variable(0, dtype=tf.int64, name='var2')
+
+    def test_save_and_restore(self):
+        writer = AsyncCheckpointWriter()
+        path = os.path.join(self.directory, 'model.ckpt')
+
+        with self.test_session() as sess:
+            sess.run(tf.global_variables_initializer())
+            sess.run(tf.assign(self.var2, 10))
+            before = sess.run([self.var1, self.var2])
+            writer.save(sess, path, global_step=10)
+            # variables updated after the snapshot are not saved
+            sess.run(tf.assign(self.var2, 20))
+            writer.flush()
+
+            assert tf.train.latest_checkpoint(self.directory) == path + '-10'
+            tf.train.Saver().restore(sess, path + '-10')
+            after = sess.run([self.var1, self.var2])
+        writer.close()
+
+        assert np.allclose(before[0], after[0])
+        assert after[1] == 10
+
+    def test_save_blocks_on_full_queue(self):
+        writer = AsyncCheckpointWriter(max_queue=1)
+        path = os.path.join(self.directory, 'model.ckpt')
+        writer.saver = MagicMock()
+
+        with self.test_session() as sess:
+            sess.run(tf.global_variables_initializer())
+            for step in range(3):
+                writer.save(sess, path, global_step=step)
+                assert writer.snapshots.qsize() <= 1
+            writer.flush()
+        writer.close()
+
+        assert writer.saver.save.call_count == 3
+
+    def test_flush_raises_error_of_writer(self):
+        writer = AsyncCheckpointWriter()
+        writer.saver = MagicMock()
+        writer.saver.save.side_effect = IOError('disk full')
+
+        with self.test_session() as sess:
+            sess.run(tf.global_variables_initializer())
+            writer.save(sess, 'model.ckpt')
+            with self.assertRaises(IOError):
+                writer.flush()
+            # the error is raised only once
+            writer.flush()
+        writer.close()
+
+    def test_writer_survives_unexpected_error(self):
+        writer = AsyncCheckpointWriter(max_queue=1)
+        writer.saver = MagicMock()
+        writer.saver.save.side_effect = [KeyError('unexpected'), None, None]
+
+        with self.test_session() as sess:
+            sess.run(tf.global_variables_initializer())
+            writer.save(sess, 'model.ckpt')
+            with self.assertRaises(KeyError):
+                writer.flush()
+            # the thread keeps consuming snapshots after the error
+            writer.save(sess, 'model.ckpt')
+            writer.save(sess, 'model.ckpt')
+            writer.flush()
+        writer.close()
+
+        assert writer.saver.save.call_count == 3
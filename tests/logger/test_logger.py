@@ -0,0 +1,68 @@
+import os
+import tempfile
+import threading
+import unittest
+
+from unittest.mock import MagicMock, patch
+import mvc.logger as logger
+
+
+class LoggerTest(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        setting = {
+            'path': directory,
+            'experiment_name': 'test',
+            'adapter': MagicMock(),
+            'verbose': False,
+            'writers': {},
+            'files': {}
+        }
+        patcher = patch.dict(logger.SETTING, setting)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.directory = os.path.join(directory, 'test')
+
+    def test_log_metric_from_threads(self):
+        held = []
+        logger.SETTING['adapter'].log_metrics.side_effect = \
+            lambda records: held.append(logger.LOCK.locked())
+
+        def log(prefix):
+            for step in range(100):
+                logger.log_metric(prefix + str(step % 10), 1.0, step)
+                logger.flush()
+
+        # evaluation thread writes while the training thread writes
+        threads = [threading.Thread(target=log, args=(prefix,))
+                   for prefix in ['train', 'eval']]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        logger.close()
+
+        assert len(held) == 200 and all(held)
+        for prefix in ['train', 'eval']:
+            for i in range(10):
+                path = os.path.join(self.directory,
+                                    prefix + str(i) + '.csv')
+                with open(path) as file:
+                    assert len(file.readlines()) == 10
+
+    def test_close_after_async_logging(self):
+        logger.start_async(flush_interval=10.0)
+        self.addCleanup(logger.stop_async)
+        logger.log_metric('metric', 1.0, 1)
+        # files are opened by the writer thread
+        logger.flush()
+        file = logger.SETTING['files']['metric']
+
+        # called at exit to stop the writer and close files
+        logger.close()
+
+        assert logger.SETTING['metric_writer'] is None
+        assert file.closed
+        assert logger.SETTING['files'] == {}
+        with open(os.path.join(self.directory, 'metric.csv')) as csv_file:
+            assert csv_file.readlines() == ['1,1.0\n']
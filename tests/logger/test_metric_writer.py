@@ -0,0 +1,108 @@
+import threading
+import unittest
+
+from unittest.mock import MagicMock
+from mvc.logger.metric_writer import MetricWriter, QUEUE_SIZE, BLOCKED_PUTS
+
+
+class MetricWriterTest(unittest.TestCase):
+    def test_flush(self):
+        write_fn = MagicMock()
+        flush_fn = MagicMock()
+        writer = MetricWriter(write_fn, flush_fn, flush_interval=60.0)
+
+        for step in range(10):
+            writer.put(('test', float(step), step))
+        writer.flush()
+
+        records = [record for call in write_fn.call_args_list
+                   for record in call[0][0]]
+        assert records == [('test', float(step), step) for step in range(10)]
+        flush_fn.assert_called_with()
+        writer.close()
+
+    def test_close(self):
+        write_fn = MagicMock()
+        flush_fn = MagicMock()
+        writer = MetricWriter(write_fn, flush_fn, flush_interval=60.0)
+
+        writer.put(('test', 1.0, 3))
+        writer.close()
+
+        records = [record for call in write_fn.call_args_list
+                   for record in call[0][0]]
+        assert records[0] == ('test', 1.0, 3)
+        # backpressure statistics are written at the latest step
+        assert (QUEUE_SIZE, 0, 3) in records
+        assert (BLOCKED_PUTS, 0, 3) in records
+        flush_fn.assert_called_with()
+        assert not writer.thread.is_alive()
+
+        # closing twice does nothing
+        writer.close()
+
+    def test_backpressure(self):
+        started = threading.Event()
+        release = threading.Event()
+
+        def write(records):
+            started.set()
+            release.wait()
+
+        write_fn = MagicMock(side_effect=write)
+        writer = MetricWriter(write_fn, MagicMock(), max_queue=1,
+                              flush_interval=60.0)
+
+        # the writer is blocked on the first record
+        writer.put(('test', 1.0, 1))
+        started.wait()
+        writer.put(('test', 2.0, 2))
+        blocked = threading.Thread(
+            target=writer.put, args=(('test', 3.0, 3),))
+        blocked.start()
+        blocked.join(0.1)
+        assert blocked.is_alive()
+        assert writer.blocked_puts == 1
+
+        release.set()
+        blocked.join()
+        writer.close()
+
+        records = [record for call in write_fn.call_args_list
+                   for record in call[0][0]]
+        assert [record[2] for record in records[:3]] == [1, 2, 3]
+        assert (BLOCKED_PUTS, 1, 3) in records
+
+    def test_error_does_not_stop_writer(self):
+        write_fn = MagicMock(side_effect=[IOError(), None, None])
+        writer = MetricWriter(write_fn, MagicMock(), flush_interval=60.0)
+
+        writer.put(('test', 1.0, 1))
+        writer.flush()
+        writer.put(('test', 2.0, 2))
+        writer.flush()
+
+        assert write_fn.call_args[0][0] == [('test', 2.0, 2)]
+        writer.close()
+
+    def test_adapter_error_does_not_stop_writer(self):
+        errors = [RuntimeError(), RuntimeError()]
+
+        def write(records):
+            # the first batch and the first stats fail in the adapter
+            if errors:
+                raise errors.pop()
+
+        write_fn = MagicMock(side_effect=write)
+        writer = MetricWriter(write_fn, MagicMock(), flush_interval=0.0)
+
+        writer.put(('test', 1.0, 1))
+        writer.flush()
+        writer.put(('test', 2.0, 2))
+        writer.flush()
+        writer.close()
+
+        assert not writer.thread.is_alive()
+        records = [record for call in write_fn.call_args_list
+                   for record in call[0][0]]
+        assert ('test', 2.0, 2) in records
@@ -0,0 +1,47 @@
+import glob
+import os
+import tempfile
+import threading
+import tensorflow as tf
+
+from mvc.logger.tfboard_adapter import TfBoardAdapter
+
+
+def read_scalars(logdir):
+    scalars = []
+    for path in glob.glob(os.path.join(logdir, 'events.*')):
+        for event in tf.train.summary_iterator(path):
+            for value in event.summary.value:
+                scalars.append((value.tag, value.simple_value, event.step))
+    return scalars
+
+
+class TfBoardAdapterTest(tf.test.TestCase):
+    def test_log_metrics(self):
+        logdir = tempfile.mkdtemp()
+        adapter = TfBoardAdapter(logdir)
+        num_ops = len(tf.get_default_graph().get_operations())
+
+        adapter.register('reward')
+        adapter.log_metric('reward', 1.5, 10)
+        adapter.log_metrics([('reward', 2.5, 20), ('loss', 0.5, 20)])
+        adapter.flush()
+
+        # no graph ops are added for logging
+        assert len(tf.get_default_graph().get_operations()) == num_ops
+        scalars = read_scalars(logdir)
+        assert ('reward', 1.5, 10) in scalars
+        assert ('reward', 2.5, 20) in scalars
+        assert ('loss', 0.5, 20) in scalars
+
+    def test_log_metric_from_thread(self):
+        logdir = tempfile.mkdtemp()
+        adapter = TfBoardAdapter(logdir)
+
+        thread = threading.Thread(target=adapter.log_metric,
+                                  args=('reward', 3.0, 5))
+        thread.start()
+        thread.join()
+        adapter.flush()
+
+        assert read_scalars(logdir) == [('reward', 3.0, 5)]
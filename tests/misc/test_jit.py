@@ -0,0 +1,57 @@
+import numpy as np
+import unittest
+
+from mvc.misc import jit
+
+
+def make_scan_inputs(shape, dtype):
+    values = np.random.random(shape).astype(dtype)
+    discounts = np.random.random(shape).astype(dtype)
+    init = np.random.random(shape[1:]).astype(dtype)
+    return values, discounts, init
+
+
+class NumpyBackendTest(unittest.TestCase):
+    def test_reverse_scan(self):
+        values, discounts, init = make_scan_inputs((3, 2), np.float64)
+        out = np.empty_like(values)
+
+        jit.numpy_reverse_scan(values, discounts, init, out)
+
+        answer2 = values[2] + discounts[2] * init
+        answer1 = values[1] + discounts[1] * answer2
+        answer0 = values[0] + discounts[0] * answer1
+        assert np.array_equal(out, np.array([answer0, answer1, answer2]))
+
+
+@unittest.skipIf(jit.numba is None, 'numba is not installed')
+class NumbaBackendTest(unittest.TestCase):
+    def test_backend(self):
+        assert jit.BACKEND == 'numba'
+
+    def test_reverse_scan_parity(self):
+        for shape in [(100,), (100, 8), (100, 4, 3)]:
+            for dtype in [np.float32, np.float64]:
+                values, discounts, init = make_scan_inputs(shape, dtype)
+                out = np.empty_like(values)
+                answer = np.empty_like(values)
+
+                jit.numba_reverse_scan(values, discounts, init, out)
+                jit.numpy_reverse_scan(values, discounts, init, answer)
+
+                assert np.array_equal(out, answer)
+
+    def test_reverse_scan_with_scalar_init(self):
+        values, discounts, _ = make_scan_inputs((100,), np.float64)
+        out = np.empty_like(values)
+        answer = np.empty_like(values)
+
+        jit.numba_reverse_scan(values, discounts, 1.0, out)
+        jit.numpy_reverse_scan(values, discounts, 1.0, answer)
+
+        assert np.array_equal(out, answer)
+
+    def test_reverse_scan_empty(self):
+        out = np.empty((0, 4))
+        jit.numba_reverse_scan(out, out, np.zeros(4), out)
+        assert out.shape == (0, 4)
@@ -0,0 +1,106 @@
+import threading
+import time
+import numpy as np
+import unittest
+
+from unittest.mock import patch
+import mvc.misc.profiler as profiler
+from mvc.models.metrics import Metrics
+from mvc.misc.profiler import Phase, Profiler, NULL_PHASE
+
+
+class PhaseTest(unittest.TestCase):
+    def test_add(self):
+        phase = Phase()
+        for duration in [1e-6, 3e-6, 3e-6, 1e-3]:
+            phase.add(duration)
+        assert phase.count == 4
+        assert np.allclose(phase.total, 1.007e-3)
+        # upper edges of power of two bins in microseconds
+        assert np.allclose(phase.percentile(50), 4e-6)
+        assert np.allclose(phase.percentile(99), 1.024e-3)
+
+        phase.reset()
+        assert phase.count == 0
+        assert phase.total == 0.0
+
+    def test_context(self):
+        phase = Phase()
+        with phase:
+            time.sleep(1e-3)
+        assert phase.count == 1
+        assert phase.total >= 1e-3
+
+
+class ProfilerTest(unittest.TestCase):
+    def setUp(self):
+        for name in ['register', 'set_experiment_name']:
+            patcher = patch('mvc.logger.' + name)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        patcher = patch('mvc.logger.log_metric')
+        self.log_metric = patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(profiler.disable)
+
+    def test_disabled(self):
+        profiler.disable()
+        assert profiler.phase('test') is NULL_PHASE
+        metrics = Metrics('test')
+        profiler.log(metrics, 10)
+        self.log_metric.assert_not_called()
+
+    def test_phase_of_other_thread(self):
+        profiler.enable()
+        phases = []
+        thread = threading.Thread(
+            target=lambda: phases.append(profiler.phase('test')))
+        thread.start()
+        thread.join()
+        assert phases[0] is NULL_PHASE
+        assert isinstance(profiler.phase('test'), Phase)
+
+    def test_summary(self):
+        profiler = Profiler()
+        profiler.phase('test').add(0.1)
+        summary = profiler.summary(100)
+        assert 'steps_per_second' not in summary
+        assert summary['test_percent'] > 0.0
+        assert np.allclose(summary['test_mean_ms'], 100.0)
+
+        summary = profiler.summary(200)
+        assert summary['steps_per_second'] > 0.0
+        # phases without samples in the window are not reported
+        assert 'test_percent' not in summary
+
+    def test_summary_of_nested_phases(self):
+        profiler = Profiler()
+        with profiler.phase('outer'):
+            time.sleep(1e-2)
+            with profiler.phase('inner'):
+                time.sleep(1e-2)
+        with profiler.phase('other'):
+            time.sleep(1e-2)
+        summary = profiler.summary(100)
+        percents = [value for name, value in summary.items()
+                    if name.endswith('_percent')]
+        assert sum(percents) <= 100.0
+        # nested time is counted only in the inner phase
+        assert summary['outer_percent'] < 2.0 * summary['inner_percent']
+        assert summary['outer_mean_ms'] >= 20.0
+
+    def test_log(self):
+        profiler.enable()
+        metrics = Metrics('test')
+        with profiler.phase('test'):
+            pass
+        profiler.log(metrics, 10)
+        assert metrics.has('profile_test_percent')
+        names = [call[0][0] for call in self.log_metric.call_args_list]
+        assert 'profile_test_mean_ms' in names
+        assert 'profile_test_p99_ms' in names
+
+        with profiler.phase('test'):
+            pass
+        profiler.log(metrics, 20)
+        assert metrics.get('profile_steps_per_second') > 0.0
@@ -0,0 +1,49 @@
+import numpy as np
+import unittest
+
+from mvc.misc.sum_tree import SumTree
+
+
+class SumTreeTest(unittest.TestCase):
+    def test_update(self):
+        capacity = np.random.randint(100) + 1
+        tree = SumTree(capacity)
+        priorities = np.random.random(capacity)
+
+        tree.update(np.arange(capacity), priorities)
+
+        assert np.allclose(tree.total(), np.sum(priorities))
+        assert np.allclose(tree.get(np.arange(capacity)), priorities)
+
+    def test_update_partially(self):
+        tree = SumTree(10)
+        priorities = np.random.random(10)
+        tree.update(np.arange(10), priorities)
+
+        tree.update([3, 7], [0.0, 2.0])
+        priorities[3] = 0.0
+        priorities[7] = 2.0
+
+        assert np.allclose(tree.total(), np.sum(priorities))
+
+    def test_sample(self):
+        tree = SumTree(4)
+        tree.update(np.arange(4), [1.0, 0.0, 2.0, 3.0])
+
+        indices = tree.sample([0.5, 1.0, 2.5, 3.5, 5.9])
+
+        assert np.all(indices == [0, 2, 2, 3, 3])
+
+    def test_sample_never_picks_empty_leaf(self):
+        tree = SumTree(5)
+        tree.update(np.arange(5), [1.0, 1.0, 1.0, 1.0, 0.0])
+
+        indices = tree.sample(np.linspace(0.0, tree.total(), 100))
+
+        assert not np.any(indices == 4)
+
+    def test_reset(self):
+        tree = SumTree(10)
+        tree.update(np.arange(10), np.random.random(10))
+        tree.reset()
+        assert tree.total() == 0.0
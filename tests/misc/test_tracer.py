@@ -0,0 +1,87 @@
+import json
+import numpy as np
+import tensorflow as tf
+
+from unittest.mock import MagicMock, patch
+from mvc.misc.tracer import Tracer, Trace, top_ops
+from tests.test_utils import DummyNetwork, make_output
+
+
+class TracerTest(tf.test.TestCase):
+    def setUp(self):
+        tf.reset_default_graph()
+        self.ph = tf.placeholder(tf.float32, [None, 16])
+        self.var = tf.Variable(np.random.random((16, 4)), dtype=tf.float32)
+        self.output = tf.reduce_sum(tf.matmul(self.ph, self.var))
+
+    def test_should_trace(self):
+        tracer = Tracer(3)
+        results = [tracer.should_trace('update') for _ in range(6)]
+        assert results == [False, False, True, False, False, True]
+        # inference is not traced by default
+        assert not any(tracer.should_trace('infer') for _ in range(6))
+
+    @patch('mvc.logger.save_trace')
+    def test_trace(self, save_trace):
+        tracer = Tracer(1)
+        feed_dict = {self.ph: np.random.random((8, 16))}
+        with self.test_session() as sess:
+            sess.run(tf.global_variables_initializer())
+            tracer.should_trace('update')
+            with tracer.trace('update') as trace:
+                assert isinstance(trace, Trace)
+                output = trace.run(sess, self.output, feed_dict)
+                trace.run(sess, self.output, feed_dict)
+            assert np.allclose(output,
+                               sess.run(self.output, feed_dict=feed_dict))
+
+            names = [node_stats.node_name
+                     for dev_stats in trace.step_stats.dev_stats
+                     for node_stats in dev_stats.node_stats]
+            assert names.count('MatMul') == 2
+            assert len(top_ops(trace.step_stats, 3)) <= 3
+
+        name, chrome_trace = save_trace.call_args[0]
+        assert name == 'update_1'
+        assert 'traceEvents' in json.loads(chrome_trace)
+
+    @patch('mvc.logger.save_trace')
+    def test_network_run(self, save_trace):
+        network = DummyNetwork()
+        network._update_arguments = MagicMock(return_value=[])
+        feed_dict = {self.ph: np.random.random((8, 16))}
+        traces = []
+
+        def update(**kwargs):
+            traces.append(network.trace)
+            return network._run(self.output, feed_dict=feed_dict)
+
+        network._update = MagicMock(side_effect=update)
+        network.tracer = Tracer(2)
+        with self.test_session() as sess:
+            sess.run(tf.global_variables_initializer())
+            outputs = [network.update() for _ in range(2)]
+
+        assert np.allclose(outputs[0], outputs[1])
+        # only the second execution runs with trace options
+        assert traces[0] is None
+        assert isinstance(traces[1], Trace)
+        assert network.trace is None
+        assert traces[1].step_stats.dev_stats
+        assert save_trace.call_count == 1
+
+    def test_network_update(self):
+        network = DummyNetwork()
+        network._update = MagicMock(return_value=1.0)
+        network._update_arguments = MagicMock(return_value=[])
+        network._infer = MagicMock(return_value=make_output())
+        network._infer_arguments = MagicMock(return_value=[])
+        network.tracer = Tracer(2)
+        network.tracer.trace = MagicMock()
+
+        for _ in range(4):
+            assert network.update() == 1.0
+            network.infer()
+        assert network._update.call_count == 4
+        network.tracer.trace.assert_called_with('update')
+        assert network.tracer.trace.call_count == 2
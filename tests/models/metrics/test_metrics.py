@@ -56,6 +56,19 @@ class MetricsTest(TestCase):
             metrics.add('test2', value)
         assert np.allclose(metrics.get('test2'), np.mean(values))
 
+    @patch('mvc.logger.set_experiment_name')
+    def test_add_many(self, set_experiment_name):
+        values = np.random.random(10)
+
+        metrics = Metrics('test')
+        metrics.register('test', 'single')
+        metrics.add_many('test', values)
+        assert np.allclose(metrics.get('test'), np.sum(values))
+
+        metrics.register('test2', 'queue')
+        metrics.add_many('test2', values)
+        assert np.allclose(metrics.get('test2'), np.mean(values))
+
     
     @patch('mvc.logger.log_metric')
     @patch('mvc.logger.set_experiment_name')
@@ -113,6 +126,22 @@ class MetricsTest(TestCase):
         metrics.save_model(step)
         save_model.assert_called_once_with('saver', step)
     
+    @patch('mvc.logger.save_buffer')
+    @patch('mvc.logger.set_experiment_name')
+    def test_save_buffer(self, experiment_name, save_buffer):
+        step = np.random.randint(10) + 1
+
+        metrics = Metrics('test')
+        metrics.save_buffer('buffer', step)
+        save_buffer.assert_called_once_with('buffer', step)
+
+    @patch('mvc.logger.flush')
+    @patch('mvc.logger.set_experiment_name')
+    def test_flush(self, experiment_name, flush):
+        metrics = Metrics('test', saver='saver')
+        metrics.flush()
+        flush.assert_called_once_with('saver')
+
     @patch('mvc.logger.set_model_graph')
     @patch('mvc.logger.set_experiment_name')
     def test_set_model_graph(self, experiment_name, set_model_graph):
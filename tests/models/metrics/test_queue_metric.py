@@ -22,3 +22,76 @@ class QueueMetricTest(TestCase):
             metric.add(values[i])
 
         assert np.allclose(metric.get(), np.mean(values[5:]))
+
+    def test_statistics(self):
+        values = np.random.random(10)
+        metric = QueueMetric(maxlen=5)
+        assert metric.std() == 0.0
+        assert metric.min() == 0.0
+        assert metric.max() == 0.0
+
+        for i in range(10):
+            metric.add(values[i])
+            window = values[max(i - 4, 0):i + 1]
+            assert np.allclose(metric.std(), np.std(window))
+            assert np.allclose(metric.min(), np.min(window))
+            assert np.allclose(metric.max(), np.max(window))
+
+    def test_add_many(self):
+        values = np.random.random(12)
+        metric = QueueMetric(maxlen=5)
+
+        metric.add_many(values[:3])
+        assert np.allclose(metric.get(), np.mean(values[:3]))
+
+        # values wrap around the end of the ring
+        metric.add_many(values[3:7])
+        assert np.allclose(metric.get(), np.mean(values[2:7]))
+        assert np.allclose(metric.std(), np.std(values[2:7]))
+
+        metric.add_many([])
+        assert np.allclose(metric.get(), np.mean(values[2:7]))
+
+        # only the latest values are kept
+        metric.add_many(values[5:12])
+        assert np.allclose(metric.get(), np.mean(values[7:]))
+        assert np.allclose(metric.min(), np.min(values[7:]))
+        assert np.allclose(metric.max(), np.max(values[7:]))
+
+    def test_long_sequence(self):
+        values = np.random.random(1000) * 1000.0
+        metric = QueueMetric(maxlen=7)
+        for value in values:
+            metric.add(value)
+        assert np.allclose(metric.get(), np.mean(values[-7:]))
+        assert np.allclose(metric.std(), np.std(values[-7:]))
+
+    def test_extremes_between_additions(self):
+        values = np.random.random(200)
+        metric = QueueMetric(maxlen=7)
+        for i in range(0, 200, 4):
+            # logging reads extremes after every few additions
+            metric.add_many(values[i:i + 3])
+            metric.add(values[i + 3])
+            window = values[max(i - 3, 0):i + 4]
+            assert metric.min() == np.min(window)
+            assert metric.max() == np.max(window)
+            # old values are not kept once they cannot be extremes
+            assert len(metric.mins) <= 7 and len(metric.maxs) <= 7
+
+    def test_extremes_after_add_many(self):
+        values = np.random.random(100)
+        metric = QueueMetric(maxlen=7)
+        metric.add_many(values[:3])
+        # a batch larger than the window wraps around the ring
+        metric.add_many(values[3:20])
+        assert metric.min() == np.min(values[13:20])
+        assert metric.max() == np.max(values[13:20])
+
+        end = 20
+        for size in [1, 5, 3, 7, 2, 30, 6]:
+            metric.add_many(values[end:end + size])
+            end += size
+            assert metric.min() == np.min(values[end - 7:end])
+            assert metric.max() == np.max(values[end - 7:end])
+        assert len(metric.mins) <= 7 and len(metric.maxs) <= 7
@@ -4,10 +4,12 @@ import unittest
 import pytest
 
 from tests.test_utils import assert_variable_mismatch, assert_variable_match
-from tests.test_utils import make_fcs, to_tf
+from tests.test_utils import make_fcs, to_tf, run_target_update
+from tests.test_utils import transfer_flat_params
 from mvc.models.networks.ddpg import build_critic_loss
 from mvc.models.networks.ddpg import build_target_update
 from mvc.models.networks.ddpg import build_optim
+from mvc.models.networks.ddpg import build_update_loop
 from mvc.models.networks.ddpg import DDPGNetwork
 
 
@@ -30,6 +32,27 @@ class BuildCriticLoss(tf.test.TestCase):
             answer = np.mean((target - nd_q_t) ** 2)
             assert np.allclose(sess.run(loss), answer)
 
+    def test_with_weights(self):
+        nd_q_t = np.random.random((4, 1))
+        nd_rewards_tp1 = np.random.random((4, 1))
+        nd_q_tp1 = np.random.random((4, 1))
+        nd_dones_tp1 = np.random.randint(2, size=(4, 1))
+        nd_weights = np.random.random((4, 1))
+        q_t = to_tf(nd_q_t)
+        rewards_tp1 = to_tf(nd_rewards_tp1)
+        q_tp1 = to_tf(nd_q_tp1)
+        dones_tp1 = to_tf(nd_dones_tp1)
+        weights = to_tf(nd_weights)
+        gamma = np.random.random()
+
+        loss = build_critic_loss(q_t, rewards_tp1, q_tp1, dones_tp1, gamma,
+                                 weights)
+
+        with self.test_session() as sess:
+            target = nd_rewards_tp1 + gamma * nd_q_tp1 * (1.0 - nd_dones_tp1)
+            answer = np.mean(nd_weights * (target - nd_q_t) ** 2)
+            assert np.allclose(sess.run(loss), answer)
+
 
 class BuildTargetUpdateTest(tf.test.TestCase):
     def test_success(self):
@@ -52,6 +75,55 @@ class BuildTargetUpdateTest(tf.test.TestCase):
             assert np.allclose((1.0 - tau) * before_var2 + tau * before_var1, after_var2)
 
 
+class FlatTargetUpdateDDPGNetworkTest(tf.test.TestCase):
+    def test_parity_with_per_variable_update(self):
+        fcs = make_fcs()
+        state_shape = (np.random.randint(5) + 1,)
+        num_actions = np.random.randint(5) + 1
+        tau = np.random.random()
+        obs = np.random.random((4,) + state_shape)
+
+        def make_network(flat):
+            return lambda: DDPGNetwork(
+                fcs, 0, state_shape, num_actions, 0.99, tau, 1e-3, 1e-3,
+                flat_target_update=flat)
+
+        def get_target_update(network):
+            return [network.update_target_critic, network.update_target_actor]
+
+        before, after, action = run_target_update(
+            make_network(False), get_target_update, obs)
+        flat_before, flat_after, flat_action = run_target_update(
+            make_network(True), get_target_update, obs, before)
+
+        assert np.allclose(action, flat_action)
+        assert sorted(flat_after.keys()) == sorted(after.keys())
+        for name in after:
+            assert np.allclose(flat_before[name], before[name])
+            assert np.allclose(flat_after[name], after[name])
+
+    def test_flat_params_exchange(self):
+        fcs = make_fcs()
+        state_shape = (np.random.randint(5) + 1,)
+        num_actions = np.random.randint(5) + 1
+        obs = np.random.random((4,) + state_shape)
+
+        def make_network(flat):
+            return lambda: DDPGNetwork(
+                fcs, 0, state_shape, num_actions, 0.99, 0.01, 1e-3, 1e-3,
+                flat_target_update=flat)
+
+        for src, dst in [(True, False), (False, True)]:
+            (src_output, src_weights), (dst_output, dst_weights) = \
+                transfer_flat_params(make_network(src), make_network(dst),
+                                     'ddpg', obs)
+            assert np.allclose(src_output.action, dst_output.action)
+            assert np.allclose(src_output.value, dst_output.value)
+            assert sorted(src_weights.keys()) == sorted(dst_weights.keys())
+            for name in src_weights:
+                assert np.allclose(src_weights[name], dst_weights[name])
+
+
 class BuildOptimization(tf.test.TestCase):
     def test_success(self):
         dim1 = np.random.randint(10) + 1
@@ -70,6 +142,39 @@ class BuildOptimization(tf.test.TestCase):
             assert_variable_mismatch(before_var1, after_var1)
             assert_variable_match(before_var2, after_var2)
 
+    def test_with_lr_and_optimizer(self):
+        var = tf.Variable(np.random.random((4, 4)), name='var')
+        optimizer = tf.train.AdamOptimizer(1e-4)
+
+        with pytest.raises(AssertionError):
+            build_optim(var, 1e-4, 'var', optimizer)
+        with pytest.raises(AssertionError):
+            build_optim(var, None, 'var')
+
+
+class BuildUpdateLoopTest(tf.test.TestCase):
+    def test_success(self):
+        num_updates = np.random.randint(5) + 1
+        nd_inpt = np.random.random((num_updates * 4,))
+        inpt = to_tf(nd_inpt)
+        counter = tf.Variable(0.0, name='counter')
+
+        def build_update(batch):
+            update_expr = tf.assign_add(counter, 1.0)
+            return (tf.reduce_sum(batch), batch), update_expr
+
+        sums, batches = build_update_loop(
+            build_update, [inpt], num_updates, 2)
+
+        with self.test_session() as sess:
+            sess.run(tf.global_variables_initializer())
+            nd_sums, nd_batches = sess.run([sums, batches])
+            assert sess.run(counter) == num_updates
+
+        assert nd_batches.shape == (num_updates, 4)
+        assert np.allclose(nd_batches.reshape(-1), nd_inpt)
+        assert np.allclose(nd_sums, np.sum(nd_inpt.reshape(-1, 4), axis=1))
+
 
 class DDPGNetworkTest(tf.test.TestCase):
     def setUp(self):
@@ -114,6 +219,69 @@ class DDPGNetworkTest(tf.test.TestCase):
         assert output.log_prob is None
         assert len(output.value.shape) == 0
 
+    def test_flat_params(self):
+        variables = tf.get_collection(tf.GraphKeys.TRAINABLE_VARIABLES,
+                                      'ddpg')
+        other_var = tf.Variable(np.random.random((4,)), name='other')
+        size = self.network.flat_params_size('ddpg')
+        assert size == sum(np.prod(var.shape.as_list()) for var in variables)
+
+        with self.test_session() as sess:
+            sess.run(tf.global_variables_initializer())
+            before = sess.run(other_var)
+            # ops are built with the network
+            sess.graph.finalize()
+            flat = np.random.random((size,))
+            self.network.set_flat_params(flat, 'ddpg')
+            assert np.allclose(self.network.get_flat_params('ddpg'), flat)
+            # variables out of the scope are not touched
+            assert_variable_match(before, sess.run(other_var))
+
+    def test_flat_params_with_policy_scope(self):
+        assert self.network.policy_scope == 'ddpg/actor'
+        pi_vars = tf.get_collection(tf.GraphKeys.TRAINABLE_VARIABLES,
+                                    'ddpg/actor')
+        other_vars = tf.get_collection(tf.GraphKeys.TRAINABLE_VARIABLES,
+                                       'ddpg/critic')
+        size = self.network.flat_params_size('ddpg/actor')
+        assert size == sum(np.prod(var.shape.as_list()) for var in pi_vars)
+
+        with self.test_session() as sess:
+            sess.run(tf.global_variables_initializer())
+            before = sess.run(other_vars)
+            # ops are built with the network
+            sess.graph.finalize()
+            flat = np.random.random((size,))
+            self.network.set_flat_params(flat, 'ddpg/actor')
+            assert np.allclose(self.network.get_flat_params('ddpg/actor'), flat)
+            # variables out of the scope are not touched
+            assert_variable_match(before, sess.run(other_vars))
+
+    def test_numpy_infer(self):
+        obs = np.random.random((4,) + self.state_shape)
+        with self.test_session() as sess:
+            sess.run(tf.global_variables_initializer())
+            output = self.network.infer(obs_t=obs)
+            self.network.numpy_infer = True
+            numpy_output = self.network.infer(obs_t=obs)
+            single_output = self.network.infer(obs_t=obs[0])
+
+        assert numpy_output.action.shape == (4, self.num_actions)
+        assert np.allclose(numpy_output.action, output.action, atol=1e-5)
+        assert np.allclose(numpy_output.value, output.value, atol=1e-5)
+        assert single_output.action.shape == (self.num_actions,)
+        assert np.allclose(single_output.value, output.value[0], atol=1e-5)
+
+    def test_infer_with_batch(self):
+        with self.test_session() as sess:
+            sess.run(tf.global_variables_initializer())
+            obs = np.random.random((4,) + self.state_shape)
+            output = self.network.infer(obs_t=obs)
+
+        assert output.action.shape == (4, self.num_actions)
+        assert output.log_prob is None
+        assert output.value.shape == (4,)
+
     def test_update(self):
         obs_t = np.random.random((32,) + self.state_shape)
         actions_t = np.random.random((32, self.num_actions))
@@ -126,10 +294,75 @@ class DDPGNetworkTest(tf.test.TestCase):
             sess.run(tf.global_variables_initializer())
             before = sess.run(variables)
 
-            critic_loss, actor_loss = self.network.update(
+            critic_loss, actor_loss, td_errors = self.network.update(
+                obs_t=obs_t, actions_t=actions_t, rewards_tp1=rewards_tp1,
+                obs_tp1=obs_tp1, dones_tp1=dones_tp1)
+
+            after = sess.run(variables)
+
+        assert_variable_mismatch(before, after)
+        assert td_errors.shape == (32,)
+
+    def test_update_with_weights(self):
+        # narrow layers or large critic steps can leave no ReLU alive
+        tf.reset_default_graph()
+        network = DDPGNetwork([64, 64], 0, self.state_shape,
+                              self.num_actions, self.gamma, self.tau, 1e-3,
+                              1e-3)
+        obs_t = np.random.random((32,) + self.state_shape)
+        actions_t = np.random.random((32, self.num_actions))
+        rewards_tp1 = np.random.random((32,))
+        obs_tp1 = np.random.random((32,) + self.state_shape)
+        dones_tp1 = np.random.random((32,))
+        weights_t = np.random.random((32,))
+        variables = tf.get_collection(tf.GraphKeys.TRAINABLE_VARIABLES, 'ddpg')
+
+        with self.test_session() as sess:
+            sess.run(tf.global_variables_initializer())
+            before = sess.run(variables)
+
+            critic_loss, actor_loss, td_errors = network.update(
+                obs_t=obs_t, actions_t=actions_t, rewards_tp1=rewards_tp1,
+                obs_tp1=obs_tp1, dones_tp1=dones_tp1, weights_t=weights_t)
+
+            after = sess.run(variables)
+
+        assert_variable_mismatch(before, after)
+        assert td_errors.shape == (32,)
+
+
+class MultipleUpdatesDDPGNetworkTest(tf.test.TestCase):
+    def setUp(self):
+        tf.reset_default_graph()
+        self.state_shape = (np.random.randint(5) + 1,)
+        self.num_actions = np.random.randint(5) + 1
+        self.num_updates = np.random.randint(3) + 2
+        # narrow layers or large critic steps can leave no ReLU alive
+        self.network = DDPGNetwork([64, 64], 0, self.state_shape,
+                                   self.num_actions, np.random.random(),
+                                   np.random.random(), 1e-3, 1e-3,
+                                   self.num_updates)
+
+    def test_update(self):
+        size = 32 * self.num_updates
+        obs_t = np.random.random((size,) + self.state_shape)
+        actions_t = np.random.random((size, self.num_actions))
+        rewards_tp1 = np.random.random((size,))
+        obs_tp1 = np.random.random((size,) + self.state_shape)
+        dones_tp1 = np.random.random((size,))
+        variables = tf.get_collection(tf.GraphKeys.TRAINABLE_VARIABLES, 'ddpg')
+
+        with self.test_session() as sess:
+            sess.run(tf.global_variables_initializer())
+            before = sess.run(variables)
+
+            critic_loss, actor_loss, td_errors = self.network.update(
                 obs_t=obs_t, actions_t=actions_t, rewards_tp1=rewards_tp1,
                 obs_tp1=obs_tp1, dones_tp1=dones_tp1)
 
             after = sess.run(variables)
 
         assert_variable_mismatch(before, after)
+        assert len(critic_loss.shape) == 0
+        assert len(actor_loss.shape) == 0
+        assert td_errors.shape == (size,)
@@ -10,6 +10,7 @@ from mvc.models.networks.ppo import build_entropy_loss
 
 from tests.test_utils import make_tf_inpt, make_fcs, to_tf
 from tests.test_utils import assert_hidden_variable_shape, assert_variable_mismatch
+from tests.test_utils import assert_variable_match
 
 
 class BuildValueLossTest(tf.test.TestCase):
@@ -171,14 +172,11 @@ class PPONetworkTest(tf.test.TestCase):
                                   self.entropy_factor)
 
     def test_build(self):
-        assert int(self.network.action.shape[0]) == self.num_envs
         assert int(self.network.action.shape[1]) == self.num_actions
 
         assert len(self.network.log_policy.shape) == 1
-        assert int(self.network.log_policy.shape[0]) == self.num_envs
 
         assert len(self.network.value.shape) == 1
-        assert int(self.network.value.shape[0]) == self.num_envs
 
         assert len(self.network.loss.shape) == 0
 
@@ -206,6 +204,82 @@ class PPONetworkTest(tf.test.TestCase):
         assert output.log_prob.shape == (self.num_envs,)
         assert output.value.shape == (self.num_envs,)
 
+    def test_infer_with_partial_batch(self):
+        with self.test_session() as sess:
+            sess.run(tf.global_variables_initializer())
+            obs = np.random.random([self.num_envs + 1] + self.state_shape)
+            output = self.network.infer(obs_t=obs)
+
+        assert output.action.shape == (self.num_envs + 1, self.num_actions)
+        assert output.value.shape == (self.num_envs + 1,)
+
+    def test_flat_params(self):
+        variables = tf.get_collection(tf.GraphKeys.TRAINABLE_VARIABLES,
+                                      'ppo')
+        other_var = tf.Variable(np.random.random((4,)), name='other')
+        size = self.network.flat_params_size('ppo')
+        assert size == sum(np.prod(var.shape.as_list()) for var in variables)
+
+        with self.test_session() as sess:
+            sess.run(tf.global_variables_initializer())
+            before = sess.run(other_var)
+            # ops are built with the network
+            sess.graph.finalize()
+            flat = np.random.random((size,))
+            self.network.set_flat_params(flat, 'ppo')
+            assert np.allclose(self.network.get_flat_params('ppo'), flat)
+            # variables out of the scope are not touched
+            assert_variable_match(before, sess.run(other_var))
+
+    def test_flat_params_with_policy_scope(self):
+        assert self.network.policy_scope == 'ppo/pi'
+        pi_vars = tf.get_collection(tf.GraphKeys.TRAINABLE_VARIABLES,
+                                    'ppo/pi')
+        other_vars = tf.get_collection(tf.GraphKeys.TRAINABLE_VARIABLES,
+                                       'ppo/v')
+        size = self.network.flat_params_size('ppo/pi')
+        assert size == sum(np.prod(var.shape.as_list()) for var in pi_vars)
+
+        with self.test_session() as sess:
+            sess.run(tf.global_variables_initializer())
+            before = sess.run(other_vars)
+            # ops are built with the network
+            sess.graph.finalize()
+            flat = np.random.random((size,))
+            self.network.set_flat_params(flat, 'ppo/pi')
+            assert np.allclose(self.network.get_flat_params('ppo/pi'), flat)
+            # variables out of the scope are not touched
+            assert_variable_match(before, sess.run(other_vars))
+
+    def test_numpy_infer(self):
+        obs = np.random.random([self.num_envs] + self.state_shape)
+        batch = {
+            'obs_t': np.random.random([self.batch_size] + self.state_shape),
+            'actions_t': np.random.random((self.batch_size, self.num_actions)),
+            'returns_t': np.random.random((self.batch_size,)),
+            'advantages_t': np.random.random((self.batch_size,)),
+            'log_probs_t': np.random.random((self.batch_size,)),
+            'values_t': np.random.random((self.batch_size,))
+        }
+
+        with self.test_session() as sess:
+            sess.run(tf.global_variables_initializer())
+            output = self.network.infer(obs_t=obs)
+            self.network.numpy_infer = True
+            numpy_output = self.network.infer(obs_t=obs)
+
+            # weights are pulled again after update
+            self.network.update(**batch)
+            updated_output = self.network.infer(obs_t=obs)
+            self.network.numpy_infer = False
+            expected_output = self.network.infer(obs_t=obs)
+
+        assert numpy_output.action.shape == (self.num_envs, self.num_actions)
+        assert numpy_output.log_prob.shape == (self.num_envs,)
+        assert np.allclose(numpy_output.value, output.value, atol=1e-5)
+        assert np.allclose(updated_output.value, expected_output.value,
+                           atol=1e-5)
+
     def test_update(self):
         obs = np.random.random([self.batch_size] + self.state_shape)
         actions = np.random.random((self.batch_size, self.num_actions))
@@ -230,3 +304,131 @@ class PPONetworkTest(tf.test.TestCase):
 
         for var1, var2 in zip(before, after):
             assert not np.allclose(var1, var2)
+
+    def test_compute_and_apply_gradients(self):
+        obs = np.random.random([self.batch_size] + self.state_shape)
+        actions = np.random.random((self.batch_size, self.num_actions))
+        returns = np.random.random((self.batch_size,))
+        advantages = np.random.random((self.batch_size,))
+        old_log_probs = np.random.random((self.batch_size))
+        old_values = np.random.random((self.batch_size))
+        variables = tf.get_collection(tf.GraphKeys.TRAINABLE_VARIABLES, 'ppo')
+
+        with self.test_session() as sess:
+            sess.run(tf.global_variables_initializer())
+
+            before = sess.run(variables)
+
+            loss, gradients = self.network.compute_gradients(
+                obs_t=obs, actions_t=actions, returns_t=returns,
+                advantages_t=advantages, log_probs_t=old_log_probs,
+                values_t=old_values)
+            # computing gradients does not change parameters
+            assert_variable_match(before, sess.run(variables))
+
+            self.network.apply_gradients(gradients)
+
+            after = sess.run(variables)
+
+        assert len(loss.shape) == 0
+        assert len(gradients) == len(variables)
+        for gradient, var in zip(gradients, before):
+            assert gradient.shape == var.shape
+        for var1, var2 in zip(before, after):
+            assert not np.allclose(var1, var2)
+
+
+class FusedPPONetworkTest(tf.test.TestCase):
+    def setUp(self):
+        tf.reset_default_graph()
+        self.state_shape = [np.random.randint(4) + 1]
+        self.num_actions = np.random.randint(4) + 1
+        self.batch_size = np.random.randint(20) + 1
+        self.network = PPONetwork([64, 64], self.state_shape, 1,
+                                  self.num_actions, self.batch_size,
+                                  np.random.random(), 1e-3,
+                                  np.random.random(), np.random.random(),
+                                  np.random.random(), fused=True)
+
+    def make_rollout(self, data_size):
+        return {
+            'obs_t': np.random.random([data_size] + self.state_shape),
+            'actions_t': np.random.random((data_size, self.num_actions)),
+            'returns_t': np.random.random((data_size,)),
+            'advantages_t': np.random.random((data_size,)),
+            'log_probs_t': np.random.random((data_size,)),
+            'values_t': np.random.random((data_size,))
+        }
+
+    def test_fused_update(self):
+        data_size = self.batch_size * (np.random.randint(4) + 1)
+        epoch = np.random.randint(3) + 1
+        rollout = self.make_rollout(data_size)
+        variables = tf.get_collection(tf.GraphKeys.TRAINABLE_VARIABLES, 'ppo')
+
+        with self.test_session() as sess:
+            sess.run(tf.global_variables_initializer())
+
+            before = sess.run(variables)
+
+            losses = self.network.fused_update(epoch, **rollout)
+
+            after = sess.run(variables)
+
+        assert losses.shape == (epoch * data_size // self.batch_size,)
+        for var1, var2 in zip(before, after):
+            assert not np.allclose(var1, var2)
+
+    def test_fused_update_matches_sequential_updates(self):
+        num_batches = np.random.randint(3) + 1
+        data_size = self.batch_size * num_batches
+        epoch = np.random.randint(3) + 1
+        rollout = self.make_rollout(data_size)
+        permutations = np.array([
+            np.random.permutation(data_size) for _ in range(epoch)
+        ])
+        # optimizer slots are restored as well as network weights
+        variables = tf.global_variables()
+        trainable_variables = tf.trainable_variables()
+
+        with self.test_session() as sess:
+            sess.run(tf.global_variables_initializer())
+            initial = sess.run(variables)
+
+            feed_dict = {
+                self.network.rollout_obs_ph: rollout['obs_t'],
+                self.network.rollout_actions_ph: rollout['actions_t'],
+                self.network.rollout_returns_ph: rollout['returns_t'],
+                self.network.rollout_advantages_ph: rollout['advantages_t'],
+                self.network.rollout_old_log_probs_ph: rollout['log_probs_t'],
+                self.network.rollout_old_values_ph: rollout['values_t'],
+                self.network.epoch_ph: epoch,
+                self.network.permutations_ph: permutations
+            }
+            fused_losses = sess.run(self.network.fused_losses,
+                                    feed_dict=feed_dict)
+            fused = sess.run(trainable_variables)
+
+            for variable, value in zip(variables, initial):
+                variable.load(value, sess)
+            losses = []
+            for permutation in permutations:
+                for index in np.split(permutation, num_batches):
+                    batch = {key: value[index]
+                             for key, value in rollout.items()}
+                    losses.append(self.network.update(**batch))
+            sequential = sess.run(trainable_variables)
+
+        assert np.allclose(fused_losses, losses, atol=1e-5)
+        for var1, var2 in zip(fused, sequential):
+            assert np.allclose(var1, var2, atol=1e-5)
+
+    def test_fused_update_shares_variables(self):
+        variables = tf.get_collection(tf.GraphKeys.GLOBAL_VARIABLES, 'ppo')
+        for variable in variables:
+            assert variable.name.find('fused') < 0
+
+    def test_resource_variables(self):
+        # reads in the fused loop observe updates of previous iterations
+        for variable in tf.global_variables():
+            assert variable.op.type == 'VarHandleOp'
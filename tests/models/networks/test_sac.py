@@ -1,8 +1,11 @@
 import tensorflow as tf
 import numpy as np
 
+from unittest.mock import MagicMock
+
 from tests.test_utils import assert_variable_mismatch, assert_variable_match
-from tests.test_utils import make_fcs, to_tf
+from tests.test_utils import make_fcs, to_tf, run_target_update
+from tests.test_utils import transfer_flat_params
 from mvc.models.networks.sac import SACNetwork
 from mvc.models.networks.sac import build_v_loss
 from mvc.models.networks.sac import build_q_loss
@@ -48,6 +51,26 @@ class BuildQLossTest(tf.test.TestCase):
             answer = 0.5 * np.mean((target - nd_q_t) ** 2)
             assert np.allclose(sess.run(loss), answer)
 
+    def test_with_weights(self):
+        nd_q_t = np.random.random((4, 1))
+        nd_rewards_tp1 = np.random.random((4, 1))
+        nd_v_tp1 = np.random.random((4, 1))
+        nd_dones_tp1 = np.random.randint(2, size=(4, 1))
+        nd_weights = np.random.random((4, 1))
+        gamma = np.random.random()
+        q_t = to_tf(nd_q_t)
+        rewards_tp1 = to_tf(nd_rewards_tp1)
+        v_tp1 = to_tf(nd_v_tp1)
+        dones_tp1 = to_tf(nd_dones_tp1)
+        weights = to_tf(nd_weights)
+
+        loss = build_q_loss(q_t, rewards_tp1, v_tp1, dones_tp1, gamma, weights)
+
+        with self.test_session() as sess:
+            target = nd_rewards_tp1 + gamma * nd_v_tp1 * (1.0 - nd_dones_tp1)
+            answer = 0.5 * np.mean(nd_weights * (target - nd_q_t) ** 2)
+            assert np.allclose(sess.run(loss), answer)
+
 
 class BuildPiLossTest(tf.test.TestCase):
     def test_success(self):
@@ -130,6 +153,70 @@ class SACNetworkTest(tf.test.TestCase):
         assert len(output.log_prob.shape) == 0
         assert len(output.value.shape) == 0
 
+    def test_flat_params(self):
+        variables = tf.get_collection(tf.GraphKeys.TRAINABLE_VARIABLES,
+                                      'sac')
+        other_var = tf.Variable(np.random.random((4,)), name='other')
+        size = self.network.flat_params_size('sac')
+        assert size == sum(np.prod(var.shape.as_list()) for var in variables)
+
+        with self.test_session() as sess:
+            sess.run(tf.global_variables_initializer())
+            before = sess.run(other_var)
+            # ops are built with the network
+            sess.graph.finalize()
+            flat = np.random.random((size,))
+            self.network.set_flat_params(flat, 'sac')
+            assert np.allclose(self.network.get_flat_params('sac'), flat)
+            # variables out of the scope are not touched
+            assert_variable_match(before, sess.run(other_var))
+
+    def test_flat_params_with_policy_scope(self):
+        assert self.network.policy_scope == 'sac/pi'
+        pi_vars = tf.get_collection(tf.GraphKeys.TRAINABLE_VARIABLES,
+                                    'sac/pi')
+        other_vars = tf.get_collection(tf.GraphKeys.TRAINABLE_VARIABLES,
+                                       'sac/v')
+        size = self.network.flat_params_size('sac/pi')
+        assert size == sum(np.prod(var.shape.as_list()) for var in pi_vars)
+
+        with self.test_session() as sess:
+            sess.run(tf.global_variables_initializer())
+            before = sess.run(other_vars)
+            # ops are built with the network
+            sess.graph.finalize()
+            flat = np.random.random((size,))
+            self.network.set_flat_params(flat, 'sac/pi')
+            assert np.allclose(self.network.get_flat_params('sac/pi'), flat)
+            # variables out of the scope are not touched
+            assert_variable_match(before, sess.run(other_vars))
+
+    def test_numpy_infer(self):
+        obs = np.random.random((4,) + self.state_shape)
+        with self.test_session() as sess:
+            sess.run(tf.global_variables_initializer())
+            output = self.network.infer(obs_t=obs)
+            self.network.numpy_infer = True
+            numpy_output = self.network.infer(obs_t=obs)
+            single_output = self.network.infer(obs_t=obs[0])
+
+        assert numpy_output.action.shape == (4, self.num_actions)
+        assert np.all(np.abs(numpy_output.action) <= 1.0)
+        assert numpy_output.log_prob.shape == (4,)
+        assert np.allclose(numpy_output.value, output.value, atol=1e-5)
+        assert single_output.action.shape == (self.num_actions,)
+        assert np.allclose(single_output.value, output.value[0], atol=1e-5)
+
+    def test_infer_with_batch(self):
+        with self.test_session() as sess:
+            sess.run(tf.global_variables_initializer())
+            obs = np.random.random((4,) + self.state_shape)
+            output = self.network.infer(obs_t=obs)
+
+        assert output.action.shape == (4, self.num_actions)
+        assert output.log_prob.shape == (4,)
+        assert output.value.shape == (4,)
+
     def test_update(self):
         obs_t = np.random.random((32,) + self.state_shape)
         actions_t = np.random.random((32, self.num_actions))
@@ -142,10 +229,136 @@ class SACNetworkTest(tf.test.TestCase):
             sess.run(tf.global_variables_initializer())
             before = sess.run(variables)
 
-            v_loss, (q1_loss, q2_loss), pi_loss = self.network.update(
+            v_loss, (q1_loss, q2_loss), pi_loss, td_errors = self.network.update(
+                obs_t=obs_t, actions_t=actions_t, rewards_tp1=rewards_tp1,
+                obs_tp1=obs_tp1, dones_tp1=dones_tp1)
+
+            after = sess.run(variables)
+
+        assert_variable_mismatch(before, after)
+        assert td_errors.shape == (32,)
+
+
+class FlatTargetUpdateSACNetworkTest(tf.test.TestCase):
+    def test_parity_with_per_variable_update(self):
+        fcs = make_fcs()
+        state_shape = (np.random.randint(5) + 1,)
+        num_actions = np.random.randint(5) + 1
+        tau = np.random.random()
+        obs = np.random.random((4,) + state_shape)
+
+        def make_network(flat):
+            return lambda: SACNetwork(
+                fcs, 0, state_shape, num_actions, 0.99, tau, 1e-3, 1e-3,
+                1e-3, 1e-3, flat_target_update=flat)
+
+        before, after, _ = run_target_update(
+            make_network(False), lambda network: network.target_update, obs)
+        flat_before, flat_after, _ = run_target_update(
+            make_network(True), lambda network: network.target_update, obs,
+            before)
+
+        assert sorted(flat_after.keys()) == sorted(after.keys())
+        for name in after:
+            assert np.allclose(flat_before[name], before[name])
+            assert np.allclose(flat_after[name], after[name])
+
+    def test_flat_params_exchange(self):
+        fcs = make_fcs()
+        state_shape = (np.random.randint(5) + 1,)
+        num_actions = np.random.randint(5) + 1
+        obs = np.random.random((4,) + state_shape)
+
+        def make_network(flat):
+            return lambda: SACNetwork(
+                fcs, 0, state_shape, num_actions, 0.99, 0.01, 1e-3, 1e-3,
+                1e-3, 1e-3, flat_target_update=flat)
+
+        for src, dst in [(True, False), (False, True)]:
+            (src_output, src_weights), (dst_output, dst_weights) = \
+                transfer_flat_params(make_network(src), make_network(dst),
+                                     'sac', obs)
+            # actions are sampled but values are deterministic
+            assert np.allclose(src_output.value, dst_output.value)
+            assert sorted(src_weights.keys()) == sorted(dst_weights.keys())
+            for name in src_weights:
+                assert np.allclose(src_weights[name], dst_weights[name])
+
+
+class FusedSACNetworkTest(tf.test.TestCase):
+    def setUp(self):
+        tf.reset_default_graph()
+        self.state_shape = (np.random.randint(5) + 1,)
+        self.num_actions = np.random.randint(5) + 1
+        # narrow layers or large critic steps can leave no ReLU alive
+        self.network = SACNetwork([64, 64], 0, self.state_shape,
+                                  self.num_actions, np.random.random(),
+                                  np.random.random(), 1e-3, 1e-3, 1e-3,
+                                  np.random.random(), fused=True)
+
+    def test_build(self):
+        assert len(self.network.pi_loss.shape) == 0
+        assert len(self.network.v_loss.shape) == 0
+        assert len(self.network.q1_loss.shape) == 0
+        assert len(self.network.q2_loss.shape) == 0
+
+    def test_update(self):
+        obs_t = np.random.random((32,) + self.state_shape)
+        actions_t = np.random.random((32, self.num_actions))
+        rewards_tp1 = np.random.random((32,))
+        obs_tp1 = np.random.random((32,) + self.state_shape)
+        dones_tp1 = np.random.random((32,))
+        variables = tf.get_collection(tf.GraphKeys.TRAINABLE_VARIABLES, 'sac')
+
+        with self.test_session() as sess:
+            sess.run(tf.global_variables_initializer())
+            before = sess.run(variables)
+
+            self.network._update_fused = MagicMock(
+                side_effect=self.network._update_fused)
+            v_loss, (q1_loss, q2_loss), pi_loss, td_errors = self.network.update(
+                obs_t=obs_t, actions_t=actions_t, rewards_tp1=rewards_tp1,
+                obs_tp1=obs_tp1, dones_tp1=dones_tp1)
+
+            after = sess.run(variables)
+
+        assert self.network._update_fused.call_count == 1
+        assert_variable_mismatch(before, after)
+        assert td_errors.shape == (32,)
+
+
+class MultipleUpdatesSACNetworkTest(tf.test.TestCase):
+    def setUp(self):
+        tf.reset_default_graph()
+        self.state_shape = (np.random.randint(5) + 1,)
+        self.num_actions = np.random.randint(5) + 1
+        self.num_updates = np.random.randint(3) + 2
+        # narrow layers or large critic steps can leave no ReLU alive
+        self.network = SACNetwork([64, 64], 0, self.state_shape,
+                                  self.num_actions, np.random.random(),
+                                  np.random.random(), 1e-3, 1e-3, 1e-3,
+                                  np.random.random(),
+                                  num_updates=self.num_updates)
+
+    def test_update(self):
+        size = 32 * self.num_updates
+        obs_t = np.random.random((size,) + self.state_shape)
+        actions_t = np.random.random((size, self.num_actions))
+        rewards_tp1 = np.random.random((size,))
+        obs_tp1 = np.random.random((size,) + self.state_shape)
+        dones_tp1 = np.random.random((size,))
+        variables = tf.get_collection(tf.GraphKeys.TRAINABLE_VARIABLES, 'sac')
+
+        with self.test_session() as sess:
+            sess.run(tf.global_variables_initializer())
+            before = sess.run(variables)
+
+            v_loss, (q1_loss, q2_loss), pi_loss, td_errors = self.network.update(
                 obs_t=obs_t, actions_t=actions_t, rewards_tp1=rewards_tp1,
                 obs_tp1=obs_tp1, dones_tp1=dones_tp1)
 
             after = sess.run(variables)
 
         assert_variable_mismatch(before, after)
+        assert len(v_loss.shape) == 0
+        assert td_errors.shape == (size,)
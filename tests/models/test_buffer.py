@@ -2,7 +2,7 @@ import numpy as np
 import unittest
 import pytest
 
-from mvc.models.buffer import Buffer
+from mvc.models.buffer import Buffer, ArrayBuffer
 
 
 def make_inputs():
@@ -52,8 +52,165 @@ class BufferTest(unittest.TestCase):
         assert batch['rewards_tp1'][0] == reward2
         assert batch['dones_tp1'][0] == done2
 
+    def test_snapshot_and_restore(self):
+        buffer = Buffer(3)
+        inputs = [make_inputs() for _ in range(5)]
+        for inpt in inputs:
+            buffer.add(*inpt)
+
+        snapshot = buffer.snapshot()
+        assert snapshot['obs_t'].shape == (3, 10)
+
+        restored = Buffer(3)
+        restored.restore(snapshot)
+        assert restored.size() == 3
+        for i in range(3):
+            assert np.all(restored.obs_t[i] == inputs[i + 2][0])
+            assert np.all(restored.actions_t[i] == inputs[i + 2][1])
+            assert restored.rewards_t[i] == inputs[i + 2][2]
+            assert restored.dones_t[i] == inputs[i + 2][3]
+
     def test_fetch_with_exception(self):
         buffer = Buffer()
         buffer.add(*make_inputs())
         with pytest.raises(AssertionError):
             buffer.fetch(2)
+
+
+class ArrayBufferTest(unittest.TestCase):
+    def test_add(self):
+        buffer = ArrayBuffer()
+
+        buffer.add(*make_inputs())
+        assert buffer.size() == 1
+
+        buffer.add(*make_inputs())
+        assert buffer.size() == 2
+
+    def test_capacity(self):
+        buffer = ArrayBuffer(2)
+        buffer.add(*make_inputs())
+        buffer.add(*make_inputs())
+        buffer.add(*make_inputs())
+        assert buffer.size() == 2
+
+    def test_reset(self):
+        buffer = ArrayBuffer()
+        buffer.add(*make_inputs())
+        buffer.add(*make_inputs())
+        buffer.reset()
+        assert buffer.size() == 0
+
+    def test_fetch(self):
+        buffer = ArrayBuffer()
+        obs1, action1, reward1, done1 = make_inputs()
+        obs2, action2, reward2, done2 = make_inputs()
+
+        buffer.add(obs1, action1, reward1, done1)
+        buffer.add(obs2, action2, reward2, done2)
+
+        batch = buffer.fetch(1)
+        assert np.all(batch['obs_t'][0] == obs1)
+        assert np.all(batch['obs_tp1'][0] == obs2)
+        assert np.all(batch['actions_t'][0] == action1)
+        assert batch['rewards_tp1'][0] == reward2
+        assert batch['dones_tp1'][0] == done2
+
+    def test_fetch_with_wraparound(self):
+        buffer = ArrayBuffer(3)
+        inputs = [make_inputs() for _ in range(5)]
+        for inpt in inputs:
+            buffer.add(*inpt)
+
+        # only transitions 2->3 and 3->4 remain
+        for _ in range(16):
+            batch = buffer.fetch(2)
+            i = np.random.randint(2)
+            if np.all(batch['obs_t'][i] == inputs[2][0]):
+                assert np.all(batch['obs_tp1'][i] == inputs[3][0])
+                assert batch['rewards_tp1'][i] == inputs[3][2]
+            else:
+                assert np.all(batch['obs_t'][i] == inputs[3][0])
+                assert np.all(batch['obs_tp1'][i] == inputs[4][0])
+                assert batch['rewards_tp1'][i] == inputs[4][2]
+
+    def test_fetch_keys(self):
+        buffer = ArrayBuffer()
+        deque_buffer = Buffer()
+        for _ in range(10):
+            inpt = make_inputs()
+            buffer.add(*inpt)
+            deque_buffer.add(*inpt)
+
+        batch = buffer.fetch(4)
+        deque_batch = deque_buffer.fetch(4)
+        assert batch.keys() == deque_batch.keys()
+        for key in batch:
+            assert batch[key].shape == deque_batch[key].shape
+
+    def test_snapshot_and_restore(self):
+        buffer = ArrayBuffer(3)
+        inputs = [make_inputs() for _ in range(5)]
+        for inpt in inputs:
+            buffer.add(*inpt)
+
+        snapshot = buffer.snapshot()
+        assert snapshot['obs_t'].shape == (3, 10)
+
+        restored = ArrayBuffer(4)
+        restored.restore(snapshot)
+        assert restored.size() == 3
+        assert restored.cursor == 3
+        for i in range(3):
+            assert np.all(restored.obs_t[i] == inputs[i + 2][0])
+            assert np.all(restored.actions_t[i] == inputs[i + 2][1])
+            assert restored.rewards_t[i] == inputs[i + 2][2]
+            assert restored.dones_t[i] == inputs[i + 2][3]
+
+    def test_restore_into_smaller_buffer(self):
+        buffer = ArrayBuffer()
+        inputs = [make_inputs() for _ in range(5)]
+        for inpt in inputs:
+            buffer.add(*inpt)
+
+        restored = ArrayBuffer(2)
+        restored.restore(buffer.snapshot())
+        assert restored.size() == 2
+        assert np.all(restored.obs_t[0] == inputs[3][0])
+        assert np.all(restored.obs_t[1] == inputs[4][0])
+
+    def test_snapshot_empty(self):
+        restored = ArrayBuffer()
+        restored.restore(ArrayBuffer().snapshot())
+        assert restored.size() == 0
+
+    def test_fetch_with_exception(self):
+        buffer = ArrayBuffer()
+        buffer.add(*make_inputs())
+        with pytest.raises(AssertionError):
+            buffer.fetch(2)
+
+    def test_add_batch(self):
+        buffer = ArrayBuffer(num_envs=3)
+        inputs = [make_inputs() for _ in range(3)]
+        buffer.add_batch(*map(np.array, zip(*inputs)))
+        assert buffer.size() == 3
+        assert buffer.cursor == 3
+        for i in range(3):
+            assert np.all(buffer.obs_t[i] == inputs[i][0])
+            assert buffer.rewards_t[i] == inputs[i][2]
+
+    def test_fetch_with_batch(self):
+        buffer = ArrayBuffer(num_envs=2)
+        inputs1 = [make_inputs() for _ in range(2)]
+        inputs2 = [make_inputs() for _ in range(2)]
+        buffer.add_batch(*map(np.array, zip(*inputs1)))
+        buffer.add_batch(*map(np.array, zip(*inputs2)))
+
+        # next states of each environment are num_envs rows ahead
+        for _ in range(16):
+            batch = buffer.fetch(1)
+            i = 0 if np.all(batch['obs_t'][0] == inputs1[0][0]) else 1
+            assert np.all(batch['obs_t'][0] == inputs1[i][0])
+            assert np.all(batch['obs_tp1'][0] == inputs2[i][0])
+            assert batch['rewards_tp1'][0] == inputs2[i][2]
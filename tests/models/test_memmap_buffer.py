@@ -0,0 +1,133 @@
+import numpy as np
+import tempfile
+import unittest
+import pytest
+
+from mvc.models.buffer import ArrayBuffer
+from mvc.models.memmap_buffer import MemmapBuffer
+from tests.models.test_buffer import make_inputs
+
+
+class MemmapBufferTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def test_add(self):
+        buffer = MemmapBuffer(10, self.directory, cache_size=2)
+
+        buffer.add(*make_inputs())
+        assert buffer.size() == 1
+        assert buffer.pending == 1
+
+        buffer.add(*make_inputs())
+        assert buffer.size() == 2
+        assert buffer.pending == 0
+
+    def test_capacity(self):
+        buffer = MemmapBuffer(2, self.directory, cache_size=1)
+        buffer.add(*make_inputs())
+        buffer.add(*make_inputs())
+        buffer.add(*make_inputs())
+        assert buffer.size() == 2
+
+    def test_fetch(self):
+        buffer = MemmapBuffer(10, self.directory, cache_size=4)
+        obs1, action1, reward1, done1 = make_inputs()
+        obs2, action2, reward2, done2 = make_inputs()
+
+        buffer.add(obs1, action1, reward1, done1)
+        buffer.add(obs2, action2, reward2, done2)
+
+        batch = buffer.fetch(1)
+        assert np.all(batch['obs_t'][0] == obs1)
+        assert np.all(batch['obs_tp1'][0] == obs2)
+        assert np.all(batch['actions_t'][0] == action1)
+        assert batch['rewards_tp1'][0] == reward2
+        assert batch['dones_tp1'][0] == done2
+
+    def test_fetch_across_cache(self):
+        buffer = MemmapBuffer(5, self.directory, cache_size=3)
+        inputs = [make_inputs() for _ in range(7)]
+        for inpt in inputs:
+            buffer.add(*inpt)
+
+        # transitions 2->3 and 4->5 cross written and cached parts
+        for _ in range(16):
+            batch = buffer.fetch(3)
+            for i in range(3):
+                index = [j for j in range(2, 6)
+                         if np.all(batch['obs_t'][i] == inputs[j][0])]
+                assert len(index) == 1
+                nxt = inputs[index[0] + 1]
+                assert np.all(batch['obs_tp1'][i] == nxt[0])
+                assert np.all(batch['actions_t'][i] == inputs[index[0]][1])
+                assert batch['rewards_tp1'][i] == nxt[2]
+                assert batch['dones_tp1'][i] == nxt[3]
+
+    def test_add_batch_across_cache(self):
+        buffer = MemmapBuffer(5, self.directory, cache_size=2, num_envs=3)
+        array_buffer = ArrayBuffer(5, num_envs=3)
+        for _ in range(3):
+            inputs = list(map(np.array, zip(*[make_inputs() for _ in range(3)])))
+            buffer.add_batch(*inputs)
+            array_buffer.add_batch(*inputs)
+            assert buffer.size() == array_buffer.size()
+            assert buffer.cursor == array_buffer.cursor
+        assert buffer.pending == 1
+
+        buffer.flush()
+        for name in buffer.FIELDS:
+            assert np.all(getattr(buffer, name) == getattr(array_buffer, name))
+
+    def test_reopen(self):
+        buffer = MemmapBuffer(10, self.directory, cache_size=4)
+        inputs = [make_inputs() for _ in range(6)]
+        for inpt in inputs:
+            buffer.add(*inpt)
+        buffer.flush()
+
+        reopened = MemmapBuffer(10, self.directory, cache_size=4)
+        assert reopened.size() == 6
+        assert reopened.cursor == buffer.cursor
+        assert np.all(reopened.obs_t[:6] == np.array([i[0] for i in inputs]))
+
+        reopened.add(*make_inputs())
+        assert reopened.size() == 7
+
+    def test_reopen_with_different_maxlen(self):
+        buffer = MemmapBuffer(10, self.directory, cache_size=4)
+        buffer.add(*make_inputs())
+        buffer.flush()
+
+        with pytest.raises(AssertionError):
+            MemmapBuffer(20, self.directory, cache_size=4)
+
+    def test_reopen_with_different_num_envs(self):
+        buffer = MemmapBuffer(10, self.directory, cache_size=4, num_envs=2)
+        buffer.add_batch(*map(np.array, zip(*[make_inputs() for _ in range(2)])))
+        assert buffer.size() == 2
+        buffer.flush()
+
+        with pytest.raises(AssertionError):
+            MemmapBuffer(10, self.directory, cache_size=4)
+
+    def test_snapshot_and_restore(self):
+        buffer = MemmapBuffer(10, self.directory, cache_size=4)
+        buffer.add(*make_inputs())
+        assert buffer.snapshot() is None
+        assert buffer.pending == 0
+
+        inputs = [make_inputs() for _ in range(3)]
+        snapshot = {
+            'obs_t': np.array([i[0] for i in inputs]),
+            'actions_t': np.array([i[1] for i in inputs]),
+            'rewards_t': np.array([i[2] for i in inputs]),
+            'dones_t': np.array([i[3] for i in inputs])
+        }
+        restored = MemmapBuffer(10, tempfile.mkdtemp(), cache_size=4)
+        restored.restore(snapshot)
+        assert restored.size() == 3
+
+        reopened = MemmapBuffer(10, restored.directory, cache_size=4)
+        assert reopened.size() == 3
+        assert np.all(reopened.obs_t[:3] == snapshot['obs_t'])
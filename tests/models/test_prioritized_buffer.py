@@ -0,0 +1,122 @@
+import numpy as np
+import unittest
+import pytest
+
+from mvc.models.prioritized_buffer import PrioritizedBuffer
+from tests.models.test_buffer import make_inputs
+
+
+class PrioritizedBufferTest(unittest.TestCase):
+    def test_add(self):
+        buffer = PrioritizedBuffer()
+
+        buffer.add(*make_inputs())
+        assert buffer.size() == 1
+        assert buffer.tree.total() == 0.0
+
+        buffer.add(*make_inputs())
+        assert buffer.size() == 2
+        assert np.allclose(buffer.tree.total(), 1.0)
+
+    def test_add_batch(self):
+        buffer = PrioritizedBuffer(num_envs=2)
+
+        buffer.add_batch(*map(np.array, zip(*[make_inputs() for _ in range(2)])))
+        assert buffer.size() == 2
+        assert buffer.tree.total() == 0.0
+
+        buffer.add_batch(*map(np.array, zip(*[make_inputs() for _ in range(2)])))
+        assert buffer.size() == 4
+        assert np.allclose(buffer.tree.total(), 2.0)
+        assert np.all(buffer.tree.get(np.array([2, 3])) == 0.0)
+
+    def test_capacity(self):
+        buffer = PrioritizedBuffer(2)
+        buffer.add(*make_inputs())
+        buffer.add(*make_inputs())
+        buffer.add(*make_inputs())
+        assert buffer.size() == 2
+        assert np.allclose(buffer.tree.total(), 1.0)
+
+    def test_reset(self):
+        buffer = PrioritizedBuffer()
+        buffer.add(*make_inputs())
+        buffer.add(*make_inputs())
+        buffer.reset()
+        assert buffer.size() == 0
+        assert buffer.tree.total() == 0.0
+
+    def test_fetch(self):
+        buffer = PrioritizedBuffer()
+        obs1, action1, reward1, done1 = make_inputs()
+        obs2, action2, reward2, done2 = make_inputs()
+
+        buffer.add(obs1, action1, reward1, done1)
+        buffer.add(obs2, action2, reward2, done2)
+
+        batch = buffer.fetch(1)
+        assert np.all(batch['obs_t'][0] == obs1)
+        assert np.all(batch['obs_tp1'][0] == obs2)
+        assert np.all(batch['actions_t'][0] == action1)
+        assert batch['rewards_tp1'][0] == reward2
+        assert batch['dones_tp1'][0] == done2
+        assert batch['weights_t'][0] == 1.0
+        assert batch['indices_t'][0] == 0
+
+    def test_fetch_excludes_latest(self):
+        buffer = PrioritizedBuffer(8)
+        for _ in range(20):
+            buffer.add(*make_inputs())
+
+        batch = buffer.fetch(7)
+        latest = (buffer.cursor - 1) % buffer.maxlen
+        assert not np.any(batch['indices_t'] == latest)
+
+    def test_fetch_multiple_batches(self):
+        buffer = PrioritizedBuffer(alpha=1.0, beta=1.0)
+        for _ in range(101):
+            buffer.add(*make_inputs())
+        buffer.update_priorities(np.arange(100), np.arange(100) % 2 + 1.0)
+
+        batch = buffer.fetch(40, 4)
+        indices = batch['indices_t'].reshape(4, 10)
+        weights = batch['weights_t'].reshape(4, 10)
+        # every batch is stratified over the whole tree
+        for i in range(4):
+            assert np.min(indices[i]) < 10
+            assert np.max(indices[i]) >= 90
+            assert np.all(np.diff(indices[i]) > 0)
+        assert np.allclose(np.max(weights, axis=1), 1.0)
+
+    def test_update_priorities(self):
+        buffer = PrioritizedBuffer(alpha=1.0, beta=1.0)
+        for _ in range(5):
+            buffer.add(*make_inputs())
+
+        td_errors = np.array([1.0, 2.0, 3.0, 4.0])
+        buffer.update_priorities(np.arange(4), td_errors)
+
+        assert np.allclose(buffer.tree.total(), np.sum(td_errors), atol=1e-4)
+        assert np.allclose(buffer.max_priority, 4.0)
+
+        batch = buffer.fetch(4)
+        probs = (batch['indices_t'] + 1.0) / 10.0
+        weights = 1.0 / (4 * probs)
+        assert np.allclose(batch['weights_t'], weights / np.max(weights))
+
+    def test_restore(self):
+        buffer = PrioritizedBuffer()
+        for _ in range(5):
+            buffer.add(*make_inputs())
+
+        restored = PrioritizedBuffer()
+        restored.restore(buffer.snapshot())
+        assert restored.size() == 5
+        assert np.allclose(restored.tree.total(), 4.0)
+        assert restored.tree.get([4])[0] == 0.0
+
+    def test_fetch_with_exception(self):
+        buffer = PrioritizedBuffer()
+        buffer.add(*make_inputs())
+        with pytest.raises(AssertionError):
+            buffer.fetch(2)
@@ -3,7 +3,7 @@ import pytest
 import unittest
 
 from mvc.preprocess import compute_returns, compute_gae
-from mvc.models.rollout import Rollout
+from mvc.models.rollout import Rollout, ArrayRollout
 
 
 def make_inputs():
@@ -117,3 +117,89 @@ class RolloutTest(unittest.TestCase):
         self.assertEqual(rollout.size(), 1)
         insert_inputs_to_rollout(inputs, rollout)
         self.assertEqual(rollout.size(), 2)
+
+
+def make_array_rollout(time_horizon=2):
+    return ArrayRollout(time_horizon, 4, (84, 84), 4, dtype=np.float64)
+
+
+class ArrayRolloutTest(unittest.TestCase):
+    def test_add_success(self):
+        rollout = make_array_rollout()
+        inputs1 = make_inputs()
+        insert_inputs_to_rollout(inputs1, rollout)
+        assert_inputs_with_rollout(inputs1, rollout, 0)
+
+        inputs2 = make_inputs()
+        insert_inputs_to_rollout(inputs2, rollout)
+        assert_inputs_with_rollout(inputs1, rollout, 0)
+        assert_inputs_with_rollout(inputs2, rollout, 1)
+
+    def test_add_with_shape_error(self):
+        for key in ['obs_t', 'action_t', 'reward_t', 'value_t',
+                    'log_prob_t', 'terminal_t']:
+            with pytest.raises(AssertionError):
+                rollout = make_array_rollout()
+                inputs = make_inputs()
+                inputs[key] = np.random.random((5,))
+                insert_inputs_to_rollout(inputs, rollout)
+
+    def test_add_with_overflow(self):
+        rollout = make_array_rollout(1)
+        insert_inputs_to_rollout(make_inputs(), rollout)
+        insert_inputs_to_rollout(make_inputs(), rollout)
+        with pytest.raises(AssertionError):
+            insert_inputs_to_rollout(make_inputs(), rollout)
+
+    def test_flush(self):
+        rollout = make_array_rollout()
+        insert_inputs_to_rollout(make_inputs(), rollout)
+        rollout.flush()
+        self.assertEqual(rollout.size(), 0)
+
+    def test_fetch(self):
+        gamma = np.random.random()
+        lam = np.random.random()
+        rollout = make_array_rollout()
+        list_rollout = Rollout()
+        for _ in range(3):
+            inputs = make_inputs()
+            insert_inputs_to_rollout(inputs, rollout)
+            insert_inputs_to_rollout(inputs, list_rollout)
+
+        trajectory = rollout.fetch(gamma, lam)
+        answer = list_rollout.fetch(gamma, lam)
+
+        for key in answer:
+            assert np.array_equal(trajectory[key], answer[key])
+        # storage is returned without copy
+        assert np.shares_memory(trajectory['obs_t'], rollout.obs_t)
+        assert np.shares_memory(trajectory['actions_t'], rollout.actions_t)
+
+    def test_fetch_with_float32_storage(self):
+        gamma = np.random.random()
+        lam = np.random.random()
+        rollout = ArrayRollout(2, 4, (84, 84), 4)
+        list_rollout = Rollout()
+        for _ in range(3):
+            inputs = make_inputs()
+            insert_inputs_to_rollout(inputs, rollout)
+            insert_inputs_to_rollout(inputs, list_rollout)
+
+        trajectory = rollout.fetch(gamma, lam)
+        answer = list_rollout.fetch(gamma, lam)
+
+        assert rollout.obs_t.dtype == np.float32
+        assert rollout.actions_t.dtype == np.float32
+        for key in ['values_t', 'returns_t', 'advantages_t']:
+            assert trajectory[key].dtype == np.float64
+            assert np.array_equal(trajectory[key], answer[key])
+
+    def test_size(self):
+        rollout = make_array_rollout()
+        self.assertEqual(rollout.size(), 0)
+        inputs = make_inputs()
+        insert_inputs_to_rollout(inputs, rollout)
+        self.assertEqual(rollout.size(), 1)
+        insert_inputs_to_rollout(inputs, rollout)
+        self.assertEqual(rollout.size(), 2)
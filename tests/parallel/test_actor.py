@@ -0,0 +1,57 @@
+import multiprocessing
+import threading
+import numpy as np
+import unittest
+
+from unittest.mock import MagicMock
+from mvc.misc.shared_array import shared_array, as_array
+from mvc.parallel.actor import _actor
+from mvc.parallel.parameters import SharedParameters
+from mvc.parallel.shared_buffer import SharedBuffer
+from tests.test_utils import DummyNetwork, DummyNoise, make_output
+
+
+class DummyEnv:
+    def __init__(self, stop, final_steps):
+        self.stop = stop
+        self.final_steps = final_steps
+        self.t = 0
+
+    def step(self, action):
+        self.t += 1
+        if self.t == self.final_steps:
+            self.stop.set()
+        done = self.t % 3 == 0
+        info = {'reward': float(self.t)} if done else {}
+        return np.random.random((16,)), 1.0, done, info
+
+    def reset(self):
+        return np.random.random((16,))
+
+
+def make_network():
+    network = DummyNetwork()
+    network._infer = MagicMock(return_value=make_output())
+    network._infer_arguments = MagicMock(return_value=['obs_t'])
+    network.set_flat_params = MagicMock()
+    return network
+
+
+class ActorTest(unittest.TestCase):
+    def test_actor(self):
+        ctx = multiprocessing.get_context()
+        stop = threading.Event()
+        buffer = SharedBuffer(ctx, 20, 2, (16,), 4)
+        parameters = SharedParameters(ctx, 1)
+        parameters.publish(np.zeros(1))
+        shared_steps = shared_array(ctx, (2,), np.int64)
+        rewards = MagicMock()
+
+        _actor(1, lambda: DummyEnv(stop, 6), make_network, DummyNoise,
+               'actor', buffer, parameters, shared_steps, rewards, stop)
+
+        # two episodes with terminal transitions
+        assert as_array(shared_steps)[1] == 6
+        assert np.all(buffer.counts == [0, 8])
+        assert np.all(buffer.dones_t[10:18] == [0, 0, 0, 1, 0, 0, 0, 1])
+        assert rewards.put.call_count == 2
@@ -0,0 +1,91 @@
+import multiprocessing
+import numpy as np
+import unittest
+import tensorflow as tf
+
+from mvc.models.networks.ppo import PPONetwork
+from mvc.parallel.data_parallel import AllReduce, run_workers
+from mvc.parallel.data_parallel import broadcast_params
+
+
+def make_values(rank):
+    return [np.full((2, 3), rank, dtype=np.float32),
+            np.float32(rank * 2)]
+
+
+def _mean_worker(rank, allreduce, results):
+    for _ in range(3):
+        values = allreduce.mean(rank, make_values(rank))
+    results.put((rank, [value.tolist() for value in values]))
+
+
+def _broadcast_worker(rank, allreduce, results):
+    values = allreduce.broadcast(rank, make_values(rank + 1))
+    results.put((rank, [value.tolist() for value in values]))
+
+
+def _broadcast_params_worker(rank, allreduce, results):
+    # every worker initializes its network with different values
+    with tf.Graph().as_default():
+        network = PPONetwork([8, 8], (3,), 1, 2, 4, 0.2, 1e-3, 0.5, 1.0,
+                             0.01)
+        with tf.Session() as sess:
+            sess.run(tf.global_variables_initializer())
+            # workers broadcast the whole scope of the network
+            broadcast_params(allreduce, rank, network, 'ppo')
+            results.put((rank, network.get_flat_params('ppo').tolist()))
+
+
+def _failing_worker(rank, allreduce):
+    if rank == 0:
+        raise ValueError()
+    allreduce.mean(rank, make_values(rank))
+
+
+class AllReduceTest(unittest.TestCase):
+    def setUp(self):
+        self.ctx = multiprocessing.get_context('fork')
+
+    def run_processes(self, target, num_workers, size=7, ctx=None):
+        ctx = self.ctx if ctx is None else ctx
+        allreduce = AllReduce(ctx, num_workers, size)
+        results = ctx.Queue()
+        processes = [
+            ctx.Process(target=target, args=(i, allreduce, results))
+            for i in range(num_workers)
+        ]
+        for process in processes:
+            process.start()
+        outputs = dict(results.get() for _ in range(num_workers))
+        for process in processes:
+            process.join()
+        return outputs
+
+    def test_mean(self):
+        outputs = self.run_processes(_mean_worker, 3)
+        for rank in range(3):
+            assert np.all(np.array(outputs[rank][0]) == 1.0)
+            assert outputs[rank][1] == 2.0
+            assert outputs[rank] == outputs[0]
+
+    def test_broadcast(self):
+        outputs = self.run_processes(_broadcast_worker, 3)
+        for rank in range(3):
+            assert np.all(np.array(outputs[rank][0]) == 1.0)
+            assert outputs[rank][1] == 2.0
+
+    def test_broadcast_params(self):
+        with tf.Graph().as_default():
+            size = PPONetwork([8, 8], (3,), 1, 2, 4, 0.2, 1e-3, 0.5, 1.0,
+                              0.01).flat_params_size('ppo')
+        # graphs are built in fresh processes without the parent session
+        outputs = self.run_processes(_broadcast_params_worker, 3, size,
+                                     multiprocessing.get_context('spawn'))
+        for rank in range(3):
+            assert len(outputs[rank]) == size
+            assert np.allclose(outputs[rank], outputs[0])
+
+    def test_run_workers_with_failure(self):
+        # a failed worker releases the others from the barrier
+        exitcodes = run_workers(self.ctx, _failing_worker, 3, 7)
+        assert all(exitcode != 0 for exitcode in exitcodes)
@@ -0,0 +1,66 @@
+import numpy as np
+import tensorflow as tf
+import unittest
+
+from unittest.mock import MagicMock, patch
+from mvc.models.metrics import Metrics
+from mvc.parallel.evaluator import AsyncEvaluator
+from tests.test_utils import DummyNetwork, make_output
+
+
+class DummyEnv:
+    def __init__(self):
+        self.t = 0
+
+    def step(self, action):
+        self.t += 1
+        done = self.t % 3 == 0
+        info = {'reward': float(self.t)} if done else {}
+        return np.random.random((16,)), 1.0, done, info
+
+    def reset(self):
+        return np.random.random((16,))
+
+
+def make_network():
+    network = DummyNetwork()
+    network._infer = MagicMock(return_value=make_output())
+    network._infer_arguments = MagicMock(return_value=['obs_t'])
+    network.set_flat_params = MagicMock()
+    return network
+
+
+class AsyncEvaluatorTest(unittest.TestCase):
+    def setUp(self):
+        for name in ['register', 'set_experiment_name']:
+            patcher = patch('mvc.logger.' + name)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        patcher = patch('mvc.logger.log_metric')
+        self.log_metric = patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.metrics = Metrics('test')
+        self.metrics.register('step', 'single')
+
+    def test_evaluate(self):
+        env = DummyEnv()
+        flat = np.random.random((10,))
+        training_network = DummyNetwork()
+        training_network.get_flat_params = MagicMock(return_value=flat)
+        evaluator = AsyncEvaluator(env, training_network, make_network,
+                                   'dummy', self.metrics, 2)
+
+        with tf.Session().as_default():
+            self.metrics.add('step', 10)
+            evaluator.evaluate()
+            # training goes on while evaluating the snapshot
+            self.metrics.add('step', 5)
+            evaluator.close()
+
+        assert env.t == 7
+        training_network.get_flat_params.assert_called_once_with('dummy')
+        evaluator.network.set_flat_params.assert_called_once_with(
+            flat, 'dummy')
+        # reward is logged at the step of the snapshot
+        self.log_metric.assert_called_once_with('eval_reward', 4.5, 10)
@@ -0,0 +1,121 @@
+import numpy as np
+import unittest
+
+from unittest.mock import MagicMock, patch
+from mvc.controllers.ddpg import DDPGController
+from mvc.models.buffer import Buffer
+from mvc.models.metrics import Metrics
+from mvc.parallel.actor import ActorPool
+from mvc.parallel.parameters import SharedParameters
+from mvc.parallel.learner import Learner, learn
+from tests.test_utils import DummyNetwork, DummyNoise
+
+
+class LearnerTest(unittest.TestCase):
+    def setUp(self):
+        for name in ['register', 'set_experiment_name', 'log_metric']:
+            patcher = patch('mvc.logger.' + name)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+        self.metrics = Metrics('test')
+        self.controller = DDPGController(DummyNetwork(), Buffer(),
+                                         self.metrics, DummyNoise(),
+                                         num_actions=4, batch_size=32,
+                                         final_steps=100)
+        self.pool = MagicMock(spec=ActorPool)
+        self.pool.episode_rewards.return_value = []
+        self.parameters = MagicMock(spec=SharedParameters)
+        self.learner = Learner(self.controller, self.pool, self.parameters,
+                               'dummy', publish_interval=2, log_interval=10,
+                               save_interval=20)
+
+    def test_collect(self):
+        self.pool.total_steps.return_value = 5
+        self.pool.episode_rewards.return_value = [1.0, 2.0]
+        self.learner.collect()
+        assert self.metrics.get('step') == 5
+
+        self.pool.total_steps.return_value = 12
+        self.pool.episode_rewards.return_value = []
+        self.learner.collect()
+        assert self.metrics.get('step') == 12
+        assert np.allclose(self.metrics.get('reward'), 1.5)
+
+    def test_publish(self):
+        flat = np.random.random((10,))
+        self.controller.network.get_flat_params = MagicMock(return_value=flat)
+        self.learner.publish()
+        self.controller.network.get_flat_params.assert_called_once_with(
+            'dummy')
+        self.parameters.publish.assert_called_once_with(flat)
+
+    def test_update(self):
+        self.controller.update = MagicMock()
+        self.learner.publish = MagicMock()
+
+        self.learner.update()
+        assert self.controller.update.call_count == 1
+        assert self.learner.publish.call_count == 0
+
+        self.learner.update()
+        assert self.metrics.get('update') == 2
+        assert self.learner.publish.call_count == 1
+
+    def test_should_log(self):
+        self.pool.total_steps.return_value = 7
+        self.learner.collect()
+        assert not self.learner.should_log()
+
+        # intervals can be crossed without hitting their multiples
+        self.pool.total_steps.return_value = 13
+        self.learner.collect()
+        assert self.learner.should_log()
+
+        self.learner.log()
+        assert not self.learner.should_log()
+        assert self.metrics.get('actor_steps_per_second') > 0.0
+
+    def test_should_save(self):
+        self.pool.total_steps.return_value = 21
+        self.learner.collect()
+        assert self.learner.should_save()
+
+        self.metrics.save_model = MagicMock()
+        self.metrics.save_buffer = MagicMock()
+        self.learner.save()
+        self.metrics.save_model.assert_called_once_with(21)
+        self.metrics.save_buffer.assert_called_once_with(
+            self.controller.buffer, 21)
+        assert not self.learner.should_save()
+
+    def test_learn(self):
+        self.pool.total_steps.side_effect = [40, 80, 120]
+        self.controller.should_update = MagicMock(return_value=True)
+        self.controller.update = MagicMock()
+        self.learner.publish = MagicMock()
+        self.controller.save = MagicMock()
+
+        learn(self.learner)
+
+        self.pool.start.assert_called_once_with()
+        self.pool.close.assert_called_once_with()
+        assert self.controller.update.call_count == 3
+        assert self.learner.publish.call_count == 2
+        # the last checkpoint is written when training ends
+        assert self.controller.save.call_count == 4
+        assert self.learner.last_save_step == 120
+
+    def test_learn_publishes_before_actors_start(self):
+        calls = []
+        self.pool.total_steps.side_effect = [120]
+        self.pool.start.side_effect = lambda: calls.append('start')
+        self.controller.should_update = MagicMock(return_value=False)
+        self.learner.publish = MagicMock(
+            side_effect=lambda: calls.append('publish'))
+        self.controller.save = MagicMock()
+
+        learn(self.learner)
+
+        # actors never run with parameters older than the restored ones
+        assert calls == ['publish', 'start']
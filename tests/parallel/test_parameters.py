@@ -0,0 +1,40 @@
+import multiprocessing
+import numpy as np
+import unittest
+
+from mvc.parallel.parameters import SharedParameters
+
+
+def _publish_from_child(parameters, flat):
+    parameters.publish(flat)
+
+
+class SharedParametersTest(unittest.TestCase):
+    def test_publish_and_pull(self):
+        parameters = SharedParameters(multiprocessing.get_context(), 17)
+        flat, version = parameters.pull(0)
+        assert flat is None
+        assert version == 0
+
+        published = np.random.random((17,))
+        parameters.publish(published)
+        flat, version = parameters.pull(0)
+        assert version == 1
+        assert flat.shape == (17,)
+        assert np.allclose(flat, published)
+
+        flat, version = parameters.pull(version)
+        assert flat is None
+
+    def test_publish_from_child_process(self):
+        ctx = multiprocessing.get_context('spawn')
+        parameters = SharedParameters(ctx, 17)
+        published = np.random.random((17,))
+        process = ctx.Process(target=_publish_from_child,
+                              args=(parameters, published))
+        process.start()
+        process.join()
+
+        flat, version = parameters.pull(0)
+        assert version == 1
+        assert np.allclose(flat, published)
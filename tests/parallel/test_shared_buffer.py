@@ -0,0 +1,124 @@
+import multiprocessing
+import numpy as np
+import unittest
+import pytest
+
+from mvc.parallel.shared_buffer import SharedBuffer
+
+
+def make_inputs():
+    obs = np.random.random(10).astype(np.float32)
+    action = np.random.random(4).astype(np.float32)
+    reward = np.float32(np.random.random())
+    done = np.float32(np.random.randint(2))
+    return obs, action, reward, done
+
+
+def _add_from_child(buffer, index, inputs):
+    for inpt in inputs:
+        buffer.add(index, *inpt)
+
+
+class SharedBufferTest(unittest.TestCase):
+    def setUp(self):
+        self.ctx = multiprocessing.get_context()
+
+    def test_add(self):
+        buffer = SharedBuffer(self.ctx, 10, 2, (10,), 4)
+        buffer.add(0, *make_inputs())
+        assert buffer.size() == 1
+        buffer.add(1, *make_inputs())
+        assert buffer.size() == 2
+        assert np.all(buffer.counts == [1, 1])
+
+    def test_capacity(self):
+        buffer = SharedBuffer(self.ctx, 10, 2, (10,), 4)
+        assert buffer.segment == 5
+        for _ in range(8):
+            buffer.add(0, *make_inputs())
+        # two rows are kept free for the current and the next write
+        assert buffer.size() == 3
+        assert buffer.cursors[0] == 3
+
+    def test_reset(self):
+        buffer = SharedBuffer(self.ctx, 10, 2, (10,), 4)
+        buffer.add(0, *make_inputs())
+        buffer.reset()
+        assert buffer.size() == 0
+
+    def test_fetch(self):
+        buffer = SharedBuffer(self.ctx, 10, 2, (10,), 4)
+        inputs = [[make_inputs() for _ in range(6)] for _ in range(2)]
+        for i in range(6):
+            buffer.add(0, *inputs[0][i])
+            buffer.add(1, *inputs[1][i])
+
+        # next states never come from other actors
+        batch = buffer.fetch(5)
+        for i in range(5):
+            matches = [(actor, j) for actor in range(2) for j in range(6)
+                       if np.all(batch['obs_t'][i] == inputs[actor][j][0])]
+            assert len(matches) == 1
+            actor, j = matches[0]
+            # only the latest 3 rows of each actor remain
+            assert 3 <= j < 5
+            nxt = inputs[actor][j + 1]
+            assert np.all(batch['obs_tp1'][i] == nxt[0])
+            assert batch['rewards_tp1'][i] == nxt[2]
+            assert batch['dones_tp1'][i] == nxt[3]
+            assert np.all(batch['actions_t'][i] == inputs[actor][j][1])
+
+    def test_fetch_with_exception(self):
+        buffer = SharedBuffer(self.ctx, 10, 2, (10,), 4)
+        buffer.add(0, *make_inputs())
+        buffer.add(1, *make_inputs())
+        with pytest.raises(AssertionError):
+            buffer.fetch(1)
+
+    def test_add_from_child_process(self):
+        ctx = multiprocessing.get_context('spawn')
+        buffer = SharedBuffer(ctx, 10, 2, (10,), 4)
+        inputs = [make_inputs() for _ in range(3)]
+        process = ctx.Process(target=_add_from_child,
+                              args=(buffer, 1, inputs))
+        process.start()
+        process.join()
+
+        assert buffer.size() == 3
+        assert np.all(buffer.obs_t[5:8] == np.array([i[0] for i in inputs]))
+
+    def test_snapshot_and_restore(self):
+        buffer = SharedBuffer(self.ctx, 10, 2, (10,), 4)
+        for _ in range(3):
+            buffer.add(0, *make_inputs())
+        buffer.add(1, *make_inputs())
+
+        snapshot = buffer.snapshot()
+        restored = SharedBuffer(self.ctx, 10, 2, (10,), 4)
+        restored.restore(snapshot)
+
+        assert restored.size() == buffer.size()
+        assert np.all(restored.cursors == buffer.cursors)
+        assert np.all(restored.counts == buffer.counts)
+        for name in SharedBuffer.FIELDS:
+            assert np.all(getattr(restored, name) == getattr(buffer, name))
+
+        # snapshot does not share memory with the buffer
+        buffer.reset()
+        assert restored.size() == 4
+
+    def test_fetch_skips_rows_being_written(self):
+        buffer = SharedBuffer(self.ctx, 10, 2, (10,), 4)
+        for _ in range(12):
+            buffer.add(0, *make_inputs())
+            buffer.add(1, *make_inputs())
+
+        # rows under and after the cursors are written by the next adds
+        writing = []
+        for actor in range(2):
+            for offset in range(2):
+                position = (buffer.cursors[actor] + offset) % buffer.segment
+                writing.append(buffer.obs_t[actor * buffer.segment + position])
+        batch = buffer.fetch(5)
+        for obs in np.concatenate([batch['obs_t'], batch['obs_tp1']]):
+            assert not any(np.all(obs == row) for row in writing)
@@ -3,7 +3,8 @@ import numpy as np
 from unittest import TestCase
 from unittest.mock import MagicMock
 from mvc.interaction import batch_interact, step, initial_inputs, batch_loop
-from mvc.interaction import interact, loop
+from mvc.interaction import interact, loop, pipelined_batch_loop
+from mvc.action_output import ActionOutput
 from mvc.view import View
 
 
@@ -108,6 +109,50 @@ class BatchLoopTest(TestCase):
         assert hook.call_count == 5
 
 
+class PipelinedBatchLoopTest(TestCase):
+    def test_pipelined_batch_loop(self):
+        env = DummyEnv()
+        view = DummyView()
+
+        obs = make_inputs()[0]
+        env.reset = MagicMock(return_value=obs)
+        env.step_async = MagicMock()
+        def step_wait(indices):
+            outputs = make_inputs()
+            return (outputs[0][indices], outputs[1][indices],
+                    outputs[2][indices], [{} for _ in indices])
+        env.step_wait = MagicMock(side_effect=step_wait)
+
+        def infer(obs):
+            size = obs.shape[0]
+            return ActionOutput(np.random.random((size, 2)),
+                                np.random.random(size), np.random.random(size))
+        view.prepare_step = MagicMock()
+        view.infer = MagicMock(side_effect=infer)
+        view.record = MagicMock()
+        view.report = MagicMock()
+        view.is_finished = MagicMock(side_effect=lambda: view.record.call_count == 5)
+
+        hook = MagicMock()
+
+        pipelined_batch_loop(env, view, hook)
+
+        assert view.prepare_step.call_count == 5
+        assert view.infer.call_count == 10
+        assert env.step_async.call_count == 10
+        # 4 steps for each half and draining in-flight steps
+        assert env.step_wait.call_count == 10
+        assert view.report.call_count == 4
+        assert hook.call_count == 5
+        assert np.all(view.record.call_args_list[0][0][0] == obs)
+        record_obs, _, _, record_info, output = view.record.call_args[0]
+        assert record_obs.shape == obs.shape
+        assert len(record_info) == 4
+        assert output.action.shape == (4, 2)
+        assert np.all(env.step_async.call_args_list[0][0][1] == np.arange(2))
+        assert np.all(env.step_async.call_args_list[1][0][1] == np.arange(2, 4))
+
+
 class BatchInteractionTest(TestCase):
     def test_loop_with_eval(self):
         env = DummyEnv()
@@ -129,6 +174,21 @@ class BatchInteractionTest(TestCase):
         assert env.step.call_count == 5
         assert eval_env.step.call_count == 5
 
+    def test_loop_with_evaluator(self):
+        env = DummyEnv()
+        view = DummyView()
+        evaluator = MagicMock()
+
+        env.reset = MagicMock(return_value=make_inputs()[0])
+        env.step = MagicMock(return_value=make_inputs())
+        view.is_finished = MagicMock(side_effect=lambda: env.step.call_count == 5)
+        view.should_eval = MagicMock(side_effect=lambda: env.step.call_count == 2)
+
+        batch_interact(env, view, evaluator=evaluator)
+
+        assert env.step.call_count == 5
+        evaluator.evaluate.assert_called_once_with()
+
 
 class LoopTest(TestCase):
     def test_loop(self):
@@ -199,3 +259,18 @@ class InteractionTest(TestCase):
 
         assert env.step.call_count == 5
         assert eval_env.step.call_count == 5
+
+    def test_loop_with_evaluator(self):
+        env = DummyEnv()
+        view = DummyView()
+        evaluator = MagicMock()
+
+        env.reset = MagicMock(return_value=make_single_inputs()[0])
+        env.step = MagicMock(return_value=make_single_inputs())
+        view.is_finished = MagicMock(side_effect=lambda: env.step.call_count == 5)
+        view.should_eval = MagicMock(side_effect=lambda: env.step.call_count == 2)
+
+        interact(env, view, evaluator=evaluator)
+
+        assert env.step.call_count == 5
+        evaluator.evaluate.assert_called_once_with()
@@ -0,0 +1,122 @@
+import tensorflow as tf
+import numpy as np
+
+from mvc.parametric_function import stochastic_policy_function
+from mvc.parametric_function import deterministic_policy_function
+from mvc.parametric_function import value_function
+from mvc.parametric_function import q_function
+import mvc.numpy_parametric_function as npf
+
+from tests.test_utils import make_fcs
+
+
+def make_inpt():
+    return np.random.random((np.random.randint(10) + 1,
+                             np.random.randint(10) + 1)).astype(np.float32)
+
+
+class WeightCacheTest(tf.test.TestCase):
+    def test_get_and_invalidate(self):
+        inpt = tf.constant(make_inpt())
+        value_function(make_fcs(), inpt, scope='value')
+        variables = tf.get_collection(
+            tf.GraphKeys.TRAINABLE_VARIABLES, 'value')
+        cache = npf.WeightCache(['value'])
+
+        with self.test_session() as sess:
+            sess.run(tf.global_variables_initializer())
+            weights = cache.get()
+            assert set(weights.keys()) == set(v.op.name for v in variables)
+
+            sess.run([tf.assign_add(v, tf.ones_like(v)) for v in variables])
+            # weights are kept until invalidated
+            assert cache.get() is weights
+
+            cache.invalidate()
+            after = cache.get()
+            for name in weights:
+                assert np.allclose(after[name], weights[name] + 1.0)
+
+
+class NumpyParametricFunctionTest(tf.test.TestCase):
+    def test_stochastic_policy_function(self):
+        for share in [False, True]:
+            inpt = make_inpt()
+            fcs = make_fcs()
+            num_actions = np.random.randint(10) + 1
+            scope = 'policy{}'.format(int(share))
+            dist = stochastic_policy_function(
+                fcs, tf.constant(inpt), num_actions, share=share,
+                last_b_init=tf.random_uniform_initializer(-0.1, 0.1),
+                scope=scope)
+            actions = np.random.random(
+                (inpt.shape[0], num_actions)).astype(np.float32)
+            log_prob = dist.log_prob(tf.constant(actions))
+
+            with self.test_session() as sess:
+                sess.run(tf.global_variables_initializer())
+                mean, std, log_prob = sess.run(
+                    [dist.mean(), dist.stddev(), log_prob])
+                weights = npf.WeightCache([scope]).get()
+
+            np_mean, np_std = npf.stochastic_policy_function(
+                weights, len(fcs), inpt, np.tanh, share=share, scope=scope)
+            assert np.allclose(mean, np_mean, atol=1e-5)
+            assert np.allclose(std, np_std, atol=1e-5)
+            np_log_prob = npf.normal_log_prob(actions, np_mean, np_std)
+            assert np.allclose(log_prob, np_log_prob, atol=1e-4)
+
+    def test_deterministic_policy_function(self):
+        inpt = make_inpt()
+        fcs = make_fcs()
+        num_actions = np.random.randint(10) + 1
+        policy = deterministic_policy_function(
+            fcs, tf.constant(inpt), num_actions,
+            last_b_init=tf.random_uniform_initializer(-0.1, 0.1))
+
+        with self.test_session() as sess:
+            sess.run(tf.global_variables_initializer())
+            policy = sess.run(policy)
+            weights = npf.WeightCache(['policy']).get()
+
+        np_policy = npf.deterministic_policy_function(
+            weights, len(fcs), inpt, np.tanh)
+        assert np.allclose(policy, np_policy, atol=1e-5)
+
+    def test_value_function(self):
+        inpt = make_inpt()
+        fcs = make_fcs()
+        value = value_function(fcs, tf.constant(inpt), tf.nn.relu)
+
+        with self.test_session() as sess:
+            sess.run(tf.global_variables_initializer())
+            value = sess.run(value)
+            weights = npf.WeightCache(['value']).get()
+
+        np_value = npf.value_function(weights, len(fcs), inpt, npf.relu)
+        assert np.allclose(value, np_value, atol=1e-5)
+
+    def test_q_function(self):
+        inpt = make_inpt()
+        fcs = make_fcs()
+        action = np.random.random(
+            (inpt.shape[0], np.random.randint(10) + 1)).astype(np.float32)
+        concat_index = np.random.randint(len(fcs))
+        value = q_function(fcs, tf.constant(inpt), tf.constant(action),
+                           concat_index)
+
+        with self.test_session() as sess:
+            sess.run(tf.global_variables_initializer())
+            value = sess.run(value)
+            weights = npf.WeightCache(['action_value']).get()
+
+        np_value = npf.q_function(
+            weights, len(fcs), inpt, action, concat_index, np.tanh)
+        assert np.allclose(value, np_value, atol=1e-5)
+
+    def test_sample_normal(self):
+        mean = np.random.random((1000, 3)).astype(np.float32)
+        std = np.full((1000, 3), 1e-3, dtype=np.float32)
+        sample = npf.sample_normal(mean, std)
+        assert sample.dtype == np.float32
+        assert np.allclose(sample, mean, atol=1e-2)
@@ -7,6 +7,7 @@ from mvc.parametric_function import stochastic_policy_function
 from mvc.parametric_function import deterministic_policy_function
 from mvc.parametric_function import value_function
 from mvc.parametric_function import q_function
+from mvc.parametric_function import ContiguousVariables
 
 from tests.test_utils import make_tf_inpt, make_fcs, mock_activation
 from tests.test_utils import assert_hidden_variable_shape
@@ -242,3 +243,46 @@ class QFunctionTest(tf.test.TestCase):
 
             after = sess.run(variable)
             assert_variable_mismatch(before, after)
+
+
+class ContiguousVariablesTest(tf.test.TestCase):
+    def test_contiguous_variables(self):
+        inpt = make_tf_inpt()
+        fcs = make_fcs()
+        contiguous = ContiguousVariables()
+        build = lambda x: value_function(fcs, x, tf.nn.tanh, scope='value')
+
+        contiguous.register('value', build, inpt)
+        tf.get_variable_scope().set_custom_getter(contiguous.getter)
+        value = build(inpt)
+
+        # layers are views of a single variable
+        variables = tf.get_collection(tf.GraphKeys.TRAINABLE_VARIABLES)
+        assert [variable.op.name for variable in variables] == ['value/flat']
+        layout = contiguous.layouts['value/flat']
+        assert len(layout) == 2 * (len(fcs) + 1)
+        assert layout[0] == ('value/hiddens/hidden0/kernel',
+                             [int(inpt.shape[1]), fcs[0]])
+        assert layout[-1] == ('value/output/bias', [1])
+
+        # to check connection
+        optimizer = tf.train.AdamOptimizer(1e-4)
+        optimize_expr = optimizer.minimize(tf.reduce_mean(value))
+
+        with self.test_session() as sess:
+            sess.run(tf.global_variables_initializer())
+            before = sess.run(variables[0])
+            sess.run(optimize_expr)
+            after = sess.run(variables[0])
+            assert_variable_mismatch([before], [after])
+
+            # views are split in the recorded order
+            weights = contiguous.split({'value/flat': after})
+            out = sess.run(inpt)
+            for i in range(len(fcs)):
+                name = 'value/hiddens/hidden{}'.format(i)
+                out = np.tanh(np.dot(out, weights[name + '/kernel'])
+                              + weights[name + '/bias'])
+            out = np.dot(out, weights['value/output/kernel']) \
+                + weights['value/output/bias']
+            assert np.allclose(sess.run(value), out, atol=1e-5)
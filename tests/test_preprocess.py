@@ -6,6 +6,40 @@ from mvc.preprocess import compute_returns
 from mvc.preprocess import compute_gae
 
 
+def reference_returns(bootstrap_value, rewards, terminals, gamma):
+    returns = []
+    return_tp1 = bootstrap_value
+    for i in reversed(range(rewards.shape[0])):
+        return_t = rewards[i] + (1.0 - terminals[i]) * gamma * return_tp1
+        returns.append(return_t)
+        return_tp1 = return_t
+    return np.array(list(reversed(returns)))
+
+
+def reference_gae(bootstrap_value, rewards, values, terminals, gamma, lam):
+    values = np.concatenate((values, [bootstrap_value]), axis=0)
+    deltas = []
+    for i in reversed(range(rewards.shape[0])):
+        return_t = rewards[i] + (1.0 - terminals[i]) * gamma * values[i + 1]
+        deltas.append(return_t - values[i])
+    deltas = np.array(list(reversed(deltas)))
+    adv_tp1 = deltas[-1]
+    advantages = [adv_tp1]
+    for i in reversed(range(deltas.shape[0] - 1)):
+        adv_t = deltas[i] + (1.0 - terminals[i]) * gamma * lam * adv_tp1
+        advantages.append(adv_t)
+        adv_tp1 = adv_t
+    return np.array(list(reversed(advantages)))
+
+
+def make_trajectory(time_horizon, num_envs, dtype=np.float64):
+    bootstrap_value = np.random.random(num_envs).astype(dtype)
+    rewards = np.random.random((time_horizon, num_envs))
+    values = np.random.random((time_horizon, num_envs)).astype(dtype)
+    terminals = np.random.randint(2, size=(time_horizon, num_envs))
+    return bootstrap_value, rewards, values, terminals.astype(np.float64)
+
+
 class ComputeReturnsTest(unittest.TestCase):
     def test_compute_returns_one_d_array(self):
         bootstrap_value = 1.0
@@ -43,6 +77,17 @@ class ComputeReturnsTest(unittest.TestCase):
         with pytest.raises(AssertionError) as excinfo:
             compute_returns(np.arange(6), np.ones((5, 5)), np.ones((5, 5)), 0.9)
 
+    def test_compute_returns_matches_reference(self):
+        for dtype in [np.float32, np.float64]:
+            bootstrap_value, rewards, _, terminals = make_trajectory(
+                128, 8, dtype)
+            returns = compute_returns(bootstrap_value, rewards, terminals,
+                                      0.99)
+            answer = reference_returns(bootstrap_value, rewards, terminals,
+                                       0.99)
+            assert returns.dtype == answer.dtype
+            assert np.array_equal(returns, answer)
+
 class ComputeGaeTest(unittest.TestCase):
     def test_compute_returns_one_d_array(self):
         bootstrap_value = 1.0
@@ -87,3 +132,14 @@ class ComputeGaeTest(unittest.TestCase):
             compute_gae(np.arange(5), np.ones((5, 5)), np.ones((5, 5)), np.ones((6, 5)), 0.9, 0.9)
         with pytest.raises(AssertionError) as excinfo:
             compute_gae(np.arange(6), np.ones((5, 5)), np.ones((5, 5)), np.ones((5, 5)), 0.9, 0.9)
+
+    def test_compute_gae_matches_reference(self):
+        for dtype in [np.float32, np.float64]:
+            bootstrap_value, rewards, values, terminals = make_trajectory(
+                128, 8, dtype)
+            advs = compute_gae(bootstrap_value, rewards, values, terminals,
+                               0.99, 0.95)
+            answer = reference_gae(bootstrap_value, rewards, values,
+                                   terminals, 0.99, 0.95)
+            assert advs.dtype == answer.dtype
+            assert np.array_equal(advs, answer)
@@ -53,6 +53,61 @@ def assert_variable_match(variables1, variables2):
         assert np.all(variable1 == variable2)
 
 
+def get_layer_weights(network, sess):
+    # flat variables are split into the layers stored in them
+    variables = tf.trainable_variables()
+    names = [variable.op.name for variable in variables]
+    weights = dict(zip(names, sess.run(variables)))
+    if network.contiguous is not None:
+        weights.update(network.contiguous.split(weights))
+        for name in network.contiguous.layouts:
+            del weights[name]
+    return weights
+
+
+def run_target_update(make_network, get_target_update, obs, values=None):
+    # returns weights before and after the target update keyed by layers
+    with tf.Graph().as_default():
+        network = make_network()
+        contiguous = network.contiguous
+        with tf.Session() as sess:
+            sess.run(tf.global_variables_initializer())
+            if values is not None:
+                for variable in tf.trainable_variables():
+                    name = variable.op.name
+                    if contiguous is None or name not in contiguous.layouts:
+                        value = values[name]
+                    else:
+                        value = np.concatenate([
+                            np.ravel(values[view])
+                            for view, _ in contiguous.layouts[name]
+                        ])
+                    variable.load(value, sess)
+            before = get_layer_weights(network, sess)
+            action = network.infer(obs_t=obs).action
+            sess.run(get_target_update(network))
+            after = get_layer_weights(network, sess)
+    return before, after, action
+
+
+def transfer_flat_params(make_src, make_dst, scope, obs):
+    # returns outputs and weights keyed by layers of both networks
+    results = []
+    flat = None
+    for make_network in [make_src, make_dst]:
+        with tf.Graph().as_default():
+            network = make_network()
+            with tf.Session() as sess:
+                sess.run(tf.global_variables_initializer())
+                if flat is None:
+                    flat = network.get_flat_params(scope)
+                else:
+                    network.set_flat_params(flat, scope)
+                output = network.infer(obs_t=obs)
+                results.append((output, get_layer_weights(network, sess)))
+    return results
+
+
 def make_output(num_actions=4, batch_size=1, batch=False):
     if batch:
         action = np.random.random((batch_size, num_actions))
@@ -103,6 +158,9 @@ class DummyMetrics(Metrics):
     def add(self, name, value):
         pass
 
+    def add_many(self, name, values):
+        pass
+
     def get(self, name):
         pass
 
@@ -131,5 +189,5 @@ class DummyNoise:
             self.mock()
         return 0.0
 
-    def reset(self):
+    def reset(self, mask=None):
         pass
@@ -23,12 +23,18 @@ class DummyController:
     def log(self):
         pass
 
+    def log_reports(self):
+        pass
+
     def should_save(self):
         pass
 
     def save(self):
         pass
 
+    def flush(self):
+        pass
+
 class ViewTest(unittest.TestCase):
     def test_step_without_update(self):
         controller = DummyController()
@@ -95,6 +101,42 @@ class ViewTest(unittest.TestCase):
         controller.step.assert_called_once_with('obs', 'reward', 'done', 'info')
         controller.save.assert_called_once_with()
 
+    def test_prepare_step(self):
+        controller = DummyController()
+        view = View(controller)
+        controller.should_update = MagicMock(return_value=True)
+        controller.update = MagicMock()
+        controller.should_log = MagicMock(return_value=True)
+        controller.log = MagicMock()
+        controller.log_reports = MagicMock()
+        controller.step = MagicMock()
+
+        view.prepare_step()
+        assert controller.update.call_count == 1
+        assert controller.log.call_count == 1
+        assert controller.log_reports.call_count == 1
+        controller.step.assert_not_called()
+
+    def test_infer_and_record(self):
+        controller = DummyController()
+        view = View(controller)
+        controller.infer = MagicMock(return_value='output')
+        controller.record = MagicMock()
+
+        assert view.infer('obs') == 'output'
+        view.record('obs', 'reward', 'done', 'info', 'output')
+        controller.infer.assert_called_once_with('obs')
+        controller.record.assert_called_once_with(
+            'obs', 'reward', 'done', 'info', 'output')
+
+    def test_report(self):
+        controller = DummyController()
+        view = View(controller)
+        controller.report = MagicMock()
+
+        view.report('overlap', 0.5)
+        controller.report.assert_called_once_with('overlap', 0.5)
+
     def test_stop_episode(self):
         controller = DummyController()
         view = View(controller)
@@ -107,14 +149,17 @@ class ViewTest(unittest.TestCase):
         controller = DummyController()
         view = View(controller)
         controller.save = MagicMock()
+        controller.flush = MagicMock()
 
         controller.is_finished = MagicMock(return_value=False)
         assert not view.is_finished()
         controller.save.assert_not_called()
+        controller.flush.assert_not_called()
 
         controller.is_finished = MagicMock(return_value=True)
         assert view.is_finished()
         controller.save.assert_called_once_with()
+        controller.flush.assert_called_once_with()
 
     def test_should_eval(self):
         controller = DummyController()